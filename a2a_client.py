@@ -0,0 +1,202 @@
+import gzip
+import json
+import time
+import random
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses that indicate the Execution Agent did not process the request and it can be retried
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised when a request is rejected locally because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops sending requests to an unhealthy Execution Agent.
+
+    After `failure_threshold` consecutive failures the circuit opens and requests fail fast.
+    Once `reset_timeout` seconds have passed, a single trial request is let through
+    (half-open); its outcome closes the circuit again or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit breaker closed; Execution Agent is healthy again.")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker opened after {self.consecutive_failures} consecutive failures.")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient failures."""
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.25, backoff_max: float = 8.0, jitter: bool = True):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        """Returns the delay before retry number `attempt` (starting at 0)."""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+
+class A2AClient:
+    """Reusable HTTP client for talking to an Execution Agent.
+
+    Keeps a persistent, pooled keep-alive session, applies connect/read timeouts,
+    retries transient failures and guards the agent with a circuit breaker.
+    Read timeouts are not retried, since the agent may already have appended the
+    turn to the task history.
+
+    With use_gzip=True, request bodies of at least `gzip_min_bytes` are sent gzip-compressed
+    and gzip-compressed responses are accepted; otherwise responses are requested uncompressed.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:5000",
+        connect_timeout: float = 3.05,
+        read_timeout: float = 120.0,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        use_gzip: bool = False,
+        gzip_min_bytes: int = 4096,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.use_gzip = use_gzip
+        self.gzip_min_bytes = gzip_min_bytes
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip" if use_gzip else "identity"
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def _encode(self, payload: Union[Dict[str, Any], bytes]) -> Tuple[bytes, Dict[str, str]]:
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.use_gzip and len(body) >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def _post(self, path: str, payload: Union[Dict[str, Any], bytes], stream: bool = False) -> requests.Response:
+        body, headers = self._encode(payload)
+        attempt = 0
+        while True:
+            retry_after: Optional[str] = None
+            if not self.circuit_breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open for {self.base_url}; not sending request.")
+            try:
+                response = self.session.post(self.url(path), data=body, headers=headers, timeout=self.timeout, stream=stream)
+            except requests.exceptions.ConnectionError as e:
+                # Covers connect timeouts too: the request never reached the agent
+                self.circuit_breaker.record_failure()
+                if attempt >= self.retry_policy.max_retries:
+                    raise
+                error: Any = e
+            except requests.exceptions.RequestException:
+                self.circuit_breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    # A response that is not a transient overload means the agent itself is reachable
+                    if response.status_code < 500:
+                        self.circuit_breaker.record_success()
+                    else:
+                        self.circuit_breaker.record_failure()
+                    return response
+                self.circuit_breaker.record_failure()
+                if attempt >= self.retry_policy.max_retries:
+                    return response
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+
+            delay = self.retry_policy.delay(attempt)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            attempt += 1
+            logger.warning(f"Transient error calling {path} ({error}); retry {attempt}/{self.retry_policy.max_retries} in {delay:.2f}s.")
+            time.sleep(delay)
+
+    def post_json(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POSTs a JSON-RPC payload and returns the decoded JSON response."""
+        response = self._post(path, payload)
+        response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
+        return response.json()
+
+    def post_bytes(self, path: str, body: bytes) -> bytes:
+        """POSTs an already-encoded JSON-RPC payload and returns the raw (decompressed) response body."""
+        response = self._post(path, body)
+        response.raise_for_status()
+        return response.content
+
+    def post_stream(self, path: str, payload: Union[Dict[str, Any], bytes]) -> requests.Response:
+        """POSTs a JSON-RPC payload and returns the open response for streaming. The caller must close it."""
+        response = self._post(path, payload, stream=True)
+        response.raise_for_status()
+        return response
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "A2AClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
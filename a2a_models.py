@@ -1,5 +1,7 @@
-from typing import List, Dict, Any, Optional, Union, Literal
-from pydantic import BaseModel, Field, HttpUrl, validator
+import base64
+import binascii
+from typing import List, Dict, Any, Optional, Union, Literal, Annotated
+from pydantic import BaseModel, Field, HttpUrl, Discriminator, Tag, BeforeValidator, PlainSerializer, validator
 from enum import Enum
 
 # Define Enums
@@ -14,14 +16,33 @@ class TaskState(str, Enum):
 
 # Define basic Part types
 class TextPart(BaseModel):
-    type: str = "text"
+    type: Literal["text"] = "text"
     text: str
     metadata: Optional[Dict[str, Any]] = None
 
+def _decode_file_bytes(value: Any) -> Any:
+    # Base64 text only exists on the wire; in memory, file contents are raw bytes (or a memoryview of them)
+    if isinstance(value, str):
+        try:
+            return base64.b64decode(value, validate=True)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid base64 file content: {e}")
+    if value is None or isinstance(value, (bytes, memoryview)):
+        return value
+    if isinstance(value, bytearray):
+        return bytes(value)
+    raise ValueError("File content must be bytes or base64-encoded text")
+
+def _encode_file_bytes(value: Union[bytes, memoryview]) -> str:
+    return base64.b64encode(value).decode("ascii")
+
+# Raw bytes in memory, base64 text in JSON
+FileBytes = Annotated[Any, BeforeValidator(_decode_file_bytes), PlainSerializer(_encode_file_bytes, when_used="json")]
+
 class FileContent(BaseModel):
     name: Optional[str] = None
     mimeType: Optional[str] = None
-    bytes: Optional[str] = None # Base64 encoded bytes
+    bytes: Optional[FileBytes] = None # Decoded bytes; base64 encoded on the wire
     uri: Optional[str] = None
 
     @validator('uri', always=True)
@@ -33,17 +54,30 @@ class FileContent(BaseModel):
         return v
 
 class FilePart(BaseModel):
-    type: str = "file"
+    type: Literal["file"] = "file"
     file: FileContent
     metadata: Optional[Dict[str, Any]] = None
 
 class DataPart(BaseModel):
-    type: str = "data"
+    type: Literal["data"] = "data"
     data: Dict[str, Any]
     metadata: Optional[Dict[str, Any]] = None
 
-# Define the union type for Part
-Part = Union[TextPart, FilePart, DataPart]
+def _part_type(value: Any) -> Optional[str]:
+    # Parts without a "type" key are text parts, matching the TextPart default
+    if isinstance(value, dict):
+        return value.get("type", "text")
+    return getattr(value, "type", None)
+
+# Define the union type for Part, discriminated on "type" so validation goes straight to the right model
+Part = Annotated[
+    Union[
+        Annotated[TextPart, Tag("text")],
+        Annotated[FilePart, Tag("file")],
+        Annotated[DataPart, Tag("data")],
+    ],
+    Discriminator(_part_type)
+]
 
 class Message(BaseModel):
     role: str # Can be "user" or "agent" based on context, schema says enum but leaving as str for flexibility
@@ -176,14 +210,27 @@ class TaskArtifactUpdateEvent(BaseModel):
     artifact: Artifact
     metadata: Optional[Dict[str, Any]] = None
 
-# Union of possible A2A Requests
-A2ARequest = Union[
-    SendTaskRequest,
-    GetTaskRequest,
-    CancelTaskRequest,
-    SetTaskPushNotificationRequest,
-    GetTaskPushNotificationRequest,
-    TaskResubscriptionRequest
+# Streaming Request/Response models (Server-Sent Events)
+class SendTaskStreamingRequest(JSONRPCRequest):
+    method: Literal["tasks/sendSubscribe"] = "tasks/sendSubscribe"
+    params: TaskSendParams = Field(...)
+
+class SendTaskStreamingResponse(JSONRPCResponse):
+    result: Optional[Union[TaskStatusUpdateEvent, TaskArtifactUpdateEvent]] = None
+    error: Optional[JSONRPCError] = None
+
+# Union of possible A2A Requests, discriminated on the JSON-RPC method
+A2ARequest = Annotated[
+    Union[
+        SendTaskRequest,
+        SendTaskStreamingRequest,
+        GetTaskRequest,
+        CancelTaskRequest,
+        SetTaskPushNotificationRequest,
+        GetTaskPushNotificationRequest,
+        TaskResubscriptionRequest
+    ],
+    Field(discriminator="method")
 ]
 
 # Union of possible A2A Streaming Responses (Events)
@@ -191,3 +238,49 @@ A2AStreamingResponse = Union[
     TaskStatusUpdateEvent,
     TaskArtifactUpdateEvent
 ]
+
+# Agent Card, published by an agent at /.well-known/agent.json for discovery
+class AgentProvider(BaseModel):
+    organization: str
+    url: Optional[str] = None
+
+class AgentCapabilities(BaseModel):
+    streaming: bool = False
+    pushNotifications: bool = False
+    stateTransitionHistory: bool = False
+
+class AgentAuthentication(BaseModel):
+    schemes: List[str]
+    credentials: Optional[str] = None
+
+class AgentSkill(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+    tags: Optional[List[str]] = None
+    examples: Optional[List[str]] = None
+    inputModes: Optional[List[str]] = None
+    outputModes: Optional[List[str]] = None
+
+class AgentLoad(BaseModel):
+    # Not part of the A2A Agent Card; lets routers balance on the agent's own view of its load
+    activeRequests: int = 0
+    llmInFlight: int = 0
+    llmMaxWorkers: Optional[int] = None
+    llmQueueDepth: int = 0
+    tasks: Optional[int] = None
+    accepting: bool = True
+
+class AgentCard(BaseModel):
+    name: str
+    description: Optional[str] = None
+    url: str
+    provider: Optional[AgentProvider] = None
+    version: str
+    documentationUrl: Optional[str] = None
+    capabilities: AgentCapabilities
+    authentication: Optional[AgentAuthentication] = None
+    defaultInputModes: List[str] = ["text"]
+    defaultOutputModes: List[str] = ["text"]
+    skills: List[AgentSkill]
+    load: Optional[AgentLoad] = None
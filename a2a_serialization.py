@@ -0,0 +1,54 @@
+import json
+from functools import lru_cache
+from typing import Any, Type, TypeVar, Union
+
+from pydantic import BaseModel, TypeAdapter
+
+from a2a_models import A2ARequest
+
+try:
+    import orjson
+except ImportError: # Optional fast JSON library; the standard library is used without it
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Validates any A2A request in one pass, selecting the request model by its "method"
+A2A_REQUEST_ADAPTER: TypeAdapter = TypeAdapter(A2ARequest)
+
+
+@lru_cache(maxsize=None)
+def adapter_for(model_type: Any) -> TypeAdapter:
+    """Returns the TypeAdapter for a model type, built once and reused."""
+    return TypeAdapter(model_type)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encodes plain Python data as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decodes JSON bytes or text. Raises ValueError on invalid JSON."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_model(model: BaseModel, exclude_none: bool = True) -> bytes:
+    """Serializes a model straight to compact JSON bytes, without an intermediate dict."""
+    return adapter_for(type(model)).dump_json(model, exclude_none=exclude_none)
+
+
+def decode_model(model_type: Type[ModelT], data: Union[bytes, str]) -> ModelT:
+    """Parses and validates JSON bytes into a model in a single pass."""
+    return adapter_for(model_type).validate_json(data)
+
+
+def decode_request(data: Union[bytes, str]) -> Any:
+    """Parses and validates a JSON-RPC request into the A2A request model of its method."""
+    return A2A_REQUEST_ADAPTER.validate_json(data)
@@ -0,0 +1,294 @@
+import json
+import uuid
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import aiohttp
+from pydantic import ValidationError
+
+import planning_agent
+from planning_agent import (
+    build_planning_prompt, merge_history, parse_planner_decision, record_goal_metrics, GoalStats, EXECUTION_AGENT_SEND_PATH
+)
+from communication_log import get_communication_log
+from planner_context import PlannerContext, create_planner_context_from_env
+from turn_pacing import TurnPacer, PACING_MODES, create_turn_pacer_from_env, load_report_of
+from a2a_serialization import encode_model, decode_model
+from metrics import A2A_REQUESTS, A2A_REQUEST_SECONDS, A2A_PAYLOAD_BYTES, LLM_CALLS, LLM_CALL_SECONDS, phase, new_trace_id, trace_metadata, write_metrics_from_env
+from a2a_models import SendTaskRequest, SendTaskResponse, Task, Message, TextPart, TaskSendParams
+
+logger = logging.getLogger(__name__)
+
+METRICS_COMPONENT = planning_agent.METRICS_COMPONENT
+
+
+@dataclass
+class GoalRun:
+    """Turn state for a single goal driven by the async planner."""
+    goal: str
+    task_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    trace_id: str = field(default_factory=new_trace_id)
+    turn_count: int = 0
+    current_task: Optional[Task] = None
+    history: List[Message] = field(default_factory=list)
+    completed: bool = False
+    error: Optional[str] = None
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    # Compacted planning history (extractive summary only, so planning never blocks the event loop)
+    context: Optional[PlannerContext] = field(default_factory=create_planner_context_from_env)
+    prompt_tokens_full: int = 0
+    prompt_tokens_sent: int = 0
+    # Turns actually sent to the Execution Agent, and time spent pacing them
+    max_turns: int = 0
+    turns_sent: int = 0
+    pacing_wait: float = 0.0
+
+    @property
+    def latency(self) -> float:
+        return self.finished_at - self.started_at
+
+    def stats(self) -> GoalStats:
+        return GoalStats(
+            task_id=self.task_id, max_turns=self.max_turns, turns=self.turns_sent, completed=self.completed,
+            error=self.error, wall_time=self.latency, pacing_wait=self.pacing_wait
+        )
+
+
+async def send_a2a_request_async(session: aiohttp.ClientSession, request_payload: SendTaskRequest) -> Optional[SendTaskResponse]:
+    """Sends an A2A request to the Execution Agent without blocking the event loop."""
+    start = time.perf_counter()
+    outcome = "error"
+    with phase(METRICS_COMPONENT, "serialization"):
+        request_body = encode_model(request_payload)
+    A2A_PAYLOAD_BYTES.observe(len(request_body), component=METRICS_COMPONENT, direction="request")
+
+    # Log the raw request payload to the communication log
+    with phase(METRICS_COMPONENT, "logging"):
+        get_communication_log().record("Planning Agent Sent Request", request_body)
+
+    try:
+        router = planning_agent.get_router()
+        # Every turn of a task goes to the agent holding its history
+        with router.acquire(request_payload.params.id) if router is not None else nullcontext() as endpoint:
+            url = endpoint.base_url + EXECUTION_AGENT_SEND_PATH if endpoint is not None else planning_agent.get_config().execution_agent_base_url + EXECUTION_AGENT_SEND_PATH
+            async with session.post(url, data=request_body, headers={"Content-Type": "application/json"}) as response:
+                response.raise_for_status()
+                response_body = await response.read()
+        A2A_PAYLOAD_BYTES.observe(len(response_body), component=METRICS_COMPONENT, direction="response")
+
+        # Log the raw response payload to the communication log
+        with phase(METRICS_COMPONENT, "logging"):
+            get_communication_log().record("Planning Agent Received Response", response_body)
+
+        # Parse and validate the response payload in a single pass
+        with phase(METRICS_COMPONENT, "validation"):
+            send_task_response = decode_model(SendTaskResponse, response_body)
+        if send_task_response.error:
+            logger.error(f"Received error in A2A response: {send_task_response.error}")
+            return None # Indicate error
+        outcome = "ok"
+        return send_task_response
+
+    except ValidationError as e:
+        logger.error(f"Response validation failed: {e.errors()}", exc_info=True)
+        return None
+    except aiohttp.ClientError as e:
+        logger.error(f"Error sending A2A request: {e}", exc_info=True)
+        return None
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during A2A communication: {e}", exc_info=True)
+        return None
+    finally:
+        A2A_REQUESTS.inc(component=METRICS_COMPONENT, method="tasks/send", outcome=outcome)
+        A2A_REQUEST_SECONDS.observe(time.perf_counter() - start, component=METRICS_COMPONENT, method="tasks/send")
+
+
+async def plan_next_instruction_async(run: GoalRun) -> str:
+    """Asks the Planning LLM for the next instruction of a goal; returns its raw answer (see parse_planner_decision)."""
+    llm_provider = planning_agent.get_llm_provider()
+    if not llm_provider:
+        logger.warning("LLM provider not initialized. Cannot use Planning LLM.")
+        return "Error: LLM not configured or generated no text."
+
+    planning_prompt = build_planning_prompt(run.task_id, run.goal, run.history, run.context)
+    if run.context is not None and run.context.last_stats is not None:
+        run.prompt_tokens_full += run.context.last_stats.full_tokens
+        run.prompt_tokens_sent += run.context.last_stats.compacted_tokens
+    contents = [{"role": "user", "parts": [{"text": planning_prompt}]}]
+    try:
+        with LLM_CALL_SECONDS.time(component=METRICS_COMPONENT):
+            instruction = (await llm_provider.generate_async(contents)).strip()
+        LLM_CALLS.inc(component=METRICS_COMPONENT, outcome="ok")
+        return instruction
+    except Exception as e:
+        LLM_CALLS.inc(component=METRICS_COMPONENT, outcome="error")
+        logger.error(f"Error during Planning LLM processing for Task ID {run.task_id}: {e}", exc_info=True)
+        return f"Error: Planning LLM failed - {e}"
+
+
+async def run_goal(session: aiohttp.ClientSession, run: GoalRun, max_turns: int = 5, pacer: Optional[TurnPacer] = None) -> GoalRun:
+    """Drives a single goal through the plan/execute loop, pacing its turns by the Execution Agent's reported load."""
+    pacer = pacer or create_turn_pacer_from_env()
+    run.max_turns = max_turns
+    run.started_at = time.perf_counter()
+    logger.info(f"Starting new task with ID: {run.task_id} (trace {run.trace_id})")
+
+    while run.turn_count < max_turns:
+        run.turn_count += 1
+
+        if run.turn_count == 1:
+            # Initial message based on the user goal
+            message_content = run.goal
+        else:
+            if not run.history:
+                run.error = "Task history is empty after turn 1."
+                break
+            decision = parse_planner_decision(await plan_next_instruction_async(run), planning_agent.get_config().done_confidence).data
+            if decision["done"]:
+                run.completed = True
+                break
+            if not decision["next_instruction"]:
+                run.error = f"Planning LLM gave no next instruction on turn {run.turn_count}."
+                break
+            message_content = decision["next_instruction"]
+
+        send_request = SendTaskRequest(
+            jsonrpc="2.0",
+            id=str(uuid.uuid4()), # Use a new JSON-RPC request ID for each request
+            params=TaskSendParams(
+                id=run.task_id,
+                message=Message(role="user", parts=[TextPart(text=message_content)], metadata=trace_metadata(run.trace_id)),
+                # Only ask for the messages this goal does not have yet
+                metadata={"historyOffset": len(run.history)}
+            )
+        )
+        response = await send_a2a_request_async(session, send_request)
+        if not (response and response.result):
+            run.error = f"No valid response received on turn {run.turn_count}."
+            break
+        run.turns_sent += 1
+        run.current_task = response.result
+        if not merge_history(run.history, run.current_task):
+            run.error = f"Could not merge history delta on turn {run.turn_count}."
+            break
+
+        delay = pacer.next_delay(load_report_of(run.current_task.metadata))
+        if delay > 0 and run.turn_count < max_turns:
+            # Yields to the other goals instead of blocking the process
+            run.pacing_wait += delay
+            await asyncio.sleep(delay)
+
+    run.finished_at = time.perf_counter()
+    stats = run.stats()
+    record_goal_metrics(stats, METRICS_COMPONENT)
+    planning_agent.release_task_route(run.task_id)
+    logger.info(f"Task {run.task_id} finished after {run.turns_sent} turns in {run.latency:.2f}s ({stats.outcome}, {stats.turns_saved} turns saved).")
+    return run
+
+
+async def run_goals(
+    goals: List[str],
+    concurrency: int = 4,
+    max_turns: int = 5,
+    pacer_factory: Callable[[], TurnPacer] = create_turn_pacer_from_env
+) -> List[GoalRun]:
+    """Runs a batch of goals concurrently, at most `concurrency` at a time, each with its own pacer."""
+    semaphore = asyncio.Semaphore(concurrency)
+    runs = [GoalRun(goal=goal) for goal in goals]
+
+    async def bounded(session: aiohttp.ClientSession, run: GoalRun) -> GoalRun:
+        async with semaphore:
+            return await run_goal(session, run, max_turns=max_turns, pacer=pacer_factory())
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(bounded(session, run) for run in runs))
+    return runs
+
+
+def load_goals(path: str) -> List[str]:
+    """Loads goals from a JSONL file (`goal`, `body` or `title` keys) or a plain text file with one goal per line."""
+    goals = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                goals.append(line)
+                continue
+            if isinstance(record, dict):
+                goal = record.get("goal") or record.get("body") or record.get("title")
+                if goal:
+                    goals.append(goal)
+            elif isinstance(record, str):
+                goals.append(record)
+    return goals
+
+
+def report(runs: List[GoalRun], wall_time: float) -> None:
+    """Prints per-goal turns, latency and pacing, and aggregate throughput and turns saved for a batch."""
+    print(f"{'task_id':<38} {'turns':>5} {'saved':>5} {'latency_s':>10} {'pacing_s':>9}  status")
+    for run in runs:
+        status = "completed" if run.completed else (run.error or "max turns reached")
+        print(f"{run.task_id:<38} {run.turns_sent:>5} {run.stats().turns_saved:>5} {run.latency:>10.2f} {run.pacing_wait:>9.2f}  {status}")
+
+    latencies = sorted(run.latency for run in runs)
+    total_turns = sum(run.turns_sent for run in runs)
+    print()
+    print(f"Goals: {len(runs)}  Turns: {total_turns}  Wall time: {wall_time:.2f}s")
+    completed = sum(1 for run in runs if run.completed)
+    turns_saved = sum(run.stats().turns_saved for run in runs)
+    print(f"Completed early: {completed}/{len(runs)}  Turns saved: {turns_saved} of {sum(run.max_turns for run in runs)}  Pacing wait: {sum(run.pacing_wait for run in runs):.2f}s")
+    if wall_time > 0:
+        print(f"Throughput: {len(runs) / wall_time:.2f} goals/s, {total_turns / wall_time:.2f} turns/s")
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))]
+        print(f"Goal latency: mean {statistics.mean(latencies):.2f}s  p50 {statistics.median(latencies):.2f}s  p95 {p95:.2f}s  max {latencies[-1]:.2f}s")
+    prompt_tokens_full = sum(run.prompt_tokens_full for run in runs)
+    prompt_tokens_sent = sum(run.prompt_tokens_sent for run in runs)
+    if prompt_tokens_full:
+        print(f"Planning prompt tokens: ~{prompt_tokens_full} uncompacted, ~{prompt_tokens_sent} sent ({1 - prompt_tokens_sent / prompt_tokens_full:.0%} smaller)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run many Planning Agent goals concurrently.")
+    parser.add_argument("--goals", default="sample_goals.jsonl", help="JSONL or text file with one goal per line")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of goals in flight")
+    parser.add_argument("--max-turns", type=int, default=5, help="Turn limit per goal")
+    parser.add_argument("--pacing", choices=PACING_MODES, default=None, help="Turn pacing (default: PLANNER_PACING, or adaptive)")
+    parser.add_argument("--turn-delay", type=float, default=None, help="Seconds between turns with --pacing fixed (default: PLANNER_TURN_DELAY, or 1)")
+    parser.add_argument("--limit", type=int, default=None, help="Only run the first N goals")
+    args = parser.parse_args()
+    try:
+        goals = load_goals(args.goals)[:args.limit]
+    except OSError as e:
+        parser.error(f"cannot read goals file {args.goals}: {e.strerror}")
+    if not goals:
+        parser.error(f"no goals in {args.goals}")
+
+    planning_agent.init()
+    logger.info(f"Loaded {len(goals)} goals from {args.goals}")
+
+    start = time.perf_counter()
+    def pacer_factory() -> TurnPacer:
+        pacer = create_turn_pacer_from_env()
+        pacer.mode = args.pacing or pacer.mode
+        pacer.fixed_delay = pacer.fixed_delay if args.turn_delay is None else args.turn_delay
+        return pacer
+
+    runs = asyncio.run(run_goals(goals, concurrency=args.concurrency, max_turns=args.max_turns, pacer_factory=pacer_factory))
+    report(runs, time.perf_counter() - start)
+
+    # Make sure every queued record reaches the log before exiting
+    get_communication_log().flush(timeout=5.0)
+    write_metrics_from_env()
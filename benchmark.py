@@ -0,0 +1,464 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import tempfile
+import asyncio
+import argparse
+import subprocess
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+# Benchmarks always run against the offline stub LLM so that results are reproducible
+DEFAULT_STUB_LATENCY = "fixed:0.05"
+
+SEND_PATH = "/a2a/tasks/send"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def stub_environment(args: argparse.Namespace) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "LLM_BACKEND": "stub",
+        "STUB_LLM_LATENCY": args.stub_latency,
+        "STUB_LLM_TOKENS_PER_SECOND": str(args.stub_tokens_per_second),
+        "STUB_PLANNER_TURNS": str(args.stub_planner_turns),
+        # Identical benchmark prompts would otherwise be served from the response cache
+        "RESPONSE_CACHE": "on" if args.response_cache else "off",
+        "A2A_COMM_LOG": "on" if args.comm_log else "off",
+        "LLM_BATCHING": "on" if args.batching else "off",
+        "LLM_BATCH_WINDOW_MS": str(args.batch_window_ms),
+        "LLM_BATCH_MAX_SIZE": str(args.batch_max_size),
+    })
+    if args.batching and "LLM_MAX_WORKERS" not in os.environ:
+        # Batched calls hold an LLM worker while they wait, so batches fill only with spare workers
+        env["LLM_MAX_WORKERS"] = str(max(8, 4 * args.batch_max_size))
+    return env
+
+
+def start_server(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    """Starts the Execution Agent in a separate process and waits until it reports healthy.
+
+    `--server werkzeug` uses werkzeug's threaded WSGI server; `--server gunicorn` uses the
+    multi-worker production server from serve.py.
+    """
+    import requests
+
+    if args.server == "gunicorn":
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.py"), "--port", str(port), "--workers", str(args.workers)]
+    else:
+        command = [sys.executable, os.path.abspath(__file__), "serve", "--port", str(port)]
+    env = stub_environment(args)
+    if args.server == "gunicorn":
+        # Workers share a SQLite task store; keep it out of the working directory
+        env.setdefault("TASK_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="a2a-bench-"), "tasks.db"))
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Execution Agent exited during startup")
+        try:
+            if requests.get(f"{base_url}/healthz", timeout=0.5).status_code == 200:
+                return process
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Execution Agent did not become healthy on {base_url}")
+
+
+def serve(port: int) -> None:
+    """Runs the Execution Agent under werkzeug's threaded WSGI server (used by the benchmark subprocess)."""
+    import logging
+    from werkzeug.serving import make_server
+    import execution_agent
+
+    logging.getLogger().setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", port, execution_agent.app, threaded=True)
+    server.serve_forever()
+
+
+def load_goal_texts(path: str) -> List[str]:
+    from async_planning_agent import load_goals
+    goals = load_goals(path) if os.path.exists(path) else []
+    return goals or ["Tell me a short, funny story about a robot chef."]
+
+
+def load_payloads(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Builds the SendTaskRequest payloads to replay.
+
+    Raw JSON-RPC payloads are read from --payloads; otherwise one payload per request is
+    generated from the goals, cycling through `--tasks` task IDs so histories grow.
+    """
+    if args.payloads:
+        with open(args.payloads, "r", encoding="utf-8") as f:
+            payloads = [json.loads(line) for line in f if line.strip()]
+        return [payloads[i % len(payloads)] for i in range(args.requests)]
+
+    goals = load_goal_texts(args.goals)
+    run_id = uuid.uuid4().hex[:8]
+    payloads = []
+    for i in range(args.requests):
+        payloads.append({
+            "jsonrpc": "2.0",
+            "id": f"bench-{run_id}-{i}",
+            "method": "tasks/send",
+            "params": {
+                "id": f"bench-{run_id}-task-{i % args.tasks}",
+                "message": {"role": "user", "parts": [{"type": "text", "text": goals[i % len(goals)]}]},
+                "historyLength": args.history_length,
+            },
+        })
+    return payloads
+
+
+async def send_one(
+    session: aiohttp.ClientSession,
+    url: str,
+    payload: Dict[str, Any],
+    scheduled_at: float,
+    results: List[Dict[str, Any]],
+    router=None
+) -> None:
+    """Sends one request; latency is measured from its scheduled start to avoid coordinated omission.
+
+    With a router, the request goes to the agent it selects for the payload's task ID instead of `url`.
+    """
+    error = None
+    response_bytes = 0
+    try:
+        with router.acquire((payload.get("params") or {}).get("id")) if router is not None else nullcontext() as endpoint:
+            target = endpoint.base_url + SEND_PATH if endpoint is not None else url
+            async with session.post(target, json=payload) as response:
+                body = await response.read()
+                response_bytes = len(body)
+                if response.status != 200:
+                    error = f"HTTP {response.status}"
+                elif b'"error"' in body[:200] and json.loads(body).get("error"):
+                    error = "JSON-RPC error"
+    except Exception as e:
+        error = type(e).__name__
+    results.append({"latency": time.perf_counter() - scheduled_at, "error": error, "bytes": response_bytes})
+
+
+async def run_closed_loop(url: str, payloads: List[Dict[str, Any]], concurrency: int, router=None) -> List[Dict[str, Any]]:
+    """Fixed concurrency: each worker sends its next request as soon as the previous one completes."""
+    results: List[Dict[str, Any]] = []
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        while not queue.empty():
+            payload = queue.get_nowait()
+            await send_one(session, url, payload, time.perf_counter(), results, router)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    return results
+
+
+async def run_open_loop(url: str, payloads: List[Dict[str, Any]], rate: float, router=None) -> List[Dict[str, Any]]:
+    """Fixed arrival rate: requests start on schedule regardless of how many are still in flight."""
+    results: List[Dict[str, Any]] = []
+    interval = 1.0 / rate
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        start = time.perf_counter()
+        in_flight = []
+        for i, payload in enumerate(payloads):
+            scheduled_at = start + i * interval
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            in_flight.append(asyncio.create_task(send_one(session, url, payload, scheduled_at, results, router)))
+        await asyncio.gather(*in_flight)
+    return results
+
+
+async def run_goals_workload(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Replays whole goals through the async Planning Agent, with a stub Planning LLM."""
+    import async_planning_agent
+    from turn_pacing import TurnPacer
+
+    goals = load_goal_texts(args.goals)
+    goals = [goals[i % len(goals)] for i in range(args.requests)]
+    runs = await async_planning_agent.run_goals(
+        goals, concurrency=args.concurrency, max_turns=args.max_turns, pacer_factory=lambda: TurnPacer(mode=args.pacing, fixed_delay=args.turn_delay)
+    )
+    return [
+        {
+            "latency": run.latency, "error": None if run.completed or not run.error else run.error, "bytes": 0, "turns": run.turns_sent,
+            "turns_saved": run.stats().turns_saved, "pacing_wait": run.pacing_wait,
+        }
+        for run in runs
+    ]
+
+
+def summarize(results: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    latencies = sorted(result["latency"] for result in results if result["error"] is None)
+    errors = [result for result in results if result["error"] is not None]
+    summary = {
+        "requests": len(results),
+        "errors": len(errors),
+        "error_rate": len(errors) / len(results) if results else 0.0,
+        "wall_time_s": wall_time,
+        "throughput_rps": len(results) / wall_time if wall_time > 0 else 0.0,
+        "latency_ms": {
+            "mean": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": 1000 * percentile(latencies, 50),
+            "p95": 1000 * percentile(latencies, 95),
+            "p99": 1000 * percentile(latencies, 99),
+            "max": 1000 * latencies[-1] if latencies else 0.0,
+        },
+        "mean_response_bytes": sum(result["bytes"] for result in results) / len(results) if results else 0.0,
+    }
+    if any("turns" in result for result in results):
+        summary["turns"] = sum(result.get("turns", 0) for result in results)
+        summary["turns_saved"] = sum(result.get("turns_saved", 0) for result in results)
+        summary["pacing_wait_s"] = sum(result.get("pacing_wait", 0.0) for result in results)
+    error_kinds: Dict[str, int] = {}
+    for result in errors:
+        error_kinds[result["error"]] = error_kinds.get(result["error"], 0) + 1
+    if error_kinds:
+        summary["error_kinds"] = error_kinds
+    return summary
+
+
+def fetch_stats(base_url: str, path: str = "/a2a/store/stats") -> Dict[str, Any]:
+    import requests
+    try:
+        return requests.get(f"{base_url}{path}", timeout=5).json()
+    except Exception:
+        return {}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(args: argparse.Namespace, agents: int = 1) -> Dict[str, Any]:
+    """Runs one benchmark against `agents` Execution Agent processes.
+
+    Several agents (or a scaling run, see --agents) are reached through the Planning Agent's
+    router, which keeps every task on the agent holding its history.
+    """
+    from router import ExecutionAgentRouter
+
+    ports = [args.port] if args.port and agents == 1 else [free_port() for _ in range(agents)]
+    base_urls = [f"http://127.0.0.1:{port}" for port in ports]
+    base_url = base_urls[0]
+    # The planner modules (also used to load goals) read their configuration on first use
+    os.environ.update(stub_environment(args))
+    os.environ["EXECUTION_AGENT_BASE_URL"] = base_url
+    servers = []
+    router = None
+    try:
+        for port in ports:
+            servers.append(start_server(args, port))
+        if agents > 1 or len(args.agents) > 1:
+            router = ExecutionAgentRouter(urls=base_urls, probe_interval=1.0).start()
+        # Only meaningful for one single-process server; gunicorn's arbiter does not serve requests
+        measure_server = args.server == "werkzeug" and agents == 1
+        rss_before = process_rss_bytes(servers[0].pid) if measure_server else None
+        store_before = fetch_stats(base_url)
+
+        if args.mode == "goals":
+            import planning_agent
+            planning_agent.set_router(router)
+            start = time.perf_counter()
+            results = asyncio.run(run_goals_workload(args))
+        else:
+            payloads = load_payloads(args)
+            url = f"{base_url}{SEND_PATH}"
+            start = time.perf_counter()
+            if args.rate:
+                results = asyncio.run(run_open_loop(url, payloads, args.rate, router))
+            else:
+                results = asyncio.run(run_closed_loop(url, payloads, args.concurrency, router))
+        wall_time = time.perf_counter() - start
+
+        rss_after = process_rss_bytes(servers[0].pid) if measure_server else None
+        store_after = fetch_stats(base_url) if agents == 1 else {url: fetch_stats(url) for url in base_urls}
+        batcher_stats = fetch_stats(base_url, "/a2a/batcher/stats") if args.batching and agents == 1 else None
+        router_stats = router.stats() if router is not None else None
+    finally:
+        if router is not None:
+            router.stop()
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait(timeout=10)
+
+    summary = summarize(results, wall_time)
+    requests_sent = max(1, len(results))
+    summary["task_store"] = store_after
+    if "memory_bytes" in store_after:
+        summary["store_bytes_per_request"] = (store_after["memory_bytes"] - store_before.get("memory_bytes", 0)) / requests_sent
+    if rss_before is not None and rss_after is not None:
+        summary["rss_bytes_per_request"] = (rss_after - rss_before) / requests_sent
+    if batcher_stats is not None:
+        summary["micro_batcher"] = batcher_stats
+    if router_stats is not None:
+        summary["router"] = router_stats
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "config": {
+            "mode": args.mode,
+            "server": args.server if args.server == "werkzeug" else f"gunicorn x{args.workers}",
+            "agents": agents,
+            "cpus": os.cpu_count(),
+            "llm_max_workers": int(stub_environment(args).get("LLM_MAX_WORKERS", "8")),
+            "load": f"open-loop {args.rate} rps" if args.rate else f"closed-loop concurrency {args.concurrency}",
+            "requests": args.requests,
+            "tasks": args.tasks,
+            "history_length": args.history_length,
+            "stub_latency": args.stub_latency,
+            "stub_tokens_per_second": args.stub_tokens_per_second,
+            "response_cache": args.response_cache,
+            "comm_log": args.comm_log,
+            "batching": f"window {args.batch_window_ms}ms, max {args.batch_max_size}" if args.batching else None,
+            "label": args.label,
+        },
+        "results": summary,
+    }
+
+
+def print_summary(record: Dict[str, Any]) -> None:
+    config, results = record["config"], record["results"]
+    latency = results["latency_ms"]
+    agents = f", {config['agents']} agents" if config.get("agents", 1) > 1 else ""
+    print(f"{config['mode']} / {config['load']}{agents}: {results['requests']} requests in {results['wall_time_s']:.2f}s")
+    print(f"  throughput {results['throughput_rps']:.1f} req/s, errors {results['errors']} ({100 * results['error_rate']:.1f}%)")
+    print(f"  latency ms: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    if "turns" in results:
+        print(f"  goals: {results['turns']} turns, {results['turns_saved']} turns saved by early completion, {results['pacing_wait_s']:.2f}s pacing wait")
+    if "store_bytes_per_request" in results:
+        print(f"  task store growth: {results['store_bytes_per_request']:.0f} bytes/request")
+    if "rss_bytes_per_request" in results:
+        print(f"  server RSS growth: {results['rss_bytes_per_request']:.0f} bytes/request")
+    batcher = results.get("micro_batcher")
+    if batcher and batcher.get("batches"):
+        print(f"  micro-batching: {batcher['batches']} batches, mean size {batcher['mean_batch_size']:.1f}, mean queue wait {batcher['mean_queue_wait_ms']:.1f}ms")
+    router = results.get("router")
+    if router:
+        spread = ", ".join(str(agent["requests"]) for agent in router["agents"].values())
+        print(f"  routing: requests per agent {spread}; {router['tasks_pinned']} tasks pinned, {router['affinity_breaks']} affinity breaks")
+
+
+def print_scaling(records: List[Dict[str, Any]]) -> None:
+    """Throughput and latency by number of Execution Agent processes, relative to the first run.
+
+    Every agent brings its own LLM worker pool, so while the stub LLM's latency is the
+    bottleneck, more agents serve more calls at once even on one CPU; once the agents are
+    CPU-bound (e.g. --stub-latency fixed:0), agents beyond the CPU count only add overhead.
+    """
+    base = records[0]["results"]["throughput_rps"] or 1.0
+    config = records[0]["config"]
+    print(f"\n{config['cpus']} CPUs, {config['llm_max_workers']} LLM workers per agent, stub latency {config['stub_latency']}")
+    if max(record["config"]["agents"] for record in records) > (config["cpus"] or 1):
+        print("More agents than CPUs: speedups come from the extra LLM workers only while the run is LLM-latency-bound.")
+    print("agents  throughput   speedup    p50 ms    p95 ms")
+    for record in records:
+        results = record["results"]
+        print(
+            f"{record['config']['agents']:>6}  {results['throughput_rps']:8.1f}/s  {results['throughput_rps'] / base:7.2f}x  "
+            f"{results['latency_ms']['p50']:8.1f}  {results['latency_ms']['p95']:8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end A2A benchmark against a stubbed LLM.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the Execution Agent for a benchmark (internal)")
+    serve_parser.add_argument("--port", type=int, required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run a benchmark (default)")
+    run_parser.add_argument("--mode", choices=["requests", "goals"], default="requests", help="Replay raw tasks/send payloads or whole planner goals")
+    run_parser.add_argument("--requests", type=int, default=500, help="Number of requests (or goals) to send")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop concurrency level")
+    run_parser.add_argument("--rate", type=float, default=None, help="Open-loop arrival rate in requests/s (overrides --concurrency)")
+    run_parser.add_argument("--tasks", type=int, default=50, help="Distinct task IDs the requests are spread over")
+    run_parser.add_argument("--history-length", type=int, default=None, help="historyLength sent with each request")
+    run_parser.add_argument("--goals", default="sample_goals.jsonl", help="Goals file (JSONL or text)")
+    run_parser.add_argument("--payloads", default=None, help="JSONL file of raw SendTaskRequest payloads to replay")
+    run_parser.add_argument("--max-turns", type=int, default=5, help="Turn limit per goal in goals mode")
+    run_parser.add_argument("--pacing", choices=["adaptive", "fixed", "off"], default="adaptive", help="Turn pacing of the planner in goals mode")
+    run_parser.add_argument("--turn-delay", type=float, default=1.0, help="Seconds between turns with --pacing fixed")
+    run_parser.add_argument("--stub-latency", default=DEFAULT_STUB_LATENCY, help="Stub LLM latency distribution")
+    run_parser.add_argument("--stub-tokens-per-second", type=float, default=0.0, help="Stub LLM streaming rate")
+    run_parser.add_argument("--stub-planner-turns", type=int, default=3, help="Turns before the stub planner completes a goal")
+    run_parser.add_argument("--response-cache", action="store_true", help="Keep the Execution Agent response cache enabled")
+    run_parser.add_argument("--comm-log", action="store_true", help="Keep the communication log enabled")
+    run_parser.add_argument("--batching", action="store_true", help="Enable LLM micro-batching in the Execution Agent")
+    run_parser.add_argument("--batch-window-ms", type=float, default=10.0, help="Micro-batching collection window")
+    run_parser.add_argument("--batch-max-size", type=int, default=8, help="Maximum micro-batch size")
+    run_parser.add_argument("--server", choices=["werkzeug", "gunicorn"], default="werkzeug", help="WSGI server the Execution Agent runs under")
+    run_parser.add_argument("--workers", type=int, default=2, help="Worker processes with --server gunicorn")
+    run_parser.add_argument(
+        "--agents", type=int, nargs="+", default=[1],
+        help="Execution Agent processes behind the router; several values run one benchmark each and compare throughput (e.g. 1 2 4)"
+    )
+    run_parser.add_argument("--port", type=int, default=None, help="Port for the Execution Agent (default: a free port)")
+    run_parser.add_argument("--label", default=None, help="Free-form label stored with the results")
+    run_parser.add_argument("--output", default="benchmark_results.jsonl", help="JSONL file the results are appended to")
+
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in ("serve", "run", "-h", "--help"):
+        argv = ["run"] + argv
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.port)
+        return
+
+    records = []
+    for agents in args.agents:
+        record = run_benchmark(args, agents)
+        print_summary(record)
+        with open(args.output, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        records.append(record)
+    if len(records) > 1:
+        print_scaling(records)
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
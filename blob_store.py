@@ -0,0 +1,189 @@
+import os
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+BLOB_URI_PREFIX = "blob:sha256:"
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class BlobStore:
+    """Content-addressed local store for large file payloads.
+
+    Blobs are stored once per SHA-256 digest under `directory` and referenced by
+    `blob:sha256:<digest>` URIs, so a payload that is sent repeatedly is written once
+    and task histories carry the short URI instead of the content.
+
+    Blobs are shared between tasks, so they are not removed with a task; instead, every
+    `sweep_interval` new blobs a sweep deletes those not written or read for `ttl_seconds`
+    (normally the task store's TTL, after which no stored task references them), and then
+    the least recently used ones until the store fits in `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: str = "blob_data",
+        inline_max_bytes: int = 64 * 1024,
+        ttl_seconds: Optional[float] = 3600.0,
+        max_bytes: Optional[int] = 1024 * 1024 * 1024,
+        sweep_interval: int = 100,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.inline_max_bytes = inline_max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.stored = 0
+        self.deduplicated = 0
+        self.reads = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def uri_for(digest: str) -> str:
+        return f"{BLOB_URI_PREFIX}{digest}"
+
+    @staticmethod
+    def digest_of(uri: Optional[str]) -> Optional[str]:
+        """Returns the digest referenced by a blob URI, or None for any other URI."""
+        if not uri or not uri.startswith(BLOB_URI_PREFIX):
+            return None
+        digest = uri[len(BLOB_URI_PREFIX):]
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            return None
+        return digest
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def should_spill(self, data: BytesLike) -> bool:
+        return len(data) > self.inline_max_bytes
+
+    def put(self, data: BytesLike) -> str:
+        """Stores a payload (if not already present) and returns its blob URI."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if self._touch(path):
+            with self._lock:
+                self.deduplicated += 1
+            return self.uri_for(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.stored += 1
+            sweep = self.sweep_interval > 0 and self.stored % self.sweep_interval == 0
+        if sweep:
+            self.sweep(keep=path)
+        return self.uri_for(digest)
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Marks a blob as recently used, so that sweeps keep it. Returns False if it does not exist."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get(self, uri: str) -> Optional[bytes]:
+        """Reads the payload referenced by a blob URI. Returns None if it is unknown."""
+        digest = self.digest_of(uri)
+        if digest is None:
+            return None
+        try:
+            with open(self._path(digest), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self._touch(self._path(digest))
+        with self._lock:
+            self.reads += 1
+        return data
+
+    def path(self, uri: str) -> Optional[str]:
+        """Returns the local file of a stored blob, or None if it is unknown."""
+        digest = self.digest_of(uri)
+        if digest is None or not os.path.exists(self._path(digest)):
+            return None
+        return self._path(digest)
+
+    def _blobs(self) -> List[Tuple[float, int, str]]:
+        """Lists (last use, size, path) of the stored blobs, least recently used first."""
+        blobs = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+        blobs.sort()
+        return blobs
+
+    def sweep(self, keep: Optional[str] = None) -> int:
+        """Deletes expired blobs, then the least recently used ones over `max_bytes`. Returns the number deleted.
+
+        `keep` is the path of a blob that must stay, such as the one just written.
+        """
+        blobs = self._blobs()
+        total = sum(size for _, size, _ in blobs)
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds is not None else None
+        evicted = 0
+        for mtime, size, path in blobs:
+            expired = cutoff is not None and mtime < cutoff
+            over_budget = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or over_budget):
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.info(f"Blob store sweep deleted {evicted} blobs; {total} bytes remain.")
+        with self._lock:
+            self.evictions += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stored": self.stored,
+                "deduplicated": self.deduplicated,
+                "reads": self.reads,
+                "evictions": self.evictions,
+                "inline_max_bytes": self.inline_max_bytes,
+            }
+
+
+def _optional_number(value: Optional[str], kind: type) -> Optional[Any]:
+    return kind(value) if value not in (None, "", "none") else None
+
+
+def create_blob_store_from_env() -> BlobStore:
+    """Builds the blob store configured through BLOB_STORE_DIR, BLOB_INLINE_MAX_BYTES, BLOB_STORE_TTL_SECONDS and BLOB_STORE_MAX_BYTES.
+
+    The TTL defaults to the task store's (TASK_STORE_TTL_SECONDS).
+    """
+    return BlobStore(
+        directory=os.getenv("BLOB_STORE_DIR", "blob_data"),
+        inline_max_bytes=int(os.getenv("BLOB_INLINE_MAX_BYTES", str(64 * 1024))),
+        ttl_seconds=_optional_number(os.getenv("BLOB_STORE_TTL_SECONDS", os.getenv("TASK_STORE_TTL_SECONDS", "3600")), float),
+        max_bytes=_optional_number(os.getenv("BLOB_STORE_MAX_BYTES", str(1024 * 1024 * 1024)), int),
+        sweep_interval=int(os.getenv("BLOB_STORE_SWEEP_INTERVAL", "100")),
+    )
@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import argparse
+import threading
+from typing import Dict, Any, List, Optional, Iterable, TextIO
+
+from metrics import REGISTRY, COMM_LOG_DROPPED
+
+logger = logging.getLogger(__name__)
+
+# Default location of the machine-readable communication log (one JSON record per line)
+DEFAULT_LOG_PATH = "communication_log.jsonl"
+
+# Human-readable rendering of the log, in the layout the agents used to write directly
+DEFAULT_RENDERED_PATH = "communication_log.txt"
+
+
+class LogSink:
+    """Destination for batches of communication log records."""
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Discards any previously written records."""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(LogSink):
+    """Sink that discards every record (communication logging disabled)."""
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        pass
+
+
+class JsonlFileSink(LogSink):
+    """Appends records as compact JSON lines and rotates the file by size."""
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> str:
+        payload = record["payload"]
+        if not isinstance(payload, (bytes, bytearray)):
+            return json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str)
+        # Pre-encoded JSON is spliced in as is; raw newlines can only be insignificant whitespace
+        head = json.dumps({"ts": record["ts"], "event": record["event"]}, separators=(",", ":"), ensure_ascii=False)
+        body = payload.decode("utf-8").replace("\n", " ").replace("\r", " ")
+        return f'{head[:-1]},"payload":{body}}}'
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        lines = "".join(self._encode(record) + "\n" for record in records)
+        data = lines.encode("utf-8")
+        if self.max_bytes > 0:
+            try:
+                current_size = os.path.getsize(self.path)
+            except OSError:
+                current_size = 0
+            if current_size > 0 and current_size + len(data) > self.max_bytes:
+                self._rotate()
+        # The file is opened per batch (not held open) so that both agents can share it
+        # and so that rotation or a reset from another process is picked up immediately.
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def _rotate(self) -> None:
+        if self.backup_count <= 0:
+            open(self.path, "wb").close()
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.1")
+
+    def reset(self) -> None:
+        for i in range(1, self.backup_count + 1):
+            rotated = f"{self.path}.{i}"
+            if os.path.exists(rotated):
+                os.remove(rotated)
+        open(self.path, "wb").close()
+
+
+class CommunicationLog:
+    """Non-blocking communication log.
+
+    Records are pushed onto a bounded in-memory queue and a background writer thread
+    drains it, handing batches to the configured sink. The payload is serialized by the
+    writer thread, so callers must not mutate a payload after recording it. A payload
+    given as bytes is taken to be already-encoded JSON and is written without re-encoding.
+
+    When the queue is full, overflow="drop" discards the record immediately and
+    overflow="block" waits up to block_timeout seconds for space before dropping it.
+    Dropped records are counted in `dropped` and in the a2a_comm_log_dropped_total metric.
+    """
+
+    def __init__(
+        self,
+        sink: LogSink,
+        max_queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        overflow: str = "drop",
+        block_timeout: Optional[float] = 1.0,
+    ):
+        if overflow not in ("drop", "block"):
+            raise ValueError("overflow must be 'drop' or 'block'")
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="communication-log-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, event: str, payload: Any) -> bool:
+        """Queues a record for writing. Returns False if the record was dropped."""
+        if self._closed:
+            return False
+        record = {"ts": time.time(), "event": event, "payload": payload}
+        try:
+            if self.overflow == "block":
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            COMM_LOG_DROPPED.inc()
+            return False
+        with self._lock:
+            self.recorded += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every record queued so far has been handed to the sink."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def reset(self) -> None:
+        """Flushes pending records and clears the underlying log."""
+        self.flush(timeout=5.0)
+        self.sink.reset()
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Communication log queue full on close; pending records may be lost.")
+        self._writer.join(timeout)
+        self.sink.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "written": self.written,
+                "write_errors": self.write_errors,
+                "queue_depth": self._queue.qsize(),
+            }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is None:
+                stopping = True
+            else:
+                batch.append(item)
+            # Drain whatever else is already queued, up to the batch size
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if batch:
+                try:
+                    self.sink.write_batch(batch)
+                    with self._lock:
+                        self.written += len(batch)
+                except Exception as e:
+                    with self._lock:
+                        self.write_errors += 1
+                    logger.error(f"Error writing communication log batch of {len(batch)} records: {e}")
+            # Mark the sentinel and every batched record as processed
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
+
+
+def create_communication_log_from_env() -> CommunicationLog:
+    """Builds a CommunicationLog configured through A2A_COMM_LOG_* environment variables."""
+    if os.getenv("A2A_COMM_LOG", "on").lower() in ("0", "off", "false", "no"):
+        sink: LogSink = NullSink()
+    else:
+        sink = JsonlFileSink(
+            path=os.getenv("A2A_COMM_LOG_PATH", DEFAULT_LOG_PATH),
+            max_bytes=int(os.getenv("A2A_COMM_LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backup_count=int(os.getenv("A2A_COMM_LOG_BACKUPS", "3")),
+        )
+    return CommunicationLog(
+        sink,
+        max_queue_size=int(os.getenv("A2A_COMM_LOG_QUEUE_SIZE", "10000")),
+        batch_size=int(os.getenv("A2A_COMM_LOG_BATCH_SIZE", "256")),
+        overflow=os.getenv("A2A_COMM_LOG_OVERFLOW", "drop"),
+    )
+
+
+_default_log: Optional[CommunicationLog] = None
+_default_log_lock = threading.Lock()
+
+
+def get_communication_log() -> CommunicationLog:
+    """Returns the process-wide communication log, creating it on first use."""
+    global _default_log
+    if _default_log is None:
+        with _default_log_lock:
+            if _default_log is None:
+                _default_log = create_communication_log_from_env()
+                atexit.register(_default_log.close)
+    return _default_log
+
+
+REGISTRY.gauge(
+    "a2a_comm_log_queue_depth", "Communication log records waiting for the writer thread.",
+    function=lambda: _default_log.stats()["queue_depth"] if _default_log is not None else None
+)
+
+
+def iter_records(paths: Iterable[str]) -> Iterable[Dict[str, Any]]:
+    """Yields records from one or more JSONL communication log files, skipping bad lines."""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed record at {path}:{line_number}")
+
+
+def render_record(record: Dict[str, Any], out: TextIO) -> None:
+    """Writes a single record in the original human-readable communication log layout."""
+    header = f"--- {record.get('event', 'Unknown Event')} ---"
+    out.write(header + "\n")
+    out.write(json.dumps(record.get("payload"), indent=2))
+    out.write("\n" + "-" * len(header) + "\n")
+
+
+def render_log(paths: Iterable[str], out: TextIO) -> int:
+    """Renders JSONL communication logs to the human-readable layout. Returns the record count."""
+    count = 0
+    for record in iter_records(paths):
+        render_record(record, out)
+        count += 1
+    return count
+
+
+def rotated_paths(path: str) -> List[str]:
+    """Returns a log path and its rotated backups, oldest first."""
+    backups = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        backups.append(f"{path}.{i}")
+        i += 1
+    return list(reversed(backups)) + ([path] if os.path.exists(path) else [])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render the JSONL communication log in the human-readable layout.")
+    parser.add_argument("input", nargs="?", default=DEFAULT_LOG_PATH, help="JSONL communication log (rotated backups are included)")
+    parser.add_argument("-o", "--output", default=DEFAULT_RENDERED_PATH, help="Output file, or '-' for stdout")
+    args = parser.parse_args()
+
+    input_paths = rotated_paths(args.input)
+    if args.output == "-":
+        render_log(input_paths, sys.stdout)
+    else:
+        with open(args.output, "w") as f:
+            rendered = render_log(input_paths, f)
+        print(f"Rendered {rendered} records to {args.output}")
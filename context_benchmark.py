@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import statistics
+import subprocess
+import threading
+from typing import Dict, Any, List, Tuple
+
+# Compares two ways of giving the Execution Agent a conversation's context, with the stub LLM:
+#   stuffed: single-shot prompts (SESSION_CONTEXT=off); the client repeats the background and
+#            the conversation so far in every instruction, as clients had to before.
+#   session: multi-turn session contexts (SESSION_CONTEXT=on); the client sends the background
+#            once and then only each new instruction.
+# Each mode runs in a fresh interpreter, since the agent reads its configuration at startup.
+
+MODES = ("stuffed", "session")
+
+BACKGROUND_SENTENCE = "The quarterly report covers revenue, churn, hiring and the roadmap for the three product lines. "
+
+
+def configure_environment(args: argparse.Namespace, mode: str) -> None:
+    os.environ.update({
+        "LLM_BACKEND": "stub",
+        "STUB_LLM_LATENCY": f"fixed:{args.llm_latency}",
+        "STUB_LLM_PREFILL_TOKENS_PER_SECOND": str(args.prefill_tokens_per_second),
+        "SESSION_CONTEXT": "on" if mode == "session" else "off",
+        "SESSION_CONTEXT_TOKEN_BUDGET": str(args.session_token_budget),
+        "TASK_STORE_BACKEND": "memory",
+        "RESPONSE_CACHE": "off",
+        "A2A_COMM_LOG": "off",
+        "PAYLOAD_LOG": "off",
+        "LOG_LEVEL": "WARNING",
+    })
+
+
+def start_server(app) -> Tuple[Any, str]:
+    import logging
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="context-benchmark-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def instruction_text(mode: str, background: str, transcript: List[str], turn: int) -> str:
+    instruction = f"Step {turn + 1}: summarize the next section of the report in two sentences."
+    if mode == "session":
+        return f"Background:\n{background}\n\n{instruction}" if turn == 0 else instruction
+    conversation = "\n".join(transcript)
+    return f"Background:\n{background}\n\nConversation so far:\n{conversation}\n\n{instruction}" if transcript else f"Background:\n{background}\n\n{instruction}"
+
+
+def conversation(base_url: str, mode: str, background: str, turns: int, results: List[Dict[str, Any]]) -> None:
+    import requests
+
+    task_id = f"context-{mode}-{uuid.uuid4().hex[:8]}"
+    transcript: List[str] = []
+    with requests.Session() as session:
+        for turn in range(turns):
+            text = instruction_text(mode, background, transcript, turn)
+            body = json.dumps({
+                "jsonrpc": "2.0",
+                "id": uuid.uuid4().hex,
+                "method": "tasks/send",
+                "params": {"id": task_id, "message": {"role": "user", "parts": [{"type": "text", "text": text}]}, "historyLength": 1},
+            }).encode("utf-8")
+            start = time.perf_counter()
+            response = session.post(f"{base_url}/a2a/tasks/send", data=body, headers={"Content-Type": "application/json"}, timeout=300).json()
+            latency = time.perf_counter() - start
+            reply = response["result"]["status"]["message"]["parts"][0]["text"] if response.get("result") else ""
+            transcript += [f"user: {text.splitlines()[-1]}", f"agent: {reply}"]
+            results.append({"turn": turn, "latency": latency, "request_bytes": len(body), "error": response.get("error")})
+
+
+def run(args: argparse.Namespace, mode: str) -> Dict[str, Any]:
+    configure_environment(args, mode)
+    import execution_agent
+
+    server, base_url = start_server(execution_agent.create_app())
+    background = (BACKGROUND_SENTENCE * (4 * args.background_tokens // len(BACKGROUND_SENTENCE) + 1)).strip()
+    results: List[Dict[str, Any]] = []
+    # Distinct backgrounds, so that conversations do not share prompt prefixes
+    threads = [
+        threading.Thread(target=conversation, args=(base_url, mode, f"Report {i + 1}. {background}", args.turns, results))
+        for i in range(args.conversations)
+    ]
+    start = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - start
+        llm_stats = execution_agent.llm_provider.prefix_stats()
+        context_stats = execution_agent.session_contexts.stats() if execution_agent.session_contexts is not None else {"enabled": False}
+    finally:
+        server.shutdown()
+        execution_agent.shutdown()
+
+    latencies = [result["latency"] for result in results]
+    late_turns = [result["latency"] for result in results if result["turn"] >= args.turns // 2]
+    calls = llm_stats["calls"] or 1
+    return {
+        "mode": mode,
+        "turns": len(results),
+        "errors": sum(1 for result in results if result["error"]),
+        "wall_time_s": wall_time,
+        "mean_request_bytes": statistics.mean(result["request_bytes"] for result in results),
+        "mean_prompt_tokens": llm_stats["prompt_tokens"] / calls,
+        "mean_uncached_prompt_tokens": (llm_stats["prompt_tokens"] - llm_stats["cached_prompt_tokens"]) / calls,
+        "mean_latency_ms": 1000 * statistics.mean(latencies),
+        "late_turns_mean_latency_ms": 1000 * statistics.mean(late_turns),
+        "session_context": context_stats,
+    }
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(f"{'mode':<9} {'turns':>5} {'req_bytes':>9} {'prompt_tok':>10} {'uncached_tok':>12} {'latency_ms':>10} {'late_ms':>8} {'wall_s':>7}")
+    for result in results:
+        print(
+            f"{result['mode']:<9} {result['turns']:>5} {result['mean_request_bytes']:>9.0f} {result['mean_prompt_tokens']:>10.0f} "
+            f"{result['mean_uncached_prompt_tokens']:>12.0f} {result['mean_latency_ms']:>10.1f} {result['late_turns_mean_latency_ms']:>8.1f} {result['wall_time_s']:>7.2f}"
+        )
+    for result in results:
+        context = result["session_context"]
+        if context.get("enabled"):
+            print(f"\nsession contexts: hit rate {context['hit_rate']:.0%}, ~{context['reused_tokens']} tokens reused, ~{context['new_tokens']} converted, {context['trims']} trims")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prompt size and latency of multi-turn session contexts versus context stuffed into every instruction.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="Modes to run, each in a fresh interpreter")
+    parser.add_argument("--conversations", type=int, default=4, help="Concurrent conversations (one task each)")
+    parser.add_argument("--turns", type=int, default=8, help="Turns per conversation")
+    parser.add_argument("--background-tokens", type=int, default=1500, help="Approximate size of the background sent with the conversation")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Stub LLM latency in seconds, before prefill")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=20000.0, help="Stub LLM prompt processing rate for uncached tokens")
+    parser.add_argument("--session-token-budget", type=int, default=8192, help="SESSION_CONTEXT_TOKEN_BUDGET of the agent")
+    parser.add_argument("--run", choices=MODES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run(args, args.run)))
+        return
+
+    results = []
+    for mode in args.modes:
+        command = [sys.executable, os.path.abspath(__file__), "--run", mode] + [
+            f"--conversations={args.conversations}", f"--turns={args.turns}", f"--background-tokens={args.background_tokens}",
+            f"--llm-latency={args.llm_latency}", f"--prefill-tokens-per-second={args.prefill_tokens_per_second}",
+            f"--session-token-budget={args.session_token_budget}",
+        ]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
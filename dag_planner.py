@@ -0,0 +1,301 @@
+import json
+import uuid
+import time
+import asyncio
+import logging
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+import planning_agent
+from planning_agent import PLANNING_AGENT_SYSTEM_PROMPT
+from communication_log import get_communication_log
+from planner_context import PlannerContext, create_planner_context_from_env, estimate_tokens
+from async_planning_agent import send_a2a_request_async
+from metrics import LLM_CALLS, LLM_CALL_SECONDS, new_trace_id, trace_metadata, write_metrics_from_env
+from a2a_models import SendTaskRequest, Message, TextPart, DataPart, TaskSendParams, TaskState
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the sub-tasks accepted from a single planning round
+MAX_PLAN_NODES = 16
+
+
+class PlanError(ValueError):
+    """Raised when the Planning LLM's sub-task DAG cannot be used."""
+
+
+@dataclass
+class PlanNode:
+    """One sub-task of a planning round, with the timings observed while it ran."""
+    id: str
+    instruction: str
+    depends_on: List[str] = field(default_factory=list)
+    sub_task_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+@dataclass
+class PlanRound:
+    index: int
+    nodes: Dict[str, PlanNode]
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    critical_path: List[str] = field(default_factory=list)
+
+    @property
+    def wall_time(self) -> float:
+        return self.finished_at - self.started_at
+
+    @property
+    def critical_path_time(self) -> float:
+        return sum(self.nodes[node_id].duration for node_id in self.critical_path)
+
+    @property
+    def sequential_time(self) -> float:
+        return sum(node.duration for node in self.nodes.values())
+
+
+@dataclass
+class DagRun:
+    """State of a goal driven by the fan-out planner; sub-tasks share `session_id`."""
+    goal: str
+    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    trace_id: str = field(default_factory=new_trace_id)
+    rounds: List[PlanRound] = field(default_factory=list)
+    history: List[Message] = field(default_factory=list)
+    context: Optional[PlannerContext] = field(default_factory=create_planner_context_from_env)
+    completed: bool = False
+    error: Optional[str] = None
+
+
+def build_dag_planning_prompt(run: DagRun) -> str:
+    """Builds the prompt asking the Planning LLM for the next round of sub-tasks as a DAG."""
+    def format_prompt(history_text: str) -> str:
+        return f"""{PLANNING_AGENT_SYSTEM_PROMPT}
+
+Current Task ID: {run.session_id}
+Task History:
+{history_text or "(no sub-tasks have run yet)"}
+
+The user's original goal: "{run.goal}".
+Break the remaining work into sub-tasks for the Execution Agent. Sub-tasks that do not depend on each
+other run in parallel; a sub-task receives the results of the sub-tasks it depends on.
+Respond with JSON only, in this form:
+{{"done": false, "nodes": [{{"id": "short_id", "instruction": "...", "depends_on": []}}]}}
+If the goal is complete based on the history, respond with {{"done": true, "nodes": []}}.
+"""
+
+    if run.context is None:
+        return format_prompt(json.dumps([msg.model_dump(mode="json", exclude_none=True) for msg in run.history], indent=2))
+    run.context.update(run.history)
+    return format_prompt(run.context.render(estimate_tokens(format_prompt(""))))
+
+
+def parse_plan(text: str) -> DataPart:
+    """Parses the Planning LLM's answer into a DataPart holding a validated sub-task DAG.
+
+    Accepts the JSON object on its own or surrounded by prose/code fences. "TASK_COMPLETE"
+    is read as a finished plan, and any other non-JSON answer as a single sub-task.
+    """
+    text = text.strip()
+    if text == "TASK_COMPLETE":
+        return DataPart(data={"done": True, "nodes": []})
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        plan = json.loads(text[start:end + 1]) if start != -1 and end > start else None
+    except json.JSONDecodeError:
+        plan = None
+    if not isinstance(plan, dict):
+        return DataPart(data={"done": False, "nodes": [{"id": "step", "instruction": text, "depends_on": []}]})
+
+    nodes = plan.get("nodes") or []
+    if not isinstance(nodes, list) or len(nodes) > MAX_PLAN_NODES:
+        raise PlanError(f"Plan must have a list of at most {MAX_PLAN_NODES} nodes")
+    normalized = []
+    for node in nodes:
+        if not isinstance(node, dict) or not node.get("id") or not node.get("instruction"):
+            raise PlanError(f"Invalid plan node: {node!r}")
+        normalized.append({"id": str(node["id"]), "instruction": str(node["instruction"]), "depends_on": [str(dep) for dep in node.get("depends_on") or []]})
+    topological_order([PlanNode(**node) for node in normalized])
+    return DataPart(data={"done": bool(plan.get("done")) and not normalized, "nodes": normalized})
+
+
+def topological_order(nodes: List[PlanNode]) -> List[str]:
+    """Orders the nodes so that every node comes after its dependencies; raises PlanError on bad edges or cycles."""
+    by_id = {node.id: node for node in nodes}
+    if len(by_id) != len(nodes):
+        raise PlanError("Plan node ids must be unique")
+    pending = {node.id: set(node.depends_on) for node in nodes}
+    for node_id, deps in pending.items():
+        unknown = deps - by_id.keys()
+        if unknown:
+            raise PlanError(f"Node {node_id} depends on unknown nodes {sorted(unknown)}")
+    order = []
+    while pending:
+        ready = sorted(node_id for node_id, deps in pending.items() if not deps)
+        if not ready:
+            raise PlanError(f"Plan has a dependency cycle among {sorted(pending)}")
+        for node_id in ready:
+            del pending[node_id]
+            order.append(node_id)
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return order
+
+
+def critical_path(nodes: Dict[str, PlanNode]) -> List[str]:
+    """Longest chain of dependent nodes by observed duration."""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for node_id in topological_order(list(nodes.values())):
+        node = nodes[node_id]
+        slowest_dep = max(node.depends_on, key=lambda dep: finish[dep], default=None)
+        finish[node_id] = (finish[slowest_dep] if slowest_dep else 0.0) + node.duration
+        previous[node_id] = slowest_dep
+    if not finish:
+        return []
+    path = [max(finish, key=finish.get)]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    return list(reversed(path))
+
+
+async def run_node(session: aiohttp.ClientSession, run: DagRun, node: PlanNode, done: Dict[str, asyncio.Event], nodes: Dict[str, PlanNode]) -> None:
+    """Waits for a node's dependencies, then sends it to the Execution Agent as its own sub-task."""
+    try:
+        for dep in node.depends_on:
+            await done[dep].wait()
+        failed = [dep for dep in node.depends_on if nodes[dep].error]
+        if failed:
+            node.error = f"skipped: dependencies failed ({', '.join(failed)})"
+            return
+
+        parts: List[Any] = [TextPart(text=node.instruction)]
+        if node.depends_on:
+            parts.append(DataPart(data={"dependencyResults": {dep: nodes[dep].result for dep in node.depends_on}}))
+        send_request = SendTaskRequest(
+            jsonrpc="2.0",
+            id=str(uuid.uuid4()),
+            params=TaskSendParams(
+                id=node.sub_task_id,
+                sessionId=run.session_id,
+                message=Message(role="user", parts=parts, metadata=trace_metadata(run.trace_id, planNode=node.id)),
+                historyLength=0 # The result is in status.message
+            )
+        )
+        node.started_at = time.perf_counter()
+        response = await send_a2a_request_async(session, send_request)
+        node.finished_at = time.perf_counter()
+        task = response.result if response else None
+        if task is None or task.status.state != TaskState.completed or task.status.message is None:
+            node.error = f"sub-task ended in state {task.status.state.value}" if task else "no valid response"
+            return
+        node.result = "\n".join(part.text for part in task.status.message.parts if isinstance(part, TextPart))
+    finally:
+        # Each sub-task is a single turn
+        planning_agent.release_task_route(node.sub_task_id)
+        done[node.id].set()
+
+
+async def run_round(session: aiohttp.ClientSession, run: DagRun, plan: DataPart) -> PlanRound:
+    """Dispatches every node of a plan as soon as its dependencies finish, then merges the results into the history."""
+    nodes = {node["id"]: PlanNode(**node) for node in plan.data["nodes"]}
+    plan_round = PlanRound(index=len(run.rounds) + 1, nodes=nodes)
+    done = {node_id: asyncio.Event() for node_id in nodes}
+    plan_round.started_at = time.perf_counter()
+    await asyncio.gather(*(run_node(session, run, node, done, nodes) for node in nodes.values()))
+    plan_round.finished_at = time.perf_counter()
+    plan_round.critical_path = critical_path(nodes)
+
+    # Merge back in dependency order so the next planning round reads a coherent history
+    for node_id in topological_order(list(nodes.values())):
+        node = nodes[node_id]
+        run.history.append(Message(role="user", parts=[TextPart(text=f"[{node.id}] {node.instruction}")]))
+        run.history.append(Message(role="agent", parts=[TextPart(text=f"[{node.id}] {node.result if node.error is None else 'Error: ' + node.error}")]))
+    return plan_round
+
+
+async def plan_round_async(run: DagRun) -> DataPart:
+    llm_provider = planning_agent.get_llm_provider()
+    if not llm_provider:
+        raise PlanError("LLM provider not initialized. Cannot use Planning LLM.")
+    prompt = build_dag_planning_prompt(run)
+    try:
+        with LLM_CALL_SECONDS.time(component=planning_agent.METRICS_COMPONENT):
+            plan_text = await llm_provider.generate_async([{"role": "user", "parts": [{"text": prompt}]}])
+        LLM_CALLS.inc(component=planning_agent.METRICS_COMPONENT, outcome="ok")
+    except Exception as e:
+        # Timeouts, connection and provider errors end the run like an unusable plan
+        LLM_CALLS.inc(component=planning_agent.METRICS_COMPONENT, outcome="error")
+        raise PlanError(f"Planning LLM failed - {e}") from e
+    return parse_plan(plan_text)
+
+
+async def run_dag_goal(goal: str, max_rounds: int = 3, max_parallel: int = 8) -> DagRun:
+    """Plans and executes a goal as rounds of concurrently dispatched sub-task DAGs."""
+    run = DagRun(goal=goal)
+    logger.info(f"Starting fan-out planning for session {run.session_id} (trace {run.trace_id})")
+    connector = aiohttp.TCPConnector(limit=max_parallel)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        while len(run.rounds) < max_rounds:
+            try:
+                plan = await plan_round_async(run)
+            except PlanError as e:
+                run.error = str(e)
+                logger.error(f"Planning round {len(run.rounds) + 1} failed: {e}")
+                break
+            get_communication_log().record("Planning Agent Planned Sub-tasks", plan.model_dump(mode="json"))
+            if plan.data["done"]:
+                run.completed = True
+                break
+            plan_round = await run_round(session, run, plan)
+            run.rounds.append(plan_round)
+            logger.info(
+                f"Round {plan_round.index}: {len(plan_round.nodes)} sub-tasks in {plan_round.wall_time:.2f}s "
+                f"(sequential {plan_round.sequential_time:.2f}s, critical path {plan_round.critical_path_time:.2f}s)"
+            )
+    return run
+
+
+def report(run: DagRun) -> None:
+    """Prints per-node timings of every round, marking the critical path."""
+    for plan_round in run.rounds:
+        print(f"Round {plan_round.index}: wall {plan_round.wall_time:.2f}s, sequential {plan_round.sequential_time:.2f}s, "
+              f"critical path {plan_round.critical_path_time:.2f}s ({' -> '.join(plan_round.critical_path)})")
+        print(f"  {'node':<16} {'depends_on':<24} {'start_s':>8} {'end_s':>8} {'dur_s':>7}  status")
+        for node in plan_round.nodes.values():
+            start = (node.started_at - plan_round.started_at) if node.started_at else 0.0
+            end = (node.finished_at - plan_round.started_at) if node.finished_at else 0.0
+            marker = "*" if node.id in plan_round.critical_path else " "
+            status = "ok" if node.error is None else node.error
+            print(f"{marker} {node.id:<16} {','.join(node.depends_on) or '-':<24} {start:>8.2f} {end:>8.2f} {node.duration:>7.2f}  {status}")
+    status = "completed" if run.completed else (run.error or "max rounds reached")
+    print(f"Session {run.session_id}: {len(run.rounds)} rounds, {status}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Plan a goal as DAGs of sub-tasks and execute independent ones concurrently.")
+    parser.add_argument("goal", nargs="?", default="Write a short report comparing three sorting algorithms.")
+    parser.add_argument("--max-rounds", type=int, default=3, help="Planning rounds before giving up")
+    parser.add_argument("--max-parallel", type=int, default=8, help="Maximum sub-tasks in flight")
+    args = parser.parse_args()
+    planning_agent.init()
+
+    dag_run = asyncio.run(run_dag_goal(args.goal, max_rounds=args.max_rounds, max_parallel=args.max_parallel))
+    report(dag_run)
+
+    # Make sure every queued record reaches the log before exiting
+    get_communication_log().flush(timeout=5.0)
+    write_metrics_from_env()
@@ -1,55 +1,285 @@
 import os
-import json
+import io
+import gzip
+import zlib
+import time
 import logging
+import threading
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterator
 
 from a2a_models import Part # Explicitly import Part for type hinting
+from communication_log import CommunicationLog, get_communication_log, rotated_paths
+from task_store import TaskStore, create_task_store_from_env
+from llm_executor import CancellableExecutor, CancellationToken, TaskCanceledError
+from push_notifications import PushNotificationSender
+from response_cache import ResponseCache, create_response_cache_from_env, cache_key, cache_directive
+from llm_providers import LLMProvider, create_provider
+from a2a_serialization import encode_model, decode_request, loads, dumps
+from blob_store import BlobStore, create_blob_store_from_env
+from payload_logging import PayloadLogger, configure_logging, get_payload_logger
+from micro_batcher import MicroBatcher, create_micro_batcher_from_env
+from router import register_agent, unregister_agent
+from task_sequencer import TaskSequencer, TaskBusyError, create_task_sequencer_from_env
+from session_context import SessionContextCache, create_session_context_cache_from_env
+from turn_pacing import AGENT_LOAD_KEY
+from metrics import (
+    REGISTRY, PROMETHEUS_CONTENT_TYPE, A2A_ACTIVE_REQUESTS, A2A_TURN_CONFLICTS, A2A_REQUESTS, A2A_REQUEST_SECONDS, A2A_PAYLOAD_BYTES, LLM_CALLS, LLM_CALL_SECONDS,
+    LLM_PROMPT_TOKENS, phase, trace_id_of, trace_metadata
+)
 
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, request, jsonify, Response, stream_with_context, send_file, abort, g
 from pydantic import ValidationError
-import google.generativeai as genai
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Import A2A models
 try:
     from a2a_models import (
-        SendTaskRequest, SendTaskResponse, Task, TaskStatus, TaskState, Message, TextPart, JSONRPCError, JSONRPCResponse
+        SendTaskRequest, SendTaskResponse, Task, TaskStatus, TaskState, Message, TextPart, FilePart, DataPart, FileContent,
+        JSONRPCError, JSONRPCResponse,
+        Artifact, SendTaskStreamingRequest, SendTaskStreamingResponse, TaskStatusUpdateEvent, TaskArtifactUpdateEvent,
+        GetTaskRequest, GetTaskResponse, CancelTaskRequest, CancelTaskResponse, SetTaskPushNotificationRequest,
+        GetTaskPushNotificationRequest, TaskResubscriptionRequest, SetTaskPushNotificationResponse,
+        GetTaskPushNotificationResponse, TaskPushNotificationConfig,
+        AgentCard, AgentCapabilities, AgentSkill, AgentLoad
     )
     logger.info("Successfully imported A2A models.")
 except ImportError as e:
     logger.error(f"Error importing A2A models: {e}")
     # Exit or handle the error appropriately if models cannot be imported
 
-# Configure Gemini
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    logger.error("GEMINI_API_KEY not found in environment variables.")
-    # In a real app, you might raise an exception or exit
-    # For this demo, we'll proceed but LLM calls will fail
-    genai_client = None
-else:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        # Use the specified model
-        genai_client = genai.GenerativeModel('gemini-1.5-flash-latest')
-        logger.info("Successfully configured Gemini client with gemini-1.5-flash-latest.")
-    except Exception as e:
-        logger.error(f"Error configuring Gemini client: {e}")
-        genai_client = None
+@dataclass
+class ExecutionAgentConfig:
+    """Process-level settings of the Execution Agent.
+
+    The task store, response cache, blob store, micro-batcher, communication log and LLM
+    backend keep reading their own environment variables when `create_app` builds them.
+    """
+    llm_max_workers: int = 8
+    # Deadline of each LLM job submitted to the executor, counted from submission (None: no deadline)
+    llm_timeout: Optional[float] = 120.0
+    # Responses at least this large are gzip-compressed for clients that accept it
+    gzip_min_response_bytes: int = 4096
+    # Largest request body accepted after gzip decompression
+    max_request_bytes: int = 16 * 1024 * 1024
+    push_queue_size: int = 1000
+    push_workers: int = 2
+    # Bounds on the webhook configs kept per task; by default those of the in-memory task store
+    push_max_configs: int = 10000
+    push_config_ttl_seconds: Optional[float] = 3600.0
+    # Base URL published in the Agent Card and the agent registry; defaults to the URL the card was requested on
+    public_url: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, dotenv: bool = True) -> "ExecutionAgentConfig":
+        """Reads the settings from the environment, after loading `.env` unless `dotenv` is False."""
+        if dotenv:
+            from dotenv import load_dotenv
+            load_dotenv()
+        llm_timeout = os.getenv("LLM_TIMEOUT_SECONDS", "120")
+        push_config_ttl = os.getenv("PUSH_CONFIG_TTL_SECONDS", os.getenv("TASK_STORE_TTL_SECONDS", "3600"))
+        return cls(
+            llm_max_workers=int(os.getenv("LLM_MAX_WORKERS", "8")),
+            llm_timeout=None if llm_timeout in ("", "none") else float(llm_timeout),
+            gzip_min_response_bytes=int(os.getenv("A2A_GZIP_MIN_BYTES", "4096")),
+            max_request_bytes=int(os.getenv("A2A_MAX_REQUEST_BYTES", str(16 * 1024 * 1024))),
+            push_queue_size=int(os.getenv("PUSH_QUEUE_SIZE", "1000")),
+            push_workers=int(os.getenv("PUSH_WORKERS", "2")),
+            push_max_configs=int(os.getenv("PUSH_MAX_CONFIGS", os.getenv("TASK_STORE_MAX_TASKS", "10000"))),
+            push_config_ttl_seconds=None if push_config_ttl in ("", "none") else float(push_config_ttl),
+            public_url=os.getenv("AGENT_PUBLIC_URL") or None,
+        )
+
+# Routes of the agent; registered on the application built by create_app
+a2a_blueprint = Blueprint("a2a", __name__)
+
+# Components shared by the request handlers, built by create_app (see there for each one's role)
+config: Optional[ExecutionAgentConfig] = None
+llm_provider: Optional[LLMProvider] = None
+comm_log: Optional[CommunicationLog] = None
+task_store: Optional[TaskStore] = None
+task_sequencer: Optional[TaskSequencer] = None
+llm_executor: Optional[CancellableExecutor] = None
+micro_batcher: Optional[MicroBatcher] = None
+session_contexts: Optional[SessionContextCache] = None
+response_cache: Optional[ResponseCache] = None
+blob_store: Optional[BlobStore] = None
+push_sender: Optional[PushNotificationSender] = None
+payload_log: Optional[PayloadLogger] = None
+
+_app: Optional[Flask] = None
+_app_lock = threading.Lock()
+
+class GzipRequestMiddleware:
+    """WSGI middleware that transparently decompresses gzip-encoded request bodies.
+
+    Bodies that are not valid gzip get a JSON-RPC parse error; bodies larger than
+    `max_body_bytes` (compressed or decompressed) are refused with 413, so a small
+    compressed request cannot expand into an unbounded one.
+    """
+
+    def __init__(self, wsgi_app, max_body_bytes: int = 16 * 1024 * 1024):
+        self.wsgi_app = wsgi_app
+        self.max_body_bytes = max_body_bytes
+
+    def __call__(self, environ, start_response):
+        if environ.get("HTTP_CONTENT_ENCODING", "").lower() == "gzip":
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            if length > self.max_body_bytes:
+                return self._error(start_response, "413 Request Entity Too Large", JSONRPC_INVALID_REQUEST, "Request body too large")
+            try:
+                body = self._decompress(environ["wsgi.input"].read(length))
+            except (OSError, EOFError, zlib.error) as e:
+                logger.warning(f"Rejected a gzip request body that could not be decompressed: {e}")
+                return self._error(start_response, "400 Bad Request", JSONRPC_PARSE_ERROR, "Invalid gzip request body")
+            if body is None:
+                return self._error(start_response, "413 Request Entity Too Large", JSONRPC_INVALID_REQUEST, "Request body too large")
+            environ["wsgi.input"] = io.BytesIO(body)
+            environ["CONTENT_LENGTH"] = str(len(body))
+            del environ["HTTP_CONTENT_ENCODING"]
+        return self.wsgi_app(environ, start_response)
+
+    def _decompress(self, data: bytes) -> Optional[bytes]:
+        """Decompresses every gzip member of `data`; returns None past `max_body_bytes`."""
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            chunk = decompressor.decompress(data, self.max_body_bytes - size + 1)
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                return None
+            chunks.append(chunk)
+            if not decompressor.eof:
+                if decompressor.unconsumed_tail:
+                    return None # Stopped at the size cap with input left
+                raise EOFError("Compressed body ended before the end-of-stream marker")
+            data = decompressor.unused_data
+            if not data:
+                return b"".join(chunks)
+
+    @staticmethod
+    def _error(start_response, status: str, code: int, message: str):
+        body = encode_model(JSONRPCResponse(jsonrpc="2.0", id=None, error=JSONRPCError(code=code, message=message)))
+        start_response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+        return [body]
+
+@a2a_blueprint.after_app_request
+def compress_response(response):
+    """Gzip-compresses large JSON responses when the client negotiates it."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype != "application/json"
+        or "Content-Encoding" in response.headers
+        or "gzip" not in request.headers.get("Accept-Encoding", "").lower()
+    ):
+        return response
+    data = response.get_data()
+    if len(data) < config.gzip_min_response_bytes:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=5))
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+# Set when the server starts draining, so that readiness probes take the worker out of rotation
+draining = threading.Event()
+
+# Component label of this agent's metrics (served at GET /metrics)
+METRICS_COMPONENT = "execution_agent"
+
+def task_store_size() -> Dict[tuple, float]:
+    if task_store is None:
+        return {}
+    stats = task_store.stats()
+    sizes = {("tasks",): stats.get("tasks")}
+    if "memory_bytes" in stats:
+        sizes[("bytes",)] = stats["memory_bytes"]
+    return sizes
 
-app = Flask(__name__)
+REGISTRY.gauge("a2a_task_store_size", "Tasks held by the task store, and their size in bytes for the memory backend.", ("unit",), task_store_size)
+REGISTRY.gauge(
+    "llm_batch_queue_depth", "LLM calls waiting in the micro-batcher queue.",
+    function=lambda: micro_batcher.stats()["queue_depth"] if micro_batcher is not None else None
+)
+REGISTRY.gauge(
+    "llm_batch_window_seconds", "Micro-batching collection window.",
+    function=lambda: micro_batcher.window if micro_batcher is not None else None
+)
+REGISTRY.gauge(
+    "llm_batch_mean_size", "Mean number of LLM calls per micro-batch.",
+    function=lambda: micro_batcher.stats()["mean_batch_size"] if micro_batcher is not None else None
+)
+REGISTRY.gauge(
+    "session_context_cached_tokens", "Estimated tokens of the multi-turn LLM contents cached per task.",
+    function=lambda: session_contexts.stats()["cached_tokens"] if session_contexts is not None else None
+)
 
-# In-memory task storage
-tasks: Dict[str, Task] = {}
+def create_app(agent_config: Optional[ExecutionAgentConfig] = None) -> Flask:
+    """Application factory: builds the agent's components and returns its Flask application.
+
+    Nothing is set up at import time; the LLM SDK is only loaded on the first LLM call.
+    The components are module-level singletons shared by the handlers, so a process hosts
+    one Execution Agent and later calls return the application built by the first one.
+    """
+    global _app, config, llm_provider, comm_log, task_store, task_sequencer, llm_executor, micro_batcher, session_contexts, response_cache, blob_store, push_sender, payload_log
+    with _app_lock:
+        if _app is not None:
+            return _app
+        config = agent_config or ExecutionAgentConfig.from_env()
+
+        # Configure logging (LOG_LEVEL, LOG_FORMAT=text|json, LOG_LEVELS per component)
+        configure_logging()
+        # Request and response payloads are logged as lazy summaries (PAYLOAD_LOG=off|summary|full)
+        payload_log = get_payload_logger("execution_agent", logger)
+
+        # Configure the LLM backend (LLM_BACKEND / EXECUTION_LLM_BACKEND: gemini or stub)
+        llm_provider = create_provider("execution")
+        # Asynchronous communication log shared by all request handlers
+        comm_log = get_communication_log()
+        # Task storage (backend selected by TASK_STORE_BACKEND: memory, sqlite or append-only)
+        task_store = create_task_store_from_env()
+        # Runs the turns of each task one at a time (TASK_TURN_MODE=queue) or refuses overlapping ones (reject)
+        task_sequencer = create_task_sequencer_from_env()
+        # Worker pool for LLM calls, so that tasks/cancel can interrupt in-flight generation
+        llm_executor = CancellableExecutor(max_workers=config.llm_max_workers, timeout=config.llm_timeout)
+        # Optional micro-batching of non-streaming LLM calls (None unless LLM_BATCHING=on)
+        micro_batcher = create_micro_batcher_from_env(llm_provider)
+        if micro_batcher is not None and config.llm_max_workers <= micro_batcher.max_batch_size:
+            # Each batched call holds an executor worker while it waits for its batch
+            logger.warning(
+                f"LLM_MAX_WORKERS ({config.llm_max_workers}) is not above LLM_BATCH_MAX_SIZE ({micro_batcher.max_batch_size}); "
+                "micro-batches cannot fill. Raise LLM_MAX_WORKERS to a multiple of the batch size."
+            )
+        # Multi-turn LLM contents per task, extended turn by turn (None when SESSION_CONTEXT=off)
+        session_contexts = create_session_context_cache_from_env(EXECUTION_AGENT_SYSTEM_PROMPT, message_to_llm_content)
+        # Content-addressed cache of LLM responses (None when RESPONSE_CACHE=off)
+        response_cache = create_response_cache_from_env()
+        # Content-addressed store for large file payloads, referenced from messages by blob URI
+        blob_store = create_blob_store_from_env()
+        # Outbound push notifications for tasks processed asynchronously
+        push_sender = PushNotificationSender(
+            max_queue_size=config.push_queue_size,
+            workers=config.push_workers,
+            max_configs=config.push_max_configs,
+            config_ttl_seconds=config.push_config_ttl_seconds,
+        )
+
+        flask_app = Flask(__name__)
+        flask_app.register_blueprint(a2a_blueprint)
+        flask_app.wsgi_app = GzipRequestMiddleware(flask_app.wsgi_app, max_body_bytes=config.max_request_bytes)
+        _app = flask_app
+        return flask_app
+
+def __getattr__(name: str) -> Any:
+    # `execution_agent.app` (as used by WSGI servers) builds the application on first access
+    if name == "app":
+        return create_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Execution Agent System Prompt
 EXECUTION_AGENT_SYSTEM_PROMPT = """You are an Execution Agent designed to fulfill specific instructions provided by a Planning Agent.
@@ -58,161 +288,831 @@ Do not engage in planning or complex reasoning. Focus solely on generating the o
 Your response will be used as a message back to the Planning Agent.
 """
 
-@app.route('/a2a/tasks/send', methods=['POST'])
-def send_task():
-    """Handles incoming A2A tasks/send requests."""
-    logger.info(f"Received POST request at /a2a/tasks/send")
-    request_payload = request.get_json()
-    logger.info(f"Request Payload: {json.dumps(request_payload, indent=2)}")
+def get_or_create_task(task_id: str, session_id: Optional[str] = None) -> Task:
+    """Retrieves a task from storage, creating it in the submitted state if it does not exist."""
+    with phase(METRICS_COMPONENT, "store"):
+        task = task_store.get(task_id)
+    if task is None:
+        logger.info(f"Task ID {task_id} not found. Creating new task.")
+        task = Task(
+            id=task_id,
+            sessionId=session_id,
+            status=TaskStatus(state=TaskState.submitted),
+            history=[]
+        )
+    else:
+        logger.info(f"Task ID {task_id} found. Appending new message.")
+        # Ensure history is a list before appending
+        if task.history is None:
+            task.history = []
+    return task
 
-    # Log the raw request payload to the communication log
-    with open("communication_log.txt", "a") as f:
-        f.write("--- Execution Agent Received Request ---\n")
-        f.write(json.dumps(request_payload, indent=2))
-        f.write("\n----------------------------------------\n")
+def extract_message_text(message: Message) -> str:
+    """Combines all text parts of a message into a single string."""
+    return "\n".join(part.text for part in message.parts or [] if isinstance(part, TextPart))
+
+# Non-text/* MIME types whose content is passed to the LLM as text
+TEXT_LIKE_MIME_TYPES = {"application/json", "application/xml", "application/x-yaml", "application/csv"}
+
+def file_part_to_llm_part(file: FileContent) -> Dict[str, Any]:
+    """Converts a file part to an LLM request part, reading spilled content from the blob store."""
+    data = file.bytes if file.bytes is not None else blob_store.get(file.uri)
+    label = f"File {file.name}" if file.name else "File"
+    if data is None:
+        # Content the agent cannot read (e.g. an external URI) is only referenced
+        return {"text": f"[{label} at {file.uri}]"}
+    mime_type = file.mimeType or "application/octet-stream"
+    if mime_type.startswith("text/") or mime_type in TEXT_LIKE_MIME_TYPES:
+        return {"text": f"{label} ({mime_type}):\n{str(data, 'utf-8', 'replace')}"}
+    # Binary content is handed over as is, without a base64 round trip
+    return {"inline_data": {"mime_type": mime_type, "data": data}}
+
+def message_to_llm_content(message: Message, preamble: Optional[str] = None) -> Dict[str, Any]:
+    """Converts an A2A message to an LLM content (Gemini format); agent messages become "model" turns.
+
+    Text parts are joined after the optional preamble (the system prompt); data parts are
+    added as compact JSON and file parts as text or inline data, depending on their MIME type.
+    """
+    text = extract_message_text(message)
+    llm_parts: List[Dict[str, Any]] = [{"text": preamble + "\n\n" + text if preamble else text}]
+    for part in message.parts or []:
+        if isinstance(part, DataPart):
+            llm_parts.append({"text": f"Data:\n{dumps(part.data).decode('utf-8')}"})
+        elif isinstance(part, FilePart):
+            llm_parts.append(file_part_to_llm_part(part.file))
+    return {"role": "model" if message.role == "agent" else "user", "parts": llm_parts}
+
+def build_llm_contents(message: Message) -> List[Dict[str, Any]]:
+    """Builds single-shot LLM request contents: the system prompt and the latest user message only."""
+    return [message_to_llm_content(message, EXECUTION_AGENT_SYSTEM_PROMPT)]
+
+def build_turn_contents(task: Task) -> List[Dict[str, Any]]:
+    """Builds the LLM request contents for the latest turn of a task.
+
+    With session contexts (SESSION_CONTEXT=on) this is the whole conversation as a multi-turn
+    chat, extended from the task's cached contents; otherwise the latest message alone.
+    """
+    if session_contexts is None:
+        return build_llm_contents(task.history[-1])
+    contents, stats = session_contexts.contents_for(task.id, task.history)
+    LLM_PROMPT_TOKENS.inc(stats.reused_tokens, component=METRICS_COMPONENT, source="reused")
+    LLM_PROMPT_TOKENS.inc(stats.new_tokens, component=METRICS_COMPONENT, source="new")
+    logger.debug(f"Session context for Task ID {task.id}: {stats.outcome}, {stats.messages} messages, ~{stats.reused_tokens} tokens reused, ~{stats.new_tokens} new.")
+    return contents
 
+def spill_large_parts(message: Message) -> None:
+    """Moves large inline file contents to the blob store, leaving a blob URI in their place."""
+    for part in message.parts or []:
+        if isinstance(part, FilePart) and part.file.bytes is not None and blob_store.should_spill(part.file.bytes):
+            uri = blob_store.put(part.file.bytes)
+            part.file = FileContent(name=part.file.name, mimeType=part.file.mimeType, uri=uri)
+            logger.info(f"Stored {part.file.name or 'file'} content in the blob store as {uri}.")
+
+def start_turn(task: Task, user_message: Message) -> None:
+    """Appends the user message (from the Planning Agent) to history and marks the task as working."""
+    spill_large_parts(user_message)
+    task.history.append(user_message)
+    task.status.state = TaskState.working
+    task.status.timestamp = datetime.utcnow().isoformat()
+    with phase(METRICS_COMPONENT, "store"):
+        task_store.save(task)
+    logger.info(f"Task {task.id} history updated. Current history length: {len(task.history or [])}")
+
+def complete_turn(task: Task, agent_response_text: str) -> Message:
+    """Appends the agent's response to history and marks the task as completed for this turn.
+
+    The response carries the trace ID of the user message it answers.
+    """
+    # Append the agent's response to history
+    if task.history is None:
+        task.history = []
+    trace_id = trace_id_of(task.history[-1].metadata) if task.history else None
+
+    # Create the agent's response message
+    text_part = TextPart(text=agent_response_text)
+    agent_parts: List[Part] = [text_part]
+    agent_message = Message(
+        role="agent",
+        parts=agent_parts,
+        metadata=trace_metadata(trace_id)
+    )
+    task.history.append(agent_message)
+
+    # Update task status to completed for this turn
+    task.status.state = TaskState.completed
+    task.status.timestamp = datetime.utcnow().isoformat()
+    task.status.message = agent_message # Set the final message for this turn
+    with phase(METRICS_COMPONENT, "store"):
+        task_store.save(task)
+
+    logger.info(f"Task {task.id} completed for this turn.")
+    return agent_message
+
+def windowed_task(task: Task, history_length: Optional[int] = None, history_offset: Optional[int] = None) -> Task:
+    """Returns a view of the task whose history is limited for the response.
+
+    `history_offset` (delta mode, sent by clients in `params.metadata.historyOffset`) skips the
+    messages the client already has; `history_length` then keeps only the last N messages.
+    The returned task's metadata records where the returned slice starts (`historyOffset`)
+    and the full history length (`historyTotal`), so clients can merge it into a local copy.
+    """
+    if history_length is None and history_offset is None:
+        return task
+    history = task.history or []
+    start = 0
+    if history_offset is not None:
+        start = min(max(int(history_offset), 0), len(history))
+    if history_length is not None:
+        start = max(start, len(history) - max(history_length, 0))
+    metadata = dict(task.metadata or {})
+    metadata.update({"historyOffset": start, "historyTotal": len(history)})
+    return task.model_copy(update={"history": history[start:], "metadata": metadata})
+
+def turn_result(task: Task, history_length: Optional[int] = None, history_offset: Optional[int] = None) -> Task:
+    """The windowed task returned for a turn, with the agent's load report in its metadata.
+
+    Planners read `metadata.agentLoad` to pace their next turn (see turn_pacing.TurnPacer).
+    """
+    view = windowed_task(task, history_length, history_offset)
+    metadata = dict(view.metadata or {})
+    metadata[AGENT_LOAD_KEY] = load_report()
+    return view.model_copy(update={"metadata": metadata})
+
+# JSON-RPC error codes, including the A2A-specific ones
+JSONRPC_PARSE_ERROR = -32700
+JSONRPC_INVALID_REQUEST = -32600
+JSONRPC_METHOD_NOT_FOUND = -32601
+JSONRPC_INVALID_PARAMS = -32602
+JSONRPC_INTERNAL_ERROR = -32603
+TASK_NOT_FOUND_ERROR = -32001
+TASK_NOT_CANCELABLE_ERROR = -32002
+PUSH_NOTIFICATION_NOT_SUPPORTED_ERROR = -32003
+UNSUPPORTED_OPERATION_ERROR = -32004
+# Not an A2A error code: another turn of the task is in progress (TASK_TURN_MODE=reject) or the wait for it timed out
+TASK_BUSY_ERROR = -32010
+
+# States from which a task has nothing left to cancel
+FINAL_TASK_STATES = {TaskState.completed, TaskState.canceled, TaskState.failed}
+
+def jsonrpc_error_response(request_id: Any, code: int, message: str, data: Optional[Dict[str, Any]] = None, http_status: int = 200):
+    """Builds a JSON-RPC error response and records it in the communication log."""
+    with phase(METRICS_COMPONENT, "serialization"):
+        error_body = encode_model(JSONRPCResponse(
+            jsonrpc="2.0",
+            id=request_id,
+            error=JSONRPCError(code=code, message=message, data=data)
+        ))
+    with phase(METRICS_COMPONENT, "logging"):
+        comm_log.record("Execution Agent Sent Response", error_body)
+    A2A_PAYLOAD_BYTES.observe(len(error_body), component=METRICS_COMPONENT, direction="response")
+    g.jsonrpc_error_code = code # Counted as an error outcome in the request metrics
+    return Response(error_body, status=http_status, mimetype="application/json")
+
+def task_busy_response(request_id: Any, error: TaskBusyError):
+    logger.warning(f"Refusing turn for Task ID {error.task_id}: {error.reason}")
+    A2A_TURN_CONFLICTS.inc(component=METRICS_COMPONENT, outcome="rejected")
+    return jsonrpc_error_response(request_id, TASK_BUSY_ERROR, "Task is busy", {"id": error.task_id, "reason": error.reason})
+
+def jsonrpc_result_response(response_model: Any, request_id: Any, result: Any):
+    """Builds a JSON-RPC result response and records it in the communication log."""
+    # Encoded once, straight to JSON bytes; the same bytes go on the wire and into the log
+    with phase(METRICS_COMPONENT, "serialization"):
+        response_body = encode_model(response_model(
+            jsonrpc="2.0",
+            id=request_id, # Use the same ID as the request
+            result=result
+        ))
+
+    payload_log.log("Sending response", response_body, request_id=request_id)
+
+    # Log the raw response payload to the communication log
+    with phase(METRICS_COMPONENT, "logging"):
+        comm_log.record("Execution Agent Sent Response", response_body)
+    A2A_PAYLOAD_BYTES.observe(len(response_body), component=METRICS_COMPONENT, direction="response")
+
+    return Response(response_body, mimetype="application/json")
+
+def generate_llm_text(task: Task, cache_mode: str, cancel_token: CancellationToken) -> str:
+    """Runs the LLM for the latest turn of a task on an executor worker.
+
+    The call is streamed internally so that a cancellation or the executor's deadline takes
+    effect between chunks. With micro-batching enabled the response arrives as a single chunk instead.
+    """
+    chunks: List[str] = []
+    for chunk_text in stream_llm_text(task, cache_mode, batched=True, timeout=cancel_token.remaining()):
+        cancel_token.raise_if_canceled()
+        chunks.append(chunk_text)
+    cancel_token.raise_if_canceled()
+    return "".join(chunks)
+
+def handle_send_task(send_task_request: SendTaskRequest):
+    """Handles tasks/send: runs one turn of the task and returns the updated task."""
+    task_params = send_task_request.params
+    task_id = task_params.id
+    user_message = task_params.message
+
+    logger.info(f"Validated request for Task ID: {task_id} (trace {trace_id_of(user_message.metadata) or '-'})")
+
+    # Checked before any work, since the offset is only applied once the turn has been stored
+    history_offset = (task_params.metadata or {}).get("historyOffset")
+    if history_offset is not None and (isinstance(history_offset, bool) or not isinstance(history_offset, int) or history_offset < 0):
+        return jsonrpc_error_response(
+            send_task_request.id, JSONRPC_INVALID_PARAMS, "Invalid parameters",
+            {"details": "metadata.historyOffset must be a non-negative integer"}, http_status=400
+        )
+
+    if task_params.pushNotification is not None:
+        push_sender.set_config(task_id, task_params.pushNotification)
+    if task_params.pushNotification is not None or (task_params.metadata or {}).get("async") is True:
+        return handle_send_task_async(send_task_request)
+
+    # Turns of the same task run one at a time, from reading the task to storing the reply
     try:
-        # Validate the request payload
-        send_task_request = SendTaskRequest(**request_payload)
-        task_params = send_task_request.params
-        task_id = task_params.id
-        user_message = task_params.message
-
-        logger.info(f"Validated request for Task ID: {task_id}")
-
-        # Retrieve or initialize the task
-        task = tasks.get(task_id)
-        if task is None:
-            logger.info(f"Task ID {task_id} not found. Creating new task.")
-            task = Task(
-                id=task_id,
-                status=TaskStatus(state=TaskState.submitted),
-                history=[]
-            )
-            tasks[task_id] = task
-        else:
-            logger.info(f"Task ID {task_id} found. Appending new message.")
-            # Ensure history is a list before appending
-            if task.history is None:
-                task.history = []
+        turn = acquire_turn(task_id)
+    except TaskBusyError as e:
+        return task_busy_response(send_task_request.id, e)
+    with turn:
+        return run_send_task_turn(send_task_request)
 
-        # Append the user message (from the Planning Agent) to history
-        task.history.append(user_message)
-        task.status.state = TaskState.working
-        task.status.timestamp = datetime.utcnow().isoformat()
+def acquire_turn(task_id: str, wait: Optional[bool] = None):
+    with phase(METRICS_COMPONENT, "turn_wait"):
+        turn = task_sequencer.acquire(task_id, wait)
+    if turn.waited > 0.001:
+        A2A_TURN_CONFLICTS.inc(component=METRICS_COMPONENT, outcome="queued")
+        logger.info(f"Turn for Task ID {task_id} waited {1000 * turn.waited:.1f}ms for earlier turns.")
+    return turn
 
-        logger.info(f"Task {task_id} history updated. Current history length: {len(task.history or [])}")
+def run_send_task_turn(send_task_request: SendTaskRequest):
+    """Runs one synchronous turn of tasks/send; the caller holds the task's turn."""
+    task_params = send_task_request.params
+    task_id = task_params.id
+    user_message = task_params.message
 
-        # Process the latest message using the LLM
-        agent_response_text = "Error: LLM not configured."
-        if genai_client:
-            try:
-                # Get the latest user message content
-                latest_user_message_content = ""
-                if user_message.parts:
-                    # Process all text parts in the message
-                    text_parts_content = []
-                    for part in user_message.parts:
-                        if isinstance(part, TextPart):
-                            text_parts_content.append(part.text)
-                        else:
-                            logger.warning(f"Skipping non-text part of type: {type(part)}")
-                    latest_user_message_content = "\n".join(text_parts_content)
-
-                logger.info(f"Sending combined user message content to LLM: '{latest_user_message_content[:100]}...'")
-
-                # Create the conversation history for the LLM, including the system prompt
-                # Note: Gemini's history format is different from A2A's.
-                # For this simple demo, we'll just send the latest message with the system prompt.
-                # A more complex agent might convert the A2A history to the LLM's format.
-
-                # For a simple echo task, we can just echo the text
-                # For an LLM task, we'd call the LLM here
-                # For this demo, let's use the LLM to process the request based on the prompt
-                llm_response = genai_client.generate_content(
-                    contents=[
-                        {"role": "user", "parts": [{"text": EXECUTION_AGENT_SYSTEM_PROMPT + "\n\n" + latest_user_message_content}]}
-                    ]
-                )
-
-                if hasattr(llm_response, 'text'):
-                    agent_response_text = llm_response.text
-                    logger.info(f"LLM generated response (text): '{agent_response_text[:100]}...'")
-                else:
-                     agent_response_text = str(llm_response)
-                     logger.warning(f"LLM response has no text attribute. Using string representation: {agent_response_text[:100]}...")
+    # Retrieve or initialize the task
+    task = get_or_create_task(task_id, task_params.sessionId)
+    start_turn(task, user_message)
 
+    # Process the latest message using the LLM on the cancellable executor
+    latest_user_message_content = extract_message_text(user_message)
+    logger.info(f"Sending combined user message content to LLM: '{latest_user_message_content[:100]}...'")
+    job = llm_executor.submit(task_id, generate_llm_text, task, cache_directive(task_params.metadata))
+    try:
+        with phase(METRICS_COMPONENT, "llm"):
+            agent_response_text = job.wait(job.token.remaining())
+        logger.info(f"LLM generated response (text): '{agent_response_text[:100]}...'")
+    except TimeoutError as e:
+        # The worker may still be blocked in the provider; it stops at its next chunk
+        job.token.cancel()
+        logger.error(f"LLM processing for Task ID {task_id} timed out: {e}")
+        agent_response_text = f"Error processing message with LLM: {e}"
+    except TaskCanceledError:
+        # tasks/cancel already moved the task to the canceled state; report it as stored
+        logger.info(f"Task {task_id} was canceled during LLM processing.")
+        task = task_store.get(task_id) or task
+        return jsonrpc_result_response(SendTaskResponse, send_task_request.id, turn_result(task, task_params.historyLength, (task_params.metadata or {}).get("historyOffset")))
+    except Exception as e:
+        logger.error(f"Error during LLM processing for Task ID {task_id}: {e}", exc_info=True)
+        agent_response_text = f"Error processing message with LLM: {e}"
 
-            except Exception as e:
-                logger.error(f"Error during LLM processing for Task ID {task_id}: {e}", exc_info=True)
-                agent_response_text = f"Error processing message with LLM: {e}"
+    # With several server workers, tasks/cancel may have been handled by another process
+    stored_task = task_store.get(task_id)
+    if stored_task is not None and stored_task.status.state == TaskState.canceled:
+        logger.info(f"Task {task_id} was canceled by another worker during LLM processing.")
+        return jsonrpc_result_response(SendTaskResponse, send_task_request.id, turn_result(stored_task, task_params.historyLength, (task_params.metadata or {}).get("historyOffset")))
+
+    complete_turn(task, agent_response_text)
+
+    # Construct the A2A response, returning only the requested part of the history
+    history_offset = (task_params.metadata or {}).get("historyOffset")
+    return jsonrpc_result_response(SendTaskResponse, send_task_request.id, turn_result(task, task_params.historyLength, history_offset))
+
+def process_task_async(task_id: str, history_length: Optional[int], history_offset: Optional[int], cache_mode: str, cancel_token: CancellationToken) -> None:
+    """Runs a submitted turn on an executor worker and pushes the result to the task's webhook."""
+    task = task_store.get(task_id)
+    if task is None:
+        logger.error(f"Task ID {task_id} disappeared before it could be processed.")
+        return
+    task.status.state = TaskState.working
+    task.status.timestamp = datetime.utcnow().isoformat()
+    task_store.save(task)
+
+    try:
+        agent_response_text = generate_llm_text(task, cache_mode, cancel_token)
+    except TaskCanceledError:
+        logger.info(f"Task {task_id} was canceled during asynchronous LLM processing.")
+        task = task_store.get(task_id) or task
+        push_sender.notify(task_id, encode_model(turn_result(task, history_length, history_offset)))
+        # The notification carries its own copy of the config
+        push_sender.remove_config(task_id)
+        raise
+    except Exception as e:
+        logger.error(f"Error during LLM processing for Task ID {task_id}: {e}", exc_info=True)
+        agent_response_text = f"Error processing message with LLM: {e}"
+
+    complete_turn(task, agent_response_text)
+    push_sender.notify(task_id, encode_model(turn_result(task, history_length, history_offset)))
+
+def handle_send_task_async(send_task_request: SendTaskRequest):
+    """Handles tasks/send in asynchronous mode: queues the turn and returns the task in the submitted state.
+
+    The result is delivered to the task's push notification webhook once a worker has processed it.
+    """
+    task_params = send_task_request.params
+    task_id = task_params.id
+
+    # The turn is held until the worker has processed it (or it was canceled), not just while submitting
+    try:
+        turn = acquire_turn(task_id)
+    except TaskBusyError as e:
+        return task_busy_response(send_task_request.id, e)
+    try:
+        task = get_or_create_task(task_id, task_params.sessionId)
+        spill_large_parts(task_params.message)
+        task.history.append(task_params.message)
+        task.status = TaskStatus(state=TaskState.submitted, timestamp=datetime.utcnow().isoformat())
+        task_store.save(task)
+
+        history_offset = (task_params.metadata or {}).get("historyOffset")
+        # The worker updates the stored task (the very same object with the memory backend), so the
+        # response is taken from a snapshot of the submitted state before the turn is handed over
+        submitted = turn_result(task.model_copy(deep=True), task_params.historyLength, history_offset)
+        job = llm_executor.submit(task_id, process_task_async, task_id, task_params.historyLength, history_offset, cache_directive(task_params.metadata))
+    except BaseException:
+        turn.release()
+        raise
+    job.add_done_callback(lambda job: turn.release())
+    logger.info(f"Task {task_id} submitted for asynchronous processing.")
+    return jsonrpc_result_response(SendTaskResponse, send_task_request.id, submitted)
+
+def handle_get_task(get_task_request: GetTaskRequest):
+    """Handles tasks/get: a read of the stored task that never touches the LLM."""
+    task_params = get_task_request.params
+    task = task_store.get(task_params.id)
+    if task is None:
+        return jsonrpc_error_response(get_task_request.id, TASK_NOT_FOUND_ERROR, "Task not found", {"id": task_params.id})
+    return jsonrpc_result_response(GetTaskResponse, get_task_request.id, windowed_task(task, task_params.historyLength))
+
+def handle_cancel_task(cancel_task_request: CancelTaskRequest):
+    """Handles tasks/cancel: interrupts in-flight LLM work and moves the task to the canceled state."""
+    task_id = cancel_task_request.params.id
+    task = task_store.get(task_id)
+    if task is None:
+        return jsonrpc_error_response(cancel_task_request.id, TASK_NOT_FOUND_ERROR, "Task not found", {"id": task_id})
+
+    in_flight = llm_executor.is_running(task_id)
+    if not in_flight and task.status.state in FINAL_TASK_STATES:
+        return jsonrpc_error_response(
+            cancel_task_request.id, TASK_NOT_CANCELABLE_ERROR, "Task cannot be canceled", {"id": task_id, "state": task.status.state.value}
+        )
+
+    # Store the canceled state before interrupting the work, so the interrupted request reports it
+    task.status = TaskStatus(state=TaskState.canceled, timestamp=datetime.utcnow().isoformat())
+    task_store.save(task)
+    if in_flight:
+        # An interrupted asynchronous turn still pushes the canceled task, then drops the webhook
+        llm_executor.cancel(task_id)
+    else:
+        push_sender.remove_config(task_id)
+    logger.info(f"Task {task_id} canceled.")
+    return jsonrpc_result_response(CancelTaskResponse, cancel_task_request.id, task)
+
+def handle_set_push_notification(push_request: SetTaskPushNotificationRequest):
+    """Handles tasks/pushNotification/set: registers the webhook that receives the task's results."""
+    task_id = push_request.params.id
+    if task_store.get(task_id) is None:
+        return jsonrpc_error_response(push_request.id, TASK_NOT_FOUND_ERROR, "Task not found", {"id": task_id})
+    push_sender.set_config(task_id, push_request.params.pushNotificationConfig)
+    return jsonrpc_result_response(SetTaskPushNotificationResponse, push_request.id, push_request.params)
+
+def handle_get_push_notification(push_request: GetTaskPushNotificationRequest):
+    """Handles tasks/pushNotification/get."""
+    task_id = push_request.params.id
+    if task_store.get(task_id) is None:
+        # Expired or evicted from the task store; its webhook goes with it
+        push_sender.remove_config(task_id)
+        return jsonrpc_error_response(push_request.id, TASK_NOT_FOUND_ERROR, "Task not found", {"id": task_id})
+    config = push_sender.get_config(task_id)
+    if config is None:
+        return jsonrpc_error_response(push_request.id, TASK_NOT_FOUND_ERROR, "No push notification config for task", {"id": task_id})
+    return jsonrpc_result_response(
+        GetTaskPushNotificationResponse, push_request.id, TaskPushNotificationConfig(id=task_id, pushNotificationConfig=config)
+    )
+
+def handle_unsupported_operation(a2a_request: Any):
+    """Handles methods that are modelled but not implemented by this agent."""
+    return jsonrpc_error_response(a2a_request.id, UNSUPPORTED_OPERATION_ERROR, "This operation is not supported", {"method": a2a_request.method})
+
+def format_sse_event(request_id: Any, event: Any) -> bytes:
+    """Wraps a streaming event in a JSON-RPC response and formats it as a Server-Sent Event."""
+    event_body = encode_model(SendTaskStreamingResponse(jsonrpc="2.0", id=request_id, result=event))
+    comm_log.record("Execution Agent Sent Event", event_body)
+    return b"data: " + event_body + b"\n\n"
+
+def stream_llm_text(task: Task, cache_mode: str = "use", batched: bool = False, timeout: Optional[float] = None) -> Iterator[str]:
+    """Yields text chunks from a streaming LLM call.
+
+    A cached response is yielded as a single chunk. A fresh response is cached only
+    once the stream has been consumed completely. With `batched`, and micro-batching
+    enabled, the call goes through the micro-batcher and yields one chunk, waiting for it
+    at most `timeout` seconds; otherwise a stream still running after `timeout` seconds
+    raises TimeoutError at its next chunk.
+    """
+    if not llm_provider:
+        logger.warning("LLM provider not initialized. Cannot process LLM request.")
+        yield "Error: LLM not configured."
+        return
+    task_id = task.id
+    contents = build_turn_contents(task)
+
+    key = None
+    if response_cache is not None and cache_mode != "off":
+        key = cache_key(llm_provider.model_name, contents, llm_provider.generation_config)
+        if cache_mode == "use":
+            cached_text = response_cache.get(key)
+            if cached_text is not None:
+                logger.info(f"Response cache hit for Task ID {task_id}.")
+                LLM_CALLS.inc(component=METRICS_COMPONENT, outcome="cache_hit")
+                yield cached_text
+                return
+
+    chunks: List[str] = []
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        if batched and micro_batcher is not None:
+            chunks.append(micro_batcher.generate(contents, timeout=timeout))
+            yield chunks[0]
         else:
-             logger.warning("Gemini client not initialized. Cannot process LLM request.")
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            for chunk_text in llm_provider.stream(contents):
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"LLM call did not finish in {timeout:.1f}s")
+                chunks.append(chunk_text)
+                yield chunk_text
+        outcome = "ok"
+    except TimeoutError:
+        outcome = "timeout"
+        raise
+    except GeneratorExit:
+        outcome = "canceled" # The consumer stopped reading, e.g. after tasks/cancel
+        raise
+    finally:
+        LLM_CALLS.inc(component=METRICS_COMPONENT, outcome=outcome)
+        LLM_CALL_SECONDS.observe(time.perf_counter() - start, component=METRICS_COMPONENT)
 
+    if key is not None and chunks:
+        response_cache.put(key, "".join(chunks))
 
-        # Create the agent's response message
-        text_part = TextPart(text=agent_response_text)
-        agent_parts: List[Part] = [text_part]
-        agent_message = Message(
-            role="agent",
-            parts=agent_parts
+def warm_response_cache(log_path: str) -> int:
+    """Pre-populates the response cache from a JSONL communication log and its rotated backups.
+
+    With session contexts, a turn's cache key covers the whole conversation, so each task's
+    history is rebuilt from the logged exchanges and keyed the way `build_turn_contents` does.
+    Tasks whose conversation the log does not hold completely (turns rotated away, streamed,
+    pushed or canceled) are skipped, so no reply is stored under a key of a shorter conversation.
+    """
+    if response_cache is None or llm_provider is None:
+        return 0
+    warm_contexts = None
+    if session_contexts is not None:
+        warm_contexts = SessionContextCache(
+            EXECUTION_AGENT_SYSTEM_PROMPT, message_to_llm_content,
+            session_token_budget=session_contexts.session_token_budget, total_token_budget=session_contexts.total_token_budget
         )
+    histories: Dict[str, List[Message]] = {}
+    incomplete = set()
 
-        # Append the agent's response to history
-        if task.history is None:
-            task.history = []
-        task.history.append(agent_message)
+    def key_for_exchange(params: Dict[str, Any], result: Dict[str, Any]) -> Optional[str]:
+        try:
+            task_id = params["id"]
+            message = Message(**params["message"])
+        except (KeyError, TypeError, ValidationError):
+            return None
+        if warm_contexts is None:
+            return cache_key(llm_provider.model_name, build_llm_contents(message), llm_provider.generation_config)
+        if task_id in incomplete:
+            return None
+        history = histories.setdefault(task_id, [])
+        history.append(message)
+        # The response holds the task's full history, or reports its length when windowed
+        history_total = (result.get("metadata") or {}).get("historyTotal", len(result.get("history") or []))
+        reply = (result.get("status") or {}).get("message") or {}
+        reply_text = "".join(part.get("text", "") for part in reply.get("parts", []) if part.get("type") == "text")
+        if history_total != len(history) + 1 or (result.get("status") or {}).get("state") != TaskState.completed.value:
+            incomplete.add(task_id)
+            histories.pop(task_id, None)
+            warm_contexts.forget(task_id)
+            return None
+        contents, _ = warm_contexts.contents_for(task_id, history)
+        history.append(Message(role="agent", parts=[TextPart(text=reply_text)]))
+        return cache_key(llm_provider.model_name, contents, llm_provider.generation_config)
 
-        # Update task status to completed for this turn
-        task.status.state = TaskState.completed
-        task.status.timestamp = datetime.utcnow().isoformat()
-        task.status.message = agent_message # Set the final message for this turn
+    return response_cache.warm_from_log(rotated_paths(log_path), key_for_exchange)
 
-        logger.info(f"Task {task_id} completed for this turn.")
+def handle_send_task_subscribe(streaming_request: SendTaskStreamingRequest):
+    """Handles tasks/sendSubscribe, streaming the response as Server-Sent Events."""
+    task_params = streaming_request.params
+    task_id = task_params.id
+    user_message = task_params.message
+    logger.info(f"Validated streaming request for Task ID: {task_id}")
 
-        # Construct the A2A response
-        response_payload = SendTaskResponse(
-            jsonrpc="2.0",
-            id=send_task_request.id, # Use the same ID as the request
-            result=task
-        ).model_dump(exclude_none=True) # Use model_dump for Pydantic v2
+    # The turn is held until the stream ends; a busy task is refused before the stream starts
+    try:
+        turn = acquire_turn(task_id)
+    except TaskBusyError as e:
+        return task_busy_response(streaming_request.id, e)
+
+    def generate() -> Iterator[str]:
+        with turn:
+            yield from stream_turn()
+
+    def stream_turn() -> Iterator[str]:
+        task = get_or_create_task(task_id, task_params.sessionId)
+        start_turn(task, user_message)
+        yield format_sse_event(streaming_request.id, TaskStatusUpdateEvent(id=task_id, status=task.status.model_copy()))
 
-        logger.info(f"Sending Response Payload for Task ID {task_id}: {json.dumps(response_payload, indent=2)}")
+        chunks: List[str] = []
+        with llm_executor.track(task_id) as cancel_token:
+            try:
+                for chunk_text in stream_llm_text(task, cache_directive(task_params.metadata), timeout=cancel_token.remaining()):
+                    if cancel_token.canceled:
+                        break
+                    # Each chunk extends the same artifact; only the first one starts it
+                    yield format_sse_event(streaming_request.id, TaskArtifactUpdateEvent(
+                        id=task_id,
+                        artifact=Artifact(name="response", parts=[TextPart(text=chunk_text)], index=0, append=bool(chunks), lastChunk=False)
+                    ))
+                    chunks.append(chunk_text)
+            except Exception as e:
+                logger.error(f"Error during LLM streaming for Task ID {task_id}: {e}", exc_info=True)
+                chunks.append(f"Error processing message with LLM: {e}")
+
+        if cancel_token.canceled:
+            # tasks/cancel already stored the canceled state
+            logger.info(f"Task {task_id} was canceled during LLM streaming.")
+            task = task_store.get(task_id) or task
+            yield format_sse_event(streaming_request.id, TaskStatusUpdateEvent(id=task_id, status=task.status.model_copy(), final=True))
+            return
+
+        # Close the artifact with an empty final chunk, since the last LLM chunk is only known once the stream ends
+        yield format_sse_event(streaming_request.id, TaskArtifactUpdateEvent(
+            id=task_id,
+            artifact=Artifact(name="response", parts=[TextPart(text="")], index=0, append=True, lastChunk=True)
+        ))
+
+        agent_response_text = "".join(chunks)
+        task.artifacts = [Artifact(name="response", parts=[TextPart(text=agent_response_text)], index=0)]
+        complete_turn(task, agent_response_text)
+        yield format_sse_event(streaming_request.id, TaskStatusUpdateEvent(
+            id=task_id, status=task.status.model_copy(), final=True, metadata={AGENT_LOAD_KEY: load_report()}
+        ))
 
-        # Log the raw response payload to the communication log
-        with open("communication_log.txt", "a") as f:
-            f.write("--- Execution Agent Sent Response ---\n")
-            f.write(json.dumps(response_payload, indent=2))
-            f.write("\n---------------------------------------\n")
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+    # Also releases the turn if the client goes away before the stream starts
+    response.call_on_close(turn.release)
+    return response
+
+# JSON-RPC method -> (request model, handler)
+A2A_METHOD_HANDLERS = {
+    "tasks/send": (SendTaskRequest, handle_send_task),
+    "tasks/sendSubscribe": (SendTaskStreamingRequest, handle_send_task_subscribe),
+    "tasks/get": (GetTaskRequest, handle_get_task),
+    "tasks/cancel": (CancelTaskRequest, handle_cancel_task),
+    "tasks/pushNotification/set": (SetTaskPushNotificationRequest, handle_set_push_notification),
+    "tasks/pushNotification/get": (GetTaskPushNotificationRequest, handle_get_push_notification),
+    "tasks/resubscribe": (TaskResubscriptionRequest, handle_unsupported_operation),
+}
+
+def invalid_request_response(raw_payload: bytes):
+    """Builds the JSON-RPC error for a request that failed fast-path validation."""
+    try:
+        request_payload = loads(raw_payload)
+    except ValueError:
+        return jsonrpc_error_response(None, JSONRPC_PARSE_ERROR, "Invalid JSON payload", http_status=400)
+    if not isinstance(request_payload, dict):
+        # Valid JSON, but not a request object (batches are not supported)
+        return jsonrpc_error_response(None, JSONRPC_INVALID_REQUEST, "Request is not a valid JSON-RPC request", http_status=400)
+
+    # Log the raw request payload to the communication log
+    comm_log.record("Execution Agent Received Request", raw_payload)
 
-        return jsonify(response_payload)
+    request_id = request_payload.get('id') # Use the request ID if available
+    method = request_payload.get("method")
+    if not isinstance(method, str):
+        return jsonrpc_error_response(request_id, JSONRPC_INVALID_REQUEST, "Request is not a valid JSON-RPC request", http_status=400)
+    if method not in A2A_METHOD_HANDLERS:
+        return jsonrpc_error_response(request_id, JSONRPC_METHOD_NOT_FOUND, "Method not found", {"method": method}, http_status=400)
+    request_model, _ = A2A_METHOD_HANDLERS[method]
 
+    try:
+        request_model.model_validate(request_payload)
     except ValidationError as e:
-        logger.error(f"Request validation failed: {e.errors()}", exc_info=True)
-        error_response = JSONRPCResponse(
-            jsonrpc="2.0",
-            id=request_payload.get('id'), # Use the request ID if available
-            error=JSONRPCError(code=-32602, message="Invalid parameters", data={"details": str(e.errors())})
-        ).model_dump(exclude_none=True)
-        return jsonify(error_response), 400 # Bad Request
+        logger.error(f"Request validation failed: {e.errors()}")
+        return jsonrpc_error_response(request_id, JSONRPC_INVALID_PARAMS, "Invalid parameters", {"details": str(e.errors())}, http_status=400) # Bad Request
+    return jsonrpc_error_response(request_id, JSONRPC_INVALID_REQUEST, "Request is not a valid JSON-RPC request", http_status=400)
+
+def dispatch_a2a_request():
+    """Validates a JSON-RPC request and routes it to the handler of its A2A method.
+
+    Valid requests are parsed and validated in a single pass straight from the request
+    body; only invalid ones are decoded again to work out which error to report.
+    """
+    logger.info(f"Received POST request at {request.path}")
+    start = time.perf_counter()
+    raw_payload = request.get_data()
+    A2A_PAYLOAD_BYTES.observe(len(raw_payload), component=METRICS_COMPONENT, direction="request")
+    try:
+        with phase(METRICS_COMPONENT, "validation"):
+            a2a_request = decode_request(raw_payload)
+    except ValidationError:
+        return record_request_metrics("invalid", invalid_request_response(raw_payload), start)
+    payload_log.log("Received request", raw_payload, method=a2a_request.method)
 
+    # Log the raw request payload to the communication log
+    with phase(METRICS_COMPONENT, "logging"):
+        comm_log.record("Execution Agent Received Request", raw_payload)
+
+    _, handler = A2A_METHOD_HANDLERS[a2a_request.method]
+    A2A_ACTIVE_REQUESTS.inc(component=METRICS_COMPONENT)
+    try:
+        response = handler(a2a_request)
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}", exc_info=True)
-        error_response = JSONRPCResponse(
-            jsonrpc="2.0",
-            id=request_payload.get('id'), # Use the request ID if available
-            error=JSONRPCError(code=-32603, message="Internal error", data={"details": str(e)})
-        ).model_dump(exclude_none=True)
-        return jsonify(error_response), 500 # Internal Server Error
+        response = jsonrpc_error_response(a2a_request.id, JSONRPC_INTERNAL_ERROR, "Internal error", {"details": str(e)}, http_status=500) # Internal Server Error
+    finally:
+        A2A_ACTIVE_REQUESTS.dec(component=METRICS_COMPONENT)
+    return record_request_metrics(a2a_request.method, response, start)
+
+def record_request_metrics(method: str, response: Response, start: float) -> Response:
+    """Counts a handled request by method and outcome, and records its latency."""
+    outcome = "error" if response.status_code >= 400 or g.get("jsonrpc_error_code") is not None else "ok"
+    A2A_REQUESTS.inc(component=METRICS_COMPONENT, method=method, outcome=outcome)
+    A2A_REQUEST_SECONDS.observe(time.perf_counter() - start, component=METRICS_COMPONENT, method=method)
+    return response
+
+@a2a_blueprint.route('/a2a', methods=['POST'])
+def a2a_endpoint():
+    """Single JSON-RPC endpoint for every A2A method."""
+    return dispatch_a2a_request()
+
+@a2a_blueprint.route('/a2a/tasks/send', methods=['POST'])
+def send_task():
+    """Handles incoming A2A tasks/send requests."""
+    return dispatch_a2a_request()
+
+@a2a_blueprint.route('/a2a/tasks/sendSubscribe', methods=['POST'])
+def send_task_subscribe():
+    """Handles incoming A2A tasks/sendSubscribe requests."""
+    return dispatch_a2a_request()
+
+@a2a_blueprint.route('/a2a/store/stats', methods=['GET'])
+def task_store_stats():
+    """Reports task store size, hit/miss rates and eviction counts."""
+    return jsonify(task_store.stats())
+
+@a2a_blueprint.route('/a2a/cache/stats', methods=['GET'])
+def response_cache_stats():
+    """Reports response cache hit/miss counts."""
+    return jsonify(response_cache.stats() if response_cache is not None else {"enabled": False})
+
+@a2a_blueprint.route('/a2a/turns/stats', methods=['GET'])
+def task_turn_stats():
+    """Reports per-task turn sequencing: queued, rejected and timed-out turns, and mean wait."""
+    return jsonify(task_sequencer.stats())
+
+@a2a_blueprint.route('/a2a/context/stats', methods=['GET'])
+def session_context_stats():
+    """Reports session context reuse: hits, cached tokens, and prompt tokens reused versus converted."""
+    return jsonify(session_contexts.stats() if session_contexts is not None else {"enabled": False})
+
+@a2a_blueprint.route('/a2a/batcher/stats', methods=['GET'])
+def micro_batcher_stats():
+    """Reports micro-batching window, batch sizes, queue depth and rate-limit waits."""
+    return jsonify(micro_batcher.stats() if micro_batcher is not None else {"enabled": False})
+
+@a2a_blueprint.route('/a2a/blobs/<digest>', methods=['GET'])
+def get_blob(digest: str):
+    """Serves a payload stored in the blob store, for clients resolving blob: URIs."""
+    path = blob_store.path(blob_store.uri_for(digest))
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype="application/octet-stream")
+
+# Version published in the Agent Card
+AGENT_VERSION = "1.0.0"
+
+def current_load() -> AgentLoad:
+    """The agent's own view of its load, published in the Agent Card for routers."""
+    return AgentLoad(
+        activeRequests=int(A2A_ACTIVE_REQUESTS.value(component=METRICS_COMPONENT)),
+        llmInFlight=llm_executor.in_flight(),
+        llmMaxWorkers=config.llm_max_workers,
+        llmQueueDepth=micro_batcher.stats()["queue_depth"] if micro_batcher is not None else 0,
+        tasks=task_store.stats().get("tasks"),
+        accepting=not draining.is_set(),
+    )
+
+def load_report() -> Dict[str, Any]:
+    """The backpressure signal attached to turn results: LLM work in flight and queued per LLM worker.
+
+    Cheaper than `current_load`, since it is computed for every turn and never reads the task store.
+    """
+    in_flight = llm_executor.in_flight()
+    queued = micro_batcher.stats()["queue_depth"] if micro_batcher is not None else 0
+    return {
+        "utilization": round((in_flight + queued) / max(config.llm_max_workers, 1), 3),
+        "llmInFlight": in_flight,
+        "llmQueueDepth": queued,
+        "accepting": not draining.is_set(),
+    }
+
+@a2a_blueprint.route('/.well-known/agent.json', methods=['GET'])
+def agent_card():
+    """Publishes the A2A Agent Card: endpoint, capabilities, skills and current load."""
+    card = AgentCard(
+        name="Execution Agent",
+        description="Executes instructions from a Planning Agent with an LLM, keeping each task's history.",
+        url=(config.public_url or request.host_url).rstrip("/") + "/a2a",
+        version=AGENT_VERSION,
+        capabilities=AgentCapabilities(streaming=True, pushNotifications=True, stateTransitionHistory=True),
+        defaultInputModes=["text", "file", "data"],
+        defaultOutputModes=["text"],
+        skills=[
+            AgentSkill(
+                id="execute-instruction",
+                name="Execute instruction",
+                description="Carries out one instruction in the context of the task's history and replies with the result.",
+                tags=["execution", "llm"],
+            )
+        ],
+        load=current_load(),
+    )
+    response = Response(encode_model(card), content_type="application/json")
+    response.headers["Cache-Control"] = "no-store" # The load changes with every request
+    return response
+
+@a2a_blueprint.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint; each server worker process reports its own metrics."""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@a2a_blueprint.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness probe: the worker process is up and serving requests."""
+    return jsonify({"status": "ok"})
+
+@a2a_blueprint.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: the worker is not draining and its dependencies are usable."""
+    checks = {
+        "accepting": not draining.is_set(),
+        "task_store": task_store.ping(),
+        "llm": llm_provider is not None,
+    }
+    ready = all(checks.values())
+    return jsonify({"status": "ready" if ready else "unavailable", "checks": checks}), 200 if ready else 503
+
+def begin_drain() -> None:
+    """Marks the worker as draining; in-flight requests still complete."""
+    if not draining.is_set():
+        logger.info("Execution Agent draining: readiness probe now reports unavailable.")
+    draining.set()
+
+def shutdown() -> None:
+    """Releases background resources once in-flight requests have finished."""
+    begin_drain()
+    if _app is None:
+        return # The application was never built
+    llm_executor.shutdown(wait=True)
+    if micro_batcher is not None:
+        micro_batcher.close()
+    push_sender.close() # Delivers notifications that are already queued
+    comm_log.close()
+    task_store.close()
 
 if __name__ == '__main__':
-    # Ensure communication_log.txt exists or is cleared for a new run
-    if os.path.exists("communication_log.txt"):
-        os.remove("communication_log.txt")
-    # Create an empty log file
-    open("communication_log.txt", "w").close()
-    logger.info("communication_log.txt initialized.")
-
-    # Run the Flask app
+    app = create_app()
+
+    # Ensure the communication log is cleared for a new run
+    # (render it with `python communication_log.py` to get the human-readable layout)
+    # Warm the response cache from the previous run's log before it is cleared
+    warm_log_path = os.getenv("RESPONSE_CACHE_WARM_LOG")
+    if warm_log_path:
+        warm_response_cache(warm_log_path)
+
+    comm_log.reset()
+    logger.info("Communication log initialized.")
+
+    # Announce the agent in the local registry the Planning Agent's router discovers agents from
+    registry_dir = os.getenv("EXECUTION_AGENT_REGISTRY")
+    public_url = config.public_url or "http://localhost:5000"
+    if registry_dir:
+        register_agent(registry_dir, public_url)
+
+    # Run the Flask development server (use `python serve.py` in production)
     # Use a specific port, e.g., 5000
-    app.run(port=5000, debug=True, use_reloader=False) # use_reloader=False to avoid running twice
+    try:
+        app.run(port=5000, debug=True, use_reloader=False) # use_reloader=False to avoid running twice
+    finally:
+        if registry_dir:
+            unregister_agent(registry_dir, public_url)
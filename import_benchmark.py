@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, Any, List, Tuple
+
+# Modules whose cold start is measured by default
+DEFAULT_MODULES = ["execution_agent", "planning_agent"]
+
+# Builds the Execution Agent's application after importing it
+APP_STARTUP_CODE = "import time, execution_agent; t = time.perf_counter(); execution_agent.create_app(); print(time.perf_counter() - t)"
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Parses `-X importtime` output into (module, self us, cumulative us) rows, in import order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue # Header line
+        rows.append((fields[2][1:].rstrip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def measure_import(module: str, env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    """Imports `module` in a fresh interpreter with `-X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_app_startup(env: Dict[str, str]) -> float:
+    result = subprocess.run([sys.executable, "-c", APP_STARTUP_CODE], env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def run(modules: List[str], repeat: int, top: int, env: Dict[str, str], app: bool) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for module in modules:
+        totals = []
+        runs = []
+        for _ in range(repeat):
+            rows = measure_import(module, env)
+            runs.append(rows)
+            totals.append(next(cumulative for name, _, cumulative in rows if name.strip() == module))
+        # Report the heaviest imports of the median run
+        median_rows = sorted(zip(totals, range(len(runs))))[len(runs) // 2]
+        rows = runs[median_rows[1]]
+        top_level = sorted(
+            ((name.strip(), cumulative) for name, _, cumulative in rows if name.startswith("  ") and not name.startswith("   ")),
+            key=lambda row: row[1], reverse=True
+        )
+        results[module] = {
+            "median_ms": statistics.median(totals) / 1000,
+            "min_ms": min(totals) / 1000,
+            "modules_imported": len(rows),
+            "top_imports_ms": [(name, cumulative / 1000) for name, cumulative in top_level[:top]],
+        }
+    if app:
+        results["execution_agent.create_app"] = {"median_ms": 1000 * statistics.median(measure_app_startup(env) for _ in range(repeat))}
+    return results
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    for name, result in results.items():
+        if "top_imports_ms" not in result:
+            print(f"\n{name}: {result['median_ms']:.1f} ms (median)")
+            continue
+        print(f"\nimport {name}: {result['median_ms']:.1f} ms median, {result['min_ms']:.1f} ms min, {result['modules_imported']} modules")
+        for module, ms in result["top_imports_ms"]:
+            print(f"  {module:<32} {ms:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold-start cost of the agents, measured with python -X importtime in fresh interpreters.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (the median is reported)")
+    parser.add_argument("--top", type=int, default=8, help="Number of direct imports listed per module")
+    parser.add_argument("--no-app", action="store_true", help="Skip timing execution_agent.create_app()")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # The agents' import must not depend on a reachable LLM; the stub backend needs no credentials
+    env = dict(os.environ)
+    env.setdefault("LLM_BACKEND", "stub")
+    env.setdefault("LOG_LEVEL", "WARNING")
+
+    results = run(args.modules, args.repeat, args.top, env, not args.no_app)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TaskCanceledError(Exception):
+    """Raised when the LLM work for a task is canceled."""
+
+
+class CancellationToken:
+    """Cooperative cancellation flag checked by LLM work between chunks.
+
+    It also carries the work's deadline (a `time.monotonic()` value), if any, so that
+    blocking calls made by the work can be bounded by `remaining()`.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def canceled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_canceled(self) -> None:
+        if self._event.is_set():
+            raise TaskCanceledError()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline (at least 0), or None without a deadline."""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+
+class LLMJob:
+    """Handle for LLM work submitted to the CancellableExecutor."""
+
+    def __init__(self, task_id: str, token: CancellationToken):
+        self.task_id = task_id
+        self.token = token
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[["LLMJob"], None]] = []
+
+    def _finish(self, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.result = result
+            self.error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    def _run_callback(self, callback: Callable[["LLMJob"], None]) -> None:
+        try:
+            callback(self)
+        except Exception as e:
+            logger.error(f"Done callback of the LLM job for Task ID {self.task_id} failed: {e}", exc_info=True)
+
+    def add_done_callback(self, callback: Callable[["LLMJob"], None]) -> None:
+        """Calls `callback(job)` once the job finishes or is canceled (right away if it already has)."""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run_callback(callback)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Waits for the job and returns its result; raises TaskCanceledError if it was canceled."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"LLM work for Task ID {self.task_id} did not finish in {timeout:.1f}s")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class CancellableExecutor:
+    """Runs LLM work on a worker pool so that it can be canceled per task.
+
+    Canceling a job wakes up whoever is waiting on it immediately, so the request
+    thread is released right away; the worker thread stops at its next cancellation
+    check (for streaming generation, the next chunk) and returns to the pool.
+
+    With `timeout`, each job (and each tracked inline call) gets a deadline that many
+    seconds after it starts, available to the work through its token (`cancel_token.remaining()`).
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-worker")
+        self._tokens: Dict[str, CancellationToken] = {}
+        self._jobs: Dict[str, LLMJob] = {}
+        self._lock = threading.Lock()
+
+    def _new_token(self) -> CancellationToken:
+        return CancellationToken(time.monotonic() + self.timeout if self.timeout is not None else None)
+
+    def submit(self, task_id: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> LLMJob:
+        """Runs fn(*args, cancel_token=token, **kwargs) on the pool."""
+        token = self._new_token()
+        job = LLMJob(task_id, token)
+        with self._lock:
+            self._tokens[task_id] = token
+            self._jobs[task_id] = job
+
+        def run() -> None:
+            try:
+                token.raise_if_canceled() # Canceled while still queued
+                job._finish(result=fn(*args, cancel_token=token, **kwargs))
+            except BaseException as e:
+                job._finish(error=e)
+            finally:
+                self._release(task_id, token)
+
+        self._pool.submit(run)
+        return job
+
+    @contextmanager
+    def track(self, task_id: str) -> Iterator[CancellationToken]:
+        """Registers LLM work that runs inline (e.g. in a streaming response) so it can be canceled."""
+        token = self._new_token()
+        with self._lock:
+            self._tokens[task_id] = token
+        try:
+            yield token
+        finally:
+            self._release(task_id, token)
+
+    def _release(self, task_id: str, token: CancellationToken) -> None:
+        with self._lock:
+            if self._tokens.get(task_id) is token:
+                del self._tokens[task_id]
+                self._jobs.pop(task_id, None)
+
+    def is_running(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._tokens
+
+    def cancel(self, task_id: str) -> bool:
+        """Cancels the in-flight LLM work of a task. Returns False if nothing was running."""
+        with self._lock:
+            token = self._tokens.pop(task_id, None)
+            job = self._jobs.pop(task_id, None)
+        if token is None:
+            return False
+        token.cancel()
+        if job is not None:
+            job._finish(error=TaskCanceledError())
+        logger.info(f"Canceled in-flight LLM work for Task ID {task_id}.")
+        return True
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._tokens)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            tokens = list(self._tokens.values())
+        for token in tokens:
+            token.cancel()
+        self._pool.shutdown(wait=wait)
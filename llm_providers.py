@@ -0,0 +1,346 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, List, Optional, Union
+
+from planner_context import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEMINI_MODEL = 'gemini-1.5-flash-latest'
+
+# LLM request contents in the Gemini format: [{"role": ..., "parts": [{"text": ...}]}]
+Contents = List[Dict[str, Any]]
+
+
+def contents_text(contents: Contents) -> str:
+    """Concatenates the text of every part in the request contents."""
+    return "\n".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+
+
+class LLMProvider:
+    """Interface shared by every LLM backend used by the agents."""
+
+    model_name: str = "unknown"
+    generation_config: Dict[str, Any] = {}
+
+    def generate(self, contents: Contents) -> str:
+        """Returns the complete response text."""
+        return "".join(self.stream(contents))
+
+    def stream(self, contents: Contents) -> Iterator[str]:
+        """Yields the response text in chunks as it is generated."""
+        raise NotImplementedError
+
+    async def generate_async(self, contents: Contents) -> str:
+        """Returns the complete response text without blocking the event loop."""
+        return await asyncio.to_thread(self.generate, contents)
+
+    def generate_batch(self, batch: List[Contents]) -> List[str]:
+        """Returns the response text of every request in a batch, in order.
+
+        Backends without a batched endpoint run the requests concurrently.
+        """
+        if len(batch) == 1:
+            return [self.generate(batch[0])]
+        with ThreadPoolExecutor(max_workers=len(batch)) as pool:
+            return list(pool.map(self.generate, batch))
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini backend.
+
+    The SDK is imported and the client configured on the first LLM call rather than at
+    construction, since importing `google.generativeai` takes about a second.
+    """
+
+    def __init__(self, api_key: str, model_name: str = DEFAULT_GEMINI_MODEL, generation_config: Optional[Dict[str, Any]] = None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=self.api_key)
+                    self._client = genai.GenerativeModel(self.model_name, generation_config=self.generation_config or None)
+                    logger.info(f"Configured Gemini client with {self.model_name}.")
+        return self._client
+
+    def generate(self, contents: Contents) -> str:
+        llm_response = self.client.generate_content(contents=contents)
+        if hasattr(llm_response, 'text'):
+            return llm_response.text
+        logger.warning("LLM response has no text attribute. Using string representation.")
+        return str(llm_response)
+
+    def stream(self, contents: Contents) -> Iterator[str]:
+        for chunk in self.client.generate_content(contents=contents, stream=True):
+            try:
+                chunk_text = chunk.text
+            except ValueError:
+                # Chunks without text (e.g. safety metadata only) carry nothing to stream
+                logger.warning("Skipping LLM stream chunk without text.")
+                continue
+            if chunk_text:
+                yield chunk_text
+
+    async def generate_async(self, contents: Contents) -> str:
+        llm_response = await self.client.generate_content_async(contents=contents)
+        if hasattr(llm_response, 'text'):
+            return llm_response.text
+        return str(llm_response)
+
+
+class LatencyDistribution:
+    """Samples simulated latencies in seconds.
+
+    Specs: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,STDDEV", "lognormal:MU,SIGMA"
+    or "exponential:MEAN". Negative samples are clamped to zero.
+    """
+
+    def __init__(self, spec: str = "fixed:0", seed: Optional[int] = None):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.args = [float(arg) for arg in args.split(",") if arg.strip()]
+        expected_args = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+        if self.kind not in expected_args or len(self.args) != expected_args[self.kind]:
+            raise ValueError(f"Invalid latency distribution: {spec}")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                value = self.args[0]
+            elif self.kind == "uniform":
+                value = self._random.uniform(*self.args)
+            elif self.kind == "normal":
+                value = self._random.gauss(*self.args)
+            elif self.kind == "lognormal":
+                value = self._random.lognormvariate(*self.args)
+            else:
+                value = self._random.expovariate(1.0 / self.args[0]) if self.args[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+class StubProvider(LLMProvider):
+    """Offline, deterministic backend for load testing.
+
+    Waits a sampled time-to-first-token, then streams the response word by word at
+    `tokens_per_second` (0 streams it as a single chunk without delay). Responses come
+    from `responses` (cycled in order, or a callable receiving the prompt text), or
+    default to a short acknowledgement of the prompt.
+
+    With `prefill_tokens_per_second`, the time-to-first-token also grows with the prompt
+    tokens that are not covered by a cached prefix: like a backend with prefix (KV)
+    caching, the stub remembers the last `prefix_cache_entries` request prefixes, so a
+    conversation that grows by appending turns only pays for its new turns.
+    """
+
+    model_name = "stub"
+
+    def __init__(
+        self,
+        latency: Union[str, LatencyDistribution] = "fixed:0",
+        tokens_per_second: float = 0.0,
+        responses: Optional[Union[List[str], Callable[[str], str]]] = None,
+        seed: Optional[int] = 0,
+        prefill_tokens_per_second: float = 0.0,
+        prefix_cache_entries: int = 65536,
+    ):
+        self.latency = latency if isinstance(latency, LatencyDistribution) else LatencyDistribution(latency, seed=seed)
+        self.tokens_per_second = tokens_per_second
+        self.responses = responses
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.prefix_cache_entries = prefix_cache_entries
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self._prefixes: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def respond(self, prompt: str) -> str:
+        with self._lock:
+            call_index = self.calls
+            self.calls += 1
+        if callable(self.responses):
+            return self.responses(prompt)
+        if self.responses:
+            return self.responses[call_index % len(self.responses)]
+        last_line = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+        return f"Stub response to: {last_line[:200]}"
+
+    def prefill_latency(self, contents: Contents, response: str) -> float:
+        """Simulated time spent on the prompt tokens missing from the prefix cache.
+
+        Every prefix of the request is remembered, and so is the request followed by its
+        response, which is how the next turn of a conversation starts.
+        """
+        if self.prefill_tokens_per_second <= 0:
+            return 0.0
+        digest = hashlib.sha1()
+        digests: List[str] = []
+        tokens: List[int] = []
+        for content in contents + [{"role": "model", "parts": [{"text": response}]}]:
+            digest.update(json.dumps(content, sort_keys=True, default=repr).encode("utf-8"))
+            digests.append(digest.hexdigest())
+            tokens.append(sum(estimate_tokens(part.get("text", "")) for part in content.get("parts", [])))
+        prompt_tokens = sum(tokens[:-1])
+        with self._lock:
+            cached_tokens = next((self._prefixes[key] for key in reversed(digests[:-1]) if key in self._prefixes), 0)
+            total = 0
+            for key, count in zip(digests, tokens):
+                total += count
+                self._prefixes[key] = total
+                self._prefixes.move_to_end(key)
+            while len(self._prefixes) > self.prefix_cache_entries:
+                self._prefixes.popitem(last=False)
+            self.prompt_tokens += prompt_tokens
+            self.cached_prompt_tokens += cached_tokens
+        return (prompt_tokens - cached_tokens) / self.prefill_tokens_per_second
+
+    def prefix_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_prompt_tokens": self.cached_prompt_tokens,
+                "cached_share": self.cached_prompt_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            }
+
+    def stream(self, contents: Contents) -> Iterator[str]:
+        text = self.respond(contents_text(contents))
+        time.sleep(self.latency.sample() + self.prefill_latency(contents, text))
+        if self.tokens_per_second <= 0:
+            yield text
+            return
+        delay = 1.0 / self.tokens_per_second
+        words = re.findall(r"\S+\s*", text) or [text]
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(delay)
+            yield word
+
+    async def generate_async(self, contents: Contents) -> str:
+        text = self.respond(contents_text(contents))
+        latency = self.latency.sample() + self.prefill_latency(contents, text)
+        if self.tokens_per_second > 0:
+            latency += max(0, len(text.split()) - 1) / self.tokens_per_second
+        await asyncio.sleep(latency)
+        return text
+
+    def generate_batch(self, batch: List[Contents]) -> List[str]:
+        # Simulates a batched inference endpoint: one latency sample for the whole batch
+        texts = [self.respond(contents_text(contents)) for contents in batch]
+        latency = self.latency.sample() + max(self.prefill_latency(contents, text) for contents, text in zip(batch, texts))
+        if self.tokens_per_second > 0:
+            latency += max(max(0, len(text.split()) - 1) for text in texts) / self.tokens_per_second
+        time.sleep(latency)
+        return texts
+
+
+class StubPlannerProvider(StubProvider):
+    """Stub Planning LLM that issues instructions and emits TASK_COMPLETE after N turns per task.
+
+    Turns are counted per task, using the "Current Task ID" line of the planning prompt.
+    When the prompt asks for a structured decision it answers with that JSON object, and
+    when it asks for a sub-task DAG, with `fanout` independent sub-tasks plus one that
+    combines their results.
+    """
+
+    model_name = "stub-planner"
+
+    def __init__(self, turns_until_complete: int = 3, fanout: int = 3, **kwargs: Any):
+        super().__init__(responses=self._plan, **kwargs)
+        self.turns_until_complete = turns_until_complete
+        self.fanout = fanout
+        self._turns: Dict[str, int] = {}
+        self._turns_lock = threading.Lock()
+
+    def _plan(self, prompt: str) -> str:
+        match = re.search(r"Current Task ID: (\S+)", prompt)
+        task_key = match.group(1) if match else ""
+        with self._turns_lock:
+            turn = self._turns.get(task_key, 0) + 1
+            self._turns[task_key] = turn
+        wants_dag = '"depends_on"' in prompt
+        wants_decision = '"next_instruction"' in prompt
+        if turn >= self.turns_until_complete:
+            if wants_dag:
+                return json.dumps({"done": True, "nodes": []})
+            return json.dumps({"done": True, "next_instruction": "", "confidence": 0.9}) if wants_decision else "TASK_COMPLETE"
+        if wants_dag:
+            parts = [{"id": f"part{i + 1}", "instruction": f"Work on part {i + 1} of round {turn}.", "depends_on": []} for i in range(self.fanout)]
+            combine = {"id": "combine", "instruction": f"Combine the results of round {turn}.", "depends_on": [part["id"] for part in parts]}
+            return json.dumps({"done": False, "nodes": parts + [combine]})
+        instruction = f"Continue with step {turn + 1} of the goal and report the result concisely."
+        return json.dumps({"done": False, "next_instruction": instruction, "confidence": 0.8}) if wants_decision else instruction
+
+
+def _load_stub_responses(path: Optional[str]) -> Optional[List[str]]:
+    """Loads scripted stub responses from a JSON list or a text file with one response per line."""
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    try:
+        responses = json.loads(content)
+        if isinstance(responses, list):
+            return [str(response) for response in responses]
+    except json.JSONDecodeError:
+        pass
+    return [line for line in content.splitlines() if line.strip()]
+
+
+def create_provider(role: str) -> Optional[LLMProvider]:
+    """Creates the LLM provider for an agent role ("execution" or "planning").
+
+    The backend comes from <ROLE>_LLM_BACKEND or LLM_BACKEND ("gemini" or "stub").
+    Returns None when Gemini is selected but GEMINI_API_KEY is not set. The Gemini SDK itself
+    is only loaded on the first call; errors configuring it surface as errors of that call.
+    """
+    backend = (os.getenv(f"{role.upper()}_LLM_BACKEND") or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if backend == "stub":
+        stub_options = dict(
+            latency=os.getenv("STUB_LLM_LATENCY", "fixed:0"),
+            tokens_per_second=float(os.getenv("STUB_LLM_TOKENS_PER_SECOND", "0")),
+            prefill_tokens_per_second=float(os.getenv("STUB_LLM_PREFILL_TOKENS_PER_SECOND", "0")),
+            seed=int(os.getenv("STUB_LLM_SEED", "0")),
+        )
+        if role == "planning":
+            provider: LLMProvider = StubPlannerProvider(
+                turns_until_complete=int(os.getenv("STUB_PLANNER_TURNS", "3")),
+                fanout=int(os.getenv("STUB_PLANNER_FANOUT", "3")),
+                **stub_options
+            )
+        else:
+            provider = StubProvider(responses=_load_stub_responses(os.getenv("STUB_LLM_RESPONSES_FILE")), **stub_options)
+        logger.info(f"Using stub LLM backend for the {role} agent.")
+        return provider
+
+    if backend != "gemini":
+        raise ValueError(f"Unknown LLM backend: {backend}")
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        logger.error("GEMINI_API_KEY not found in environment variables.")
+        # For this demo, we'll proceed but LLM calls will fail
+        return None
+    model_name = os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL)
+    logger.info(f"Using Gemini backend ({model_name}) for the {role} agent.")
+    return GeminiProvider(api_key, model_name=model_name)
@@ -0,0 +1,88 @@
+import os
+import json
+import logging
+import argparse
+from typing import Dict, Any, List
+
+from a2a_models import SendTaskResponse
+from a2a_serialization import encode_model
+from payload_logging import LOG_FORMAT, PayloadLogger
+from serialization_benchmark import HISTORY_SIZES, build_task, measure
+
+
+def make_logger(level: int) -> logging.Logger:
+    """A logger writing formatted records to /dev/null, so formatting is paid but nothing is printed."""
+    logger = logging.getLogger(f"logging_benchmark.{logging.getLevelName(level)}")
+    logger.propagate = False
+    logger.setLevel(level)
+    if not logger.handlers:
+        handler = logging.StreamHandler(open(os.devnull, "w"))
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+    return logger
+
+
+def run(history_sizes: List[int], min_time: float, sample_rate: float) -> List[Dict[str, Any]]:
+    results = []
+    for size in history_sizes:
+        task = build_task(size)
+        response = SendTaskResponse(jsonrpc="2.0", id="1", result=task)
+        body = encode_model(response)
+        history = task.history
+
+        timings = {}
+        for level in (logging.INFO, logging.WARNING):
+            logger = make_logger(level)
+            summary_log = PayloadLogger(logger, "benchmark", mode="summary")
+            sampled_log = PayloadLogger(logger, "benchmark", mode="full", sample_rate=sample_rate)
+            level_name = logging.getLevelName(level).lower()
+
+            # Per turn, the agents used to pretty-print the response payload and the received history in f-strings
+            def baseline():
+                logger.info(f"Sending Response Payload:\n{json.dumps(response.model_dump(mode='json', exclude_none=True), indent=2)}")
+                logger.info(f"Full Task History Received:\n{json.dumps([msg.model_dump(mode='json', exclude_none=True) for msg in history], indent=2)}")
+
+            def summary():
+                summary_log.log("Sending response", body)
+                summary_log.log("Task history received", history)
+
+            def sampled():
+                sampled_log.log("Sending response", body)
+                sampled_log.log("Task history received", history)
+
+            timings[f"baseline_{level_name}"] = measure(baseline, min_time)
+            timings[f"summary_{level_name}"] = measure(summary, min_time)
+            timings[f"sampled_full_{level_name}"] = measure(sampled, min_time)
+        results.append({"history_size": size, "payload_bytes": len(body), "timings_us": {name: 1e6 * t for name, t in timings.items()}})
+    return results
+
+
+def print_results(results: List[Dict[str, Any]], sample_rate: float) -> None:
+    for result in results:
+        timings = result["timings_us"]
+        print(f"\nHistory of {result['history_size']} messages ({result['payload_bytes']} bytes), per turn:")
+        for level_name in ("info", "warning"):
+            baseline = timings[f"baseline_{level_name}"]
+            print(f"  {level_name.upper():<8} baseline f-string dumps      {baseline:10.1f} us")
+            for mode, label in (("summary", "lazy summary"), ("sampled_full", f"full, sampled at {sample_rate:g}")):
+                timing = timings[f"{mode}_{level_name}"]
+                print(f"  {level_name.upper():<8} {label:<28} {timing:10.1f} us  ({baseline - timing:9.1f} us saved)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-turn cost of payload logging: eager f-string dumps vs. lazy payload summaries.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=HISTORY_SIZES, help="History sizes (messages) to benchmark")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent on each measurement")
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="Fraction of payloads logged in full in the sampled mode")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.min_time, args.sample_rate)
+    print_results(results, args.sample_rate)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"sample_rate": args.sample_rate, "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
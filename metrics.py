@@ -0,0 +1,293 @@
+import os
+import math
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cache hits and fast handlers up to slow LLM calls
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes
+DEFAULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    """Base class of a named metric with a fixed set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """Returns (sample name, formatted labels, value) triples."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    """Value that can go up and down.
+
+    With `function`, the value is read when the metrics are collected instead: it returns
+    a number, or a dict mapping label value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        if self.function is not None:
+            try:
+                result = self.function()
+            except Exception as e:
+                logger.warning(f"Could not collect gauge {self.name}: {e}")
+                return []
+            values = result if isinstance(result, dict) else {(): result}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(values.items()) if value is not None]
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observes the wall-clock duration of the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels: Any) -> Tuple[float, int]:
+        """Returns the (sum, count) of the observations with these labels."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[-2], int(state[-1])) if state else (0.0, 0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        samples = []
+        bucket_names = self.labelnames + ("le",)
+        for key, state in sorted(values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", _format_labels(bucket_names, key + (_format_value(bound),)), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), state[-2]))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), state[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Adds a metric; registering a name again returns the metric already registered."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], Any]] = None) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames, function))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write(self, path: str) -> None:
+        """Writes the metrics to a file atomically (e.g. for node_exporter's textfile collector)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+# Registry shared by every component of the process
+REGISTRY = MetricsRegistry()
+
+A2A_REQUESTS = REGISTRY.counter("a2a_requests_total", "A2A JSON-RPC requests handled or sent.", ("component", "method", "outcome"))
+A2A_REQUEST_SECONDS = REGISTRY.histogram(
+    "a2a_request_duration_seconds", "End-to-end A2A request latency (for streaming requests, until the stream is set up).", ("component", "method")
+)
+A2A_PHASE_SECONDS = REGISTRY.histogram(
+    "a2a_phase_duration_seconds", "Time spent per request phase: validation, turn_wait, llm, serialization, logging, store.", ("component", "phase")
+)
+A2A_ACTIVE_REQUESTS = REGISTRY.gauge("a2a_active_requests", "A2A requests currently being handled or awaiting a response.", ("component",))
+A2A_TURN_CONFLICTS = REGISTRY.counter(
+    "a2a_task_turn_conflicts_total", "Turns that arrived while another turn of the same task was in progress, by outcome (queued, rejected).", ("component", "outcome")
+)
+A2A_PAYLOAD_BYTES = REGISTRY.histogram("a2a_payload_bytes", "Size of A2A request and response bodies.", ("component", "direction"), DEFAULT_SIZE_BUCKETS)
+LLM_CALLS = REGISTRY.counter("llm_calls_total", "LLM calls by outcome (ok, error, timeout, canceled, cache_hit).", ("component", "outcome"))
+LLM_CALL_SECONDS = REGISTRY.histogram("llm_call_duration_seconds", "LLM call latency, excluding response cache hits.", ("component",))
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "llm_prompt_tokens_total", "Estimated prompt tokens of LLM calls, by source (reused from the session context, or new).", ("component", "source")
+)
+PLANNER_GOALS = REGISTRY.counter("planner_goals_total", "Goals driven by a planner, by outcome (completed, max_turns, error).", ("component", "outcome"))
+PLANNER_GOAL_SECONDS = REGISTRY.histogram("planner_goal_duration_seconds", "Wall time per goal, including turn pacing.", ("component",))
+PLANNER_TURNS_SAVED = REGISTRY.counter("planner_turns_saved_total", "Turns left unused by goals the Planning LLM ended before max_turns.", ("component",))
+COMM_LOG_DROPPED = REGISTRY.counter("a2a_comm_log_dropped_total", "Communication log records dropped because the log queue was full.")
+
+
+def phase(component: str, name: str):
+    """Context manager timing one request phase."""
+    return A2A_PHASE_SECONDS.time(component=component, phase=name)
+
+
+# Key of the trace ID in Message.metadata, shared by every message of one goal
+TRACE_ID_KEY = "traceId"
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def trace_id_of(metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Returns the trace ID carried in a message's (or task's) metadata, if any."""
+    trace_id = (metadata or {}).get(TRACE_ID_KEY)
+    return trace_id if isinstance(trace_id, str) else None
+
+
+def trace_metadata(trace_id: Optional[str], **extra: Any) -> Optional[Dict[str, Any]]:
+    """Builds message metadata carrying a trace ID, or None when there is nothing to carry."""
+    metadata = dict(extra)
+    if trace_id:
+        metadata[TRACE_ID_KEY] = trace_id
+    return metadata or None
+
+
+def write_metrics_from_env() -> None:
+    """Writes the registry to METRICS_FILE, if set; used by the command-line planners at exit."""
+    path = os.getenv("METRICS_FILE")
+    if not path:
+        return
+    try:
+        REGISTRY.write(path)
+        logger.info(f"Metrics written to {path}")
+    except OSError as e:
+        logger.error(f"Could not write metrics to {path}: {e}")
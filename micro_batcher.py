@@ -0,0 +1,243 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional
+
+from llm_providers import Contents, LLMProvider, contents_text
+
+logger = logging.getLogger(__name__)
+
+
+class BatcherOverloadedError(RuntimeError):
+    """Raised when the micro-batcher's queue is full."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second, holding at most `capacity`.
+
+    Requests larger than the capacity are admitted once the bucket is full and leave it
+    in debt, so they are delayed rather than rejected forever.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.waited = 0.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Blocks until `tokens` are available and takes them. Returns the time spent waiting."""
+        needed = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    self.waited += waited
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+@dataclass
+class _BatchItem:
+    contents: Contents
+    tokens: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: "Future[str]" = field(default_factory=Future)
+
+
+def estimate_contents_tokens(contents: Contents) -> int:
+    # Rough estimate (about 4 characters per token) used for token quotas
+    return max(1, len(contents_text(contents)) // 4)
+
+
+class MicroBatcher:
+    """Collects concurrent LLM calls into small batches.
+
+    A dispatcher thread waits for a first request, then keeps collecting for up to
+    `window` seconds or until `max_batch_size` requests are queued. Each batch passes the
+    global request-rate and token-quota buckets, is sent through `generate_batch` on a
+    small pool (so the next batch can be collected meanwhile) and its results are handed
+    back to the waiting callers. Requests beyond `max_queue_size` are rejected.
+
+    Callers block while their request is batched, so a batch can only grow as large as the
+    number of callers waiting at once: in the Execution Agent, LLM_MAX_WORKERS must be well
+    above `max_batch_size` for batches to fill.
+    """
+
+    def __init__(
+        self,
+        generate_batch: Callable[[List[Contents]], List[str]],
+        max_batch_size: int = 8,
+        window: float = 0.01,
+        max_queue_size: int = 1000,
+        request_limiter: Optional[TokenBucket] = None,
+        token_limiter: Optional[TokenBucket] = None,
+        max_concurrent_batches: int = 8,
+    ):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.request_limiter = request_limiter
+        self.token_limiter = token_limiter
+
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batch_errors = 0
+        self.timeouts = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self.queue_wait_total = 0.0
+        self.rate_limit_wait_total = 0.0
+
+        self._queue: "queue.Queue[Optional[_BatchItem]]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="llm-batch")
+        self._dispatcher = threading.Thread(target=self._run, name="llm-batch-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, contents: Contents) -> "Future[str]":
+        """Queues an LLM call; the returned future resolves to the response text."""
+        if self._closed:
+            raise BatcherOverloadedError("Micro-batcher is closed")
+        item = _BatchItem(contents=contents, tokens=estimate_contents_tokens(contents))
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise BatcherOverloadedError("LLM request queue is full")
+        with self._lock:
+            self.requests += 1
+        return item.future
+
+    def generate(self, contents: Contents, timeout: Optional[float] = None) -> str:
+        """Waits up to `timeout` seconds for the response; a call that times out before its batch is sent is withdrawn."""
+        future = self.submit(contents)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"Batched LLM call did not finish in {timeout:.1f}s")
+
+    def _collect(self, first: _BatchItem) -> List[_BatchItem]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None) # Keep the shutdown signal for the dispatcher loop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            waited = 0.0
+            if self.request_limiter is not None:
+                waited += self.request_limiter.acquire(len(batch))
+            if self.token_limiter is not None:
+                waited += self.token_limiter.acquire(sum(item.tokens for item in batch))
+            now = time.monotonic()
+            with self._lock:
+                self.batches += 1
+                self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+                self.queue_wait_total += sum(now - item.enqueued_at for item in batch)
+                self.rate_limit_wait_total += waited
+            self._pool.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[_BatchItem]) -> None:
+        # Skip calls whose callers timed out while they were queued
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self.generate_batch([item.contents for item in batch])
+        except Exception as e:
+            logger.error(f"Batched LLM call of {len(batch)} requests failed: {e}")
+            with self._lock:
+                self.batch_errors += 1
+            for item in batch:
+                item.future.set_exception(e)
+            return
+        if len(results) != len(batch):
+            logger.error(f"Batched LLM call returned {len(results)} results for {len(batch)} requests.")
+            with self._lock:
+                self.batch_errors += 1
+        for item, text in zip(batch, results):
+            item.future.set_result(text)
+        for item in batch[len(results):]:
+            item.future.set_exception(RuntimeError(f"Batched LLM call returned no result for this request ({len(results)} results for {len(batch)} requests)"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            batched_requests = sum(size * count for size, count in self.batch_sizes.items())
+            return {
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "batch_errors": self.batch_errors,
+                "timeouts": self.timeouts,
+                "mean_batch_size": batched_requests / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.window * 1000,
+                "queue_depth": self._queue.qsize(),
+                "mean_queue_wait_ms": 1000 * self.queue_wait_total / batched_requests if batched_requests else 0.0,
+                "rate_limit_wait_s": self.rate_limit_wait_total,
+            }
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._dispatcher.join(timeout=5.0)
+        self._pool.shutdown(wait=True)
+
+
+def create_micro_batcher_from_env(provider: Optional[LLMProvider]) -> Optional[MicroBatcher]:
+    """Builds the micro-batcher configured through LLM_BATCH_* and LLM_RATE_LIMIT_* variables.
+
+    Returns None unless LLM_BATCHING is enabled and a provider is configured.
+    """
+    if provider is None or os.getenv("LLM_BATCHING", "off").lower() not in ("1", "on", "true", "yes"):
+        return None
+    requests_per_second = float(os.getenv("LLM_RATE_LIMIT_RPS", "0"))
+    tokens_per_minute = float(os.getenv("LLM_TOKEN_QUOTA_PER_MINUTE", "0"))
+    return MicroBatcher(
+        provider.generate_batch,
+        max_batch_size=int(os.getenv("LLM_BATCH_MAX_SIZE", "8")),
+        window=float(os.getenv("LLM_BATCH_WINDOW_MS", "10")) / 1000,
+        max_queue_size=int(os.getenv("LLM_BATCH_MAX_QUEUE", "1000")),
+        request_limiter=TokenBucket(requests_per_second, float(os.getenv("LLM_RATE_LIMIT_BURST", str(max(requests_per_second, 1))))) if requests_per_second > 0 else None,
+        token_limiter=TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute > 0 else None,
+        max_concurrent_batches=int(os.getenv("LLM_BATCH_CONCURRENCY", "8")),
+    )
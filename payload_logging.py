@@ -0,0 +1,160 @@
+import os
+import json
+import random
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+from pydantic import BaseModel
+
+from a2a_models import Message, Task
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Payload logging modes, from least to most verbose
+PAYLOAD_LOG_MODES = ("off", "summary", "full")
+
+# Attributes every LogRecord has; anything else on a record was passed through `extra`
+_STANDARD_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including the fields passed through `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def parse_component_spec(spec: str, default: str) -> Dict[str, str]:
+    """Parses "value" or "component=value,..." lists; a bare value sets the default (key "*")."""
+    values = {"*": default}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        component, sep, value = item.partition("=")
+        if sep:
+            values[component.strip()] = value.strip()
+        else:
+            values["*"] = item
+    return values
+
+
+def configure_logging() -> None:
+    """Configures the root logger from LOG_LEVEL and LOG_FORMAT (text or json).
+
+    LOG_LEVELS overrides the level per logger, e.g. "communication_log=WARNING,execution_agent=DEBUG".
+    Like logging.basicConfig, no handler is added if the root logger already has one.
+    """
+    root = logging.getLogger()
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter() if os.getenv("LOG_FORMAT", "text").lower() == "json" else logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in parse_component_spec(os.getenv("LOG_LEVELS", ""), "").items():
+        if name != "*" and level:
+            logging.getLogger(name).setLevel(level.upper())
+
+
+def summarize_payload(payload: Any, max_chars: int = 200) -> str:
+    """Short description of a payload that never serializes more than it prints.
+
+    Raw JSON bytes are cut after `max_chars`; tasks and histories are reduced to their
+    size and their latest message.
+    """
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        head = bytes(payload[:max_chars]).decode("utf-8", "replace")
+        return f"<{len(payload)} bytes> {head}{'...' if len(payload) > max_chars else ''}"
+    if isinstance(payload, Task):
+        history = payload.history or []
+        summary = f"<Task {payload.id} {payload.status.state.value}, {len(history)} messages>"
+        return f"{summary} {summarize_payload(history[-1], max_chars)}" if history else summary
+    if isinstance(payload, Message):
+        text = " ".join(getattr(part, "text", f"[{part.type}]") for part in payload.parts)
+        return f"{payload.role}: {text[:max_chars]}{'...' if len(text) > max_chars else ''}"
+    if isinstance(payload, list) and payload and isinstance(payload[-1], Message):
+        return f"<{len(payload)} messages> last {summarize_payload(payload[-1], max_chars)}"
+    text = str(payload)
+    return f"{text[:max_chars]}{'...' if len(text) > max_chars else ''}"
+
+
+def render_payload(payload: Any) -> str:
+    """Full, pretty-printed rendering of a payload."""
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        try:
+            return json.dumps(json.loads(bytes(payload)), indent=2, ensure_ascii=False)
+        except ValueError:
+            return bytes(payload).decode("utf-8", "replace")
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json(indent=2, exclude_none=True)
+    if isinstance(payload, list) and all(isinstance(item, BaseModel) for item in payload):
+        return json.dumps([item.model_dump(mode="json", exclude_none=True) for item in payload], indent=2, ensure_ascii=False)
+    return json.dumps(payload, indent=2, ensure_ascii=False, default=str)
+
+
+class LazyPayload:
+    """Log argument that summarizes (or fully renders) its payload only if the record is emitted."""
+
+    __slots__ = ("payload", "max_chars", "full")
+
+    def __init__(self, payload: Any, max_chars: int = 200, full: bool = False):
+        self.payload = payload
+        self.max_chars = max_chars
+        self.full = full
+
+    def __str__(self) -> str:
+        return render_payload(self.payload) if self.full else summarize_payload(self.payload, self.max_chars)
+
+
+class PayloadLogger:
+    """Logs request, response and history payloads of one component at a configurable verbosity.
+
+    "off" logs nothing; "summary" logs a truncated summary at INFO; "full" logs the complete
+    pretty-printed payload for a `sample_rate` fraction of the calls and a summary for the
+    rest. Nothing is serialized unless the record is actually emitted.
+    """
+
+    def __init__(self, logger: logging.Logger, component: str, mode: str = "summary", max_chars: int = 200, sample_rate: float = 1.0):
+        if mode not in PAYLOAD_LOG_MODES:
+            raise ValueError(f"Invalid payload log mode for {component}: {mode}")
+        self.logger = logger
+        self.component = component
+        self.mode = mode
+        self.max_chars = max_chars
+        self.sample_rate = sample_rate
+
+    def log(self, label: str, payload: Any, **fields: Any) -> None:
+        if self.mode == "off" or not self.logger.isEnabledFor(logging.INFO):
+            return
+        full = self.mode == "full" and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+        extra = {"component": self.component, "payload_event": label, **fields}
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            extra["payload_bytes"] = len(payload)
+        self.logger.info("%s: %s", label, LazyPayload(payload, self.max_chars, full), extra=extra)
+
+
+def get_payload_logger(component: str, logger: Optional[logging.Logger] = None) -> PayloadLogger:
+    """Builds the payload logger of a component from PAYLOAD_LOG, PAYLOAD_LOG_MAX_CHARS and PAYLOAD_LOG_SAMPLE_RATE.
+
+    PAYLOAD_LOG is a mode ("summary") or per-component modes ("execution_agent=full,planning_agent=off").
+    """
+    modes = parse_component_spec(os.getenv("PAYLOAD_LOG", ""), "summary")
+    return PayloadLogger(
+        logger or logging.getLogger(component),
+        component,
+        mode=modes.get(component, modes["*"]).lower(),
+        max_chars=int(os.getenv("PAYLOAD_LOG_MAX_CHARS", "200")),
+        sample_rate=float(os.getenv("PAYLOAD_LOG_SAMPLE_RATE", "1.0")),
+    )
@@ -0,0 +1,193 @@
+import os
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Tuple
+
+from a2a_models import Message, TextPart, DataPart, FilePart
+
+logger = logging.getLogger(__name__)
+
+# (role, text) pairs: the only parts of a message the Planning LLM needs
+CompactMessage = Tuple[str, str]
+
+# Folds messages leaving the window into the summary: (previous summary, messages) -> new summary
+Summarizer = Callable[[str, List[CompactMessage]], str]
+
+# Rough characters-per-token ratio, good enough for budgeting English prompts
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_message(message: Message, max_chars: int = 2000) -> CompactMessage:
+    """Reduces a message to its role and text; data and file parts become short text."""
+    texts = []
+    for part in message.parts or []:
+        if isinstance(part, TextPart):
+            texts.append(part.text)
+        elif isinstance(part, DataPart):
+            texts.append(json.dumps(part.data, separators=(",", ":"), default=str))
+        elif isinstance(part, FilePart):
+            texts.append(f"[file {part.file.name or part.file.uri or ''} ({part.file.mimeType or 'unknown type'})]")
+    text = "\n".join(texts).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars] + " ...[truncated]"
+    return message.role, text
+
+
+def summary_line(message: CompactMessage, max_chars: int = 200) -> str:
+    """Extractive summary of one message: its first line, shortened."""
+    role, text = message
+    first_line = text.splitlines()[0] if text else ""
+    if len(first_line) > max_chars:
+        first_line = first_line[:max_chars] + "..."
+    return f"- {role}: {first_line}"
+
+
+@dataclass
+class ContextStats:
+    """Sizes of one planning prompt before and after compaction."""
+    full_tokens: int
+    compacted_tokens: int
+    window_messages: int
+    summarized_messages: int
+
+    @property
+    def reduction(self) -> float:
+        return 1 - self.compacted_tokens / self.full_tokens if self.full_tokens else 0.0
+
+
+class PlannerContext:
+    """Compacted task history for the planning prompt.
+
+    The most recent `window_size` messages are kept verbatim (as role and text). Older
+    messages are folded into a summary once, when they leave the window, so each turn
+    only processes the new messages. The summary is extractive by default (one short
+    line per message); a `summarizer` callable, e.g. one backed by an LLM, can replace it.
+    `render` keeps the whole prompt within `token_budget` by folding more messages into
+    the summary and then dropping the oldest summary content.
+    """
+
+    def __init__(
+        self,
+        window_size: int = 6,
+        token_budget: int = 3000,
+        summary_max_tokens: int = 600,
+        max_message_chars: int = 2000,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        self.window_size = window_size
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.max_message_chars = max_message_chars
+        self.summarizer = summarizer
+        self.last_stats: Optional[ContextStats] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self._window: Deque[CompactMessage] = deque()
+        self._summary_lines: List[str] = []
+        self._summary_text = ""
+        self._summarized = 0
+        self._omitted = 0
+        self._seen = 0
+        self._full_history_chars = 2 # "[]" of the uncompacted JSON history
+
+    def update(self, history: List[Message]) -> None:
+        """Ingests the messages added to the history since the previous update."""
+        if len(history) < self._seen:
+            self.reset() # A different or truncated history; start over
+        for message in history[self._seen:]:
+            # Size of the message as the uncompacted prompt would have included it
+            self._full_history_chars += len(json.dumps(message.model_dump(mode="json", exclude_none=True), indent=2)) + 2
+            self._window.append(compact_message(message, self.max_message_chars))
+        self._seen = len(history)
+        overflow = len(self._window) - self.window_size
+        if overflow > 0:
+            self._fold([self._window.popleft() for _ in range(overflow)])
+
+    def _fold(self, messages: List[CompactMessage]) -> None:
+        self._summarized += len(messages)
+        if self.summarizer is not None:
+            try:
+                self._summary_text = self.summarizer(self._summary_text, messages).strip()
+                return
+            except Exception as e:
+                logger.error(f"Summarizer failed, falling back to extractive summary: {e}")
+                if self._summary_text:
+                    self._summary_lines.append(self._summary_text)
+                    self._summary_text = ""
+                self.summarizer = None
+        self._summary_lines.extend(summary_line(message) for message in messages)
+        self._trim_summary(self.summary_max_tokens)
+
+    def _trim_summary(self, max_tokens: int) -> None:
+        if self._summary_text:
+            limit = max(0, max_tokens * CHARS_PER_TOKEN)
+            if len(self._summary_text) > limit:
+                self._summary_text = "..." + self._summary_text[len(self._summary_text) - limit:]
+            return
+        while self._summary_lines and estimate_tokens("\n".join(self._summary_lines)) > max_tokens:
+            self._summary_lines.pop(0)
+            self._omitted += 1
+
+    def summary(self) -> str:
+        if self._summary_text:
+            return self._summary_text
+        lines = list(self._summary_lines)
+        if self._omitted:
+            lines.insert(0, f"({self._omitted} earlier messages omitted)")
+        return "\n".join(lines)
+
+    def _window_text(self) -> str:
+        recent = "\n".join(f"{role}: {text}" for role, text in self._window)
+        return f"Recent messages:\n{recent}" if self._window else ""
+
+    def _render_history(self) -> str:
+        sections = []
+        summary = self.summary()
+        if summary:
+            sections.append(f"Summary of earlier messages ({self._summarized} messages):\n{summary}")
+        if self._window:
+            sections.append(self._window_text())
+        return "\n\n".join(sections)
+
+    def render(self, reserved_tokens: int = 0) -> str:
+        """Returns the compacted history text, fitting `token_budget` minus `reserved_tokens`."""
+        budget = max(0, self.token_budget - reserved_tokens)
+        history_text = self._render_history()
+        # Fold older window messages into the summary, keeping at least the latest message verbatim
+        while estimate_tokens(history_text) > budget and len(self._window) > 1:
+            self._fold([self._window.popleft()])
+            history_text = self._render_history()
+        if estimate_tokens(history_text) > budget:
+            self._trim_summary(max(0, budget - estimate_tokens(self._window_text())))
+            history_text = self._render_history()
+        if estimate_tokens(history_text) > budget:
+            # Only the latest message is left and it alone is over budget; keep its end
+            history_text = history_text[-budget * CHARS_PER_TOKEN:] if budget else ""
+
+        self.last_stats = ContextStats(
+            full_tokens=reserved_tokens + (self._full_history_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN,
+            compacted_tokens=reserved_tokens + estimate_tokens(history_text),
+            window_messages=len(self._window),
+            summarized_messages=self._summarized,
+        )
+        return history_text
+
+
+def create_planner_context_from_env(summarizer: Optional[Summarizer] = None) -> Optional[PlannerContext]:
+    """Builds a PlannerContext from PLANNER_CONTEXT_* variables, or None when PLANNER_CONTEXT=off."""
+    if os.getenv("PLANNER_CONTEXT", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    return PlannerContext(
+        window_size=int(os.getenv("PLANNER_CONTEXT_WINDOW", "6")),
+        token_budget=int(os.getenv("PLANNER_CONTEXT_TOKEN_BUDGET", "3000")),
+        summary_max_tokens=int(os.getenv("PLANNER_CONTEXT_SUMMARY_TOKENS", "600")),
+        max_message_chars=int(os.getenv("PLANNER_CONTEXT_MAX_MESSAGE_CHARS", "2000")),
+        summarizer=summarizer,
+    )
@@ -1,52 +1,186 @@
 import os
+import re
 import json
 import logging
 import uuid
+import queue
 import requests
 import time
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 
-import google.generativeai as genai
-from dotenv import load_dotenv
 from pydantic import ValidationError
 
-# Load environment variables
-load_dotenv()
+from a2a_client import A2AClient
+from router import ExecutionAgentRouter, create_router_from_env
+from llm_providers import create_provider
+from communication_log import get_communication_log
+from a2a_serialization import encode_model, decode_model
+from payload_logging import configure_logging, get_payload_logger
+from planner_context import PlannerContext, CompactMessage, create_planner_context_from_env, estimate_tokens
+from turn_pacing import TurnPacer, create_turn_pacer_from_env, load_report_of
+from metrics import (
+    A2A_REQUESTS, A2A_REQUEST_SECONDS, A2A_PAYLOAD_BYTES, LLM_CALLS, LLM_CALL_SECONDS, PLANNER_GOALS, PLANNER_GOAL_SECONDS,
+    PLANNER_TURNS_SAVED, phase, new_trace_id, trace_metadata, write_metrics_from_env
+)
+
+@dataclass
+class PlannerConfig:
+    """Settings of the Planning Agent's connection to the Execution Agent and of its turn loop."""
+    execution_agent_base_url: str = "http://localhost:5000"
+    connect_timeout: float = 3.05
+    read_timeout: float = 120.0
+    use_gzip: bool = False
+    # Minimum confidence for the Planning LLM's "done" to end a goal
+    done_confidence: float = 0.0
+
+    @classmethod
+    def from_env(cls, dotenv: bool = True) -> "PlannerConfig":
+        """Reads the settings from the environment, after loading `.env` unless `dotenv` is False."""
+        if dotenv:
+            from dotenv import load_dotenv
+            load_dotenv()
+        return cls(
+            execution_agent_base_url=os.getenv("EXECUTION_AGENT_BASE_URL", "http://localhost:5000"),
+            connect_timeout=float(os.getenv("A2A_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("A2A_READ_TIMEOUT", "120")),
+            use_gzip=os.getenv("A2A_GZIP") == "1",
+            done_confidence=float(os.getenv("PLANNER_DONE_CONFIDENCE", "0")),
+        )
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Request, response and history payloads are logged as lazy summaries (PAYLOAD_LOG=off|summary|full)
+payload_log = get_payload_logger("planning_agent", logger)
+
 # Import A2A models
 try:
     from a2a_models import (
-        SendTaskRequest, SendTaskResponse, Task, TaskStatus, TaskState, Message, TextPart, JSONRPCError, JSONRPCResponse, Part, TaskSendParams
+        SendTaskRequest, SendTaskResponse, Task, TaskStatus, TaskState, Message, TextPart, DataPart, JSONRPCError, JSONRPCResponse, Part, TaskSendParams,
+        SendTaskStreamingRequest, SendTaskStreamingResponse, TaskStatusUpdateEvent, TaskArtifactUpdateEvent,
+        PushNotificationConfig
     )
     logger.info("Successfully imported A2A models.")
 except ImportError as e:
     logger.error(f"Error importing A2A models: {e}")
     # Exit or handle the error appropriately if models cannot be imported
 
-# Configure Gemini
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    logger.error("GEMINI_API_KEY not found in environment variables.")
-    # In a real app, you might raise an exception or exit
-    # For this demo, we'll proceed but LLM calls will fail
-    genai_client = None
-else:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        # Use the specified model
-        genai_client = genai.GenerativeModel('gemini-1.5-flash-latest')
-        logger.info("Successfully configured Gemini client with gemini-1.5-flash-latest.")
-    except Exception as e:
-        logger.error(f"Error configuring Gemini client: {e}")
-        genai_client = None
+# Paths of the Execution Agent's endpoints (its base URL comes from the configuration)
+EXECUTION_AGENT_SEND_PATH = "/a2a/tasks/send"
+EXECUTION_AGENT_STREAM_PATH = "/a2a/tasks/sendSubscribe"
+
+# Component label of this agent's metrics (written to METRICS_FILE at exit)
+METRICS_COMPONENT = "planning_agent"
+
+# Configuration, logging and the LLM backend are set up by `init()` or on first use, so that
+# importing this module (as async_planning_agent, dag_planner and benchmark do) has no side effects
+_config: Optional[PlannerConfig] = None
+_llm_provider = None
+_llm_provider_configured = False
+_setup_lock = threading.Lock()
+
+def get_config() -> PlannerConfig:
+    """Returns the planner's configuration, read from the environment (including `.env`) on first use."""
+    global _config
+    if _config is None:
+        with _setup_lock:
+            if _config is None:
+                _config = PlannerConfig.from_env()
+    return _config
+
+def get_llm_provider():
+    """Returns the Planning LLM (LLM_BACKEND / PLANNING_LLM_BACKEND: gemini or stub), or None if it is not configured.
+
+    The provider is created on first use; the Gemini SDK itself loads on the first call.
+    """
+    global _llm_provider, _llm_provider_configured
+    if not _llm_provider_configured:
+        get_config()
+        with _setup_lock:
+            if not _llm_provider_configured:
+                _llm_provider = create_provider("planning")
+                _llm_provider_configured = True
+    return _llm_provider
+
+def init() -> PlannerConfig:
+    """Sets up a Planning Agent process: loads `.env`, configures logging (LOG_LEVEL, LOG_FORMAT=text|json,
+    LOG_LEVELS per component) and payload logging, and creates the LLM backend."""
+    global payload_log
+    config = get_config()
+    configure_logging()
+    payload_log = get_payload_logger("planning_agent", logger)
+    get_llm_provider()
+    return config
+
+# Pooled keep-alive client used for every request to the Execution Agent, created on first use
+_a2a_client: Optional[A2AClient] = None
+_a2a_client_lock = threading.Lock()
+
+def make_a2a_client(base_url: str) -> A2AClient:
+    config = get_config()
+    return A2AClient(
+        base_url=base_url,
+        connect_timeout=config.connect_timeout,
+        read_timeout=config.read_timeout,
+        use_gzip=config.use_gzip
+    )
 
-# Execution Agent Server URL
-EXECUTION_AGENT_URL = "http://localhost:5000/a2a/tasks/send"
+def get_a2a_client() -> A2AClient:
+    global _a2a_client
+    if _a2a_client is None:
+        with _a2a_client_lock:
+            if _a2a_client is None:
+                _a2a_client = make_a2a_client(get_config().execution_agent_base_url)
+    return _a2a_client
+
+# With EXECUTION_AGENT_URLS and/or EXECUTION_AGENT_REGISTRY, requests are spread over several
+# Execution Agents (see router.py); otherwise they all go to EXECUTION_AGENT_BASE_URL
+_router: Optional[ExecutionAgentRouter] = None
+_router_configured = False
+
+def get_router() -> Optional[ExecutionAgentRouter]:
+    global _router, _router_configured
+    if not _router_configured:
+        with _a2a_client_lock:
+            if not _router_configured:
+                _router = create_router_from_env(client_factory=make_a2a_client)
+                if _router is not None:
+                    _router.start()
+                _router_configured = True
+    return _router
+
+def set_router(router: Optional[ExecutionAgentRouter]) -> None:
+    """Routes the planner's requests through `router` (None sends them to EXECUTION_AGENT_BASE_URL)."""
+    global _router, _router_configured
+    with _a2a_client_lock:
+        _router, _router_configured = router, True
+
+def release_task_route(task_id: str) -> None:
+    """Drops a finished task's agent affinity from the router, if requests are routed."""
+    router = _router if _router_configured else None
+    if router is not None:
+        router.forget(task_id)
+
+def __getattr__(name: str):
+    # The former module-level settings and clients keep working for existing callers
+    if name == "a2a_client":
+        return get_a2a_client()
+    if name == "config":
+        return get_config()
+    if name == "llm_provider":
+        return get_llm_provider()
+    if name == "comm_log":
+        return get_communication_log()
+    if name == "EXECUTION_AGENT_BASE_URL":
+        return get_config().execution_agent_base_url
+    if name == "EXECUTION_AGENT_URL":
+        return get_config().execution_agent_base_url + EXECUTION_AGENT_SEND_PATH
+    if name == "EXECUTION_AGENT_STREAM_URL":
+        return get_config().execution_agent_base_url + EXECUTION_AGENT_STREAM_PATH
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Planning Agent System Prompt
 PLANNING_AGENT_SYSTEM_PROMPT = """You are a Planning Agent designed to break down complex tasks and orchestrate their execution by communicating with an Execution Agent via the A2A protocol.
@@ -57,33 +191,39 @@ When the task is complete, indicate this in your response.
 
 def send_a2a_request(request_payload: SendTaskRequest) -> Optional[SendTaskResponse]:
     """Sends an A2A request to the Execution Agent and returns the response."""
-    logger.info(f"Sending A2A request to {EXECUTION_AGENT_URL}")
-    payload_dict = request_payload.model_dump(exclude_none=True)
-    logger.info(f"Request Payload: {json.dumps(payload_dict, indent=2)}")
+    logger.info(f"Sending A2A request to {get_config().execution_agent_base_url}{EXECUTION_AGENT_SEND_PATH}")
+    start = time.perf_counter()
+    outcome = "error"
+    with phase(METRICS_COMPONENT, "serialization"):
+        request_body = encode_model(request_payload)
+    payload_log.log("Sending request", request_body)
+    A2A_PAYLOAD_BYTES.observe(len(request_body), component=METRICS_COMPONENT, direction="request")
 
     # Log the raw request payload to the communication log
-    with open("communication_log.txt", "a") as f:
-        f.write("--- Planning Agent Sent Request ---\n")
-        f.write(json.dumps(payload_dict, indent=2))
-        f.write("\n-------------------------------------\n")
+    with phase(METRICS_COMPONENT, "logging"):
+        get_communication_log().record("Planning Agent Sent Request", request_body)
 
     try:
-        response = requests.post(EXECUTION_AGENT_URL, json=payload_dict)
-        response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
-        response_payload = response.json()
-        logger.info(f"Received A2A response: {json.dumps(response_payload, indent=2)}")
+        router = get_router()
+        if router is not None:
+            # Every turn of a task goes to the agent holding its history
+            response_body = router.post_bytes(EXECUTION_AGENT_SEND_PATH, request_body, task_id=request_payload.params.id)
+        else:
+            response_body = get_a2a_client().post_bytes(EXECUTION_AGENT_SEND_PATH, request_body)
+        payload_log.log("Received response", response_body)
+        A2A_PAYLOAD_BYTES.observe(len(response_body), component=METRICS_COMPONENT, direction="response")
 
         # Log the raw response payload to the communication log
-        with open("communication_log.txt", "a") as f:
-            f.write("--- Planning Agent Received Response ---\n")
-            f.write(json.dumps(response_payload, indent=2))
-            f.write("\n----------------------------------------\n")
+        with phase(METRICS_COMPONENT, "logging"):
+            get_communication_log().record("Planning Agent Received Response", response_body)
 
-        # Validate the response payload
-        send_task_response = SendTaskResponse(**response_payload)
+        # Parse and validate the response payload in a single pass
+        with phase(METRICS_COMPONENT, "validation"):
+            send_task_response = decode_model(SendTaskResponse, response_body)
         if send_task_response.error:
             logger.error(f"Received error in A2A response: {send_task_response.error}")
             return None # Indicate error
+        outcome = "ok"
         return send_task_response
 
     except ValidationError as e:
@@ -95,15 +235,332 @@ def send_a2a_request(request_payload: SendTaskRequest) -> Optional[SendTaskRespo
     except Exception as e:
         logger.error(f"An unexpected error occurred during A2A communication: {e}", exc_info=True)
         return None
+    finally:
+        A2A_REQUESTS.inc(component=METRICS_COMPONENT, method="tasks/send", outcome=outcome)
+        A2A_REQUEST_SECONDS.observe(time.perf_counter() - start, component=METRICS_COMPONENT, method="tasks/send")
+
+@dataclass
+class StreamingResult:
+    """Outcome of a tasks/sendSubscribe call, with the timings observed while streaming."""
+    status: TaskStatus
+    text: str
+    time_to_first_token: Optional[float]
+    total_time: float
+    # Metadata of the final status event (the Execution Agent's load report)
+    metadata: Optional[Dict[str, Any]] = None
+
+def send_a2a_streaming_request(
+    request_payload: SendTaskStreamingRequest,
+    on_chunk: Optional[Callable[[str], None]] = None
+) -> Optional[StreamingResult]:
+    """Sends an A2A tasks/sendSubscribe request and consumes the Server-Sent Events stream.
+
+    Returns as soon as the final status event arrives, without waiting for the connection to close.
+    """
+    logger.info(f"Sending A2A streaming request to {get_config().execution_agent_base_url}{EXECUTION_AGENT_STREAM_PATH}")
+    request_body = encode_model(request_payload)
+
+    # Log the raw request payload to the communication log
+    get_communication_log().record("Planning Agent Sent Request", request_body)
+
+    start_time = time.perf_counter()
+    time_to_first_token: Optional[float] = None
+    chunks: List[str] = []
+    try:
+        router = get_router()
+        if router is not None:
+            stream = router.post_stream(EXECUTION_AGENT_STREAM_PATH, request_body, task_id=request_payload.params.id)
+        else:
+            stream = get_a2a_client().post_stream(EXECUTION_AGENT_STREAM_PATH, request_body)
+        with stream as response:
+            for line in response.iter_lines():
+                # Events are single "data:" lines separated by blank lines
+                if not line or not line.startswith(b"data:"):
+                    continue
+                event_body = line[len(b"data:"):].strip()
+                get_communication_log().record("Planning Agent Received Event", event_body)
+
+                event_response = decode_model(SendTaskStreamingResponse, event_body)
+                if event_response.error:
+                    logger.error(f"Received error in A2A stream: {event_response.error}")
+                    return None
+                event = event_response.result
+
+                if isinstance(event, TaskArtifactUpdateEvent):
+                    chunk_text = "".join(part.text for part in event.artifact.parts if isinstance(part, TextPart))
+                    if chunk_text:
+                        if time_to_first_token is None:
+                            time_to_first_token = time.perf_counter() - start_time
+                            logger.info(f"Time to first token: {time_to_first_token * 1000:.1f} ms")
+                        chunks.append(chunk_text)
+                        if on_chunk:
+                            on_chunk(chunk_text)
+                elif isinstance(event, TaskStatusUpdateEvent):
+                    logger.info(f"Task {event.id} status update: {event.status.state}")
+                    if event.final:
+                        total_time = time.perf_counter() - start_time
+                        logger.info(f"Stream completed in {total_time * 1000:.1f} ms")
+                        return StreamingResult(
+                            status=event.status,
+                            text="".join(chunks),
+                            time_to_first_token=time_to_first_token,
+                            total_time=total_time,
+                            metadata=event.metadata
+                        )
+
+        logger.error("A2A stream ended without a final status event.")
+        return None
+
+    except ValidationError as e:
+        logger.error(f"Stream event validation failed: {e.errors()}", exc_info=True)
+        return None
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error sending A2A streaming request: {e}", exc_info=True)
+        return None
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during A2A streaming: {e}", exc_info=True)
+        return None
+
+class PushNotificationReceiver:
+    """Local webhook that receives push notifications from the Execution Agent.
+
+    Each notification carries the updated Task; `wait_for_task` returns them in arrival
+    order per task. Requests without the expected bearer token are rejected.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5050, path: str = "/a2a/push", token: Optional[str] = None):
+        self.path = path
+        self.token = token or uuid.uuid4().hex
+        self._queues: Dict[str, "queue.Queue[Task]"] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, name="push-receiver", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def config(self) -> PushNotificationConfig:
+        return PushNotificationConfig(url=self.url, token=self.token)
+
+    def _task_queue(self, task_id: str) -> "queue.Queue[Task]":
+        with self._lock:
+            return self._queues.setdefault(task_id, queue.Queue())
+
+    def _make_handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != receiver.path:
+                    self.send_error(404)
+                    return
+                if self.headers.get("Authorization") != f"Bearer {receiver.token}":
+                    self.send_error(401)
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                try:
+                    task = Task.model_validate_json(body)
+                except ValidationError as e:
+                    logger.error(f"Invalid push notification payload: {e.errors()}")
+                    self.send_error(400)
+                    return
+                get_communication_log().record("Planning Agent Received Push Notification", body)
+                receiver._task_queue(task.id).put(task)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                logger.debug(f"Push receiver: {format % args}")
+
+        return Handler
+
+    def start(self) -> "PushNotificationReceiver":
+        self._thread.start()
+        logger.info(f"Push notification receiver listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def wait_for_task(self, task_id: str, timeout: Optional[float] = 120.0) -> Optional[Task]:
+        """Waits for the next pushed Task update of a task. Returns None on timeout."""
+        try:
+            return self._task_queue(task_id).get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+def format_planning_prompt(task_id: str, user_goal: str, history_text: str) -> str:
+    return f"""{PLANNING_AGENT_SYSTEM_PROMPT}
+
+Current Task ID: {task_id}
+Task History:
+{history_text}
 
-def plan_and_execute_task(user_goal: str):
-    """Manages the task planning and execution flow."""
+Analyze the task history and the user's original goal: "{user_goal}".
+Determine the next instruction for the Execution Agent, or whether the goal is already achieved.
+Respond with JSON only, in this form:
+{{"done": false, "next_instruction": "...", "confidence": 0.8}}
+Set "done" to true (and "next_instruction" to "") as soon as the history shows the goal is achieved;
+"confidence" (0 to 1) is how sure you are of that decision.
+"""
+
+# Plain-text answers that end a goal, after normalize_decision_text
+DONE_ANSWERS = {"TASK_COMPLETE", "TASK COMPLETE", "DONE", "COMPLETE"}
+
+# Markers that also end a goal on the first or last line of a longer plain-text answer
+COMPLETION_MARKERS = {"TASK_COMPLETE", "TASK COMPLETE"}
+
+# Sent instead of ending a goal when the Planning LLM's "done" is below PlannerConfig.done_confidence
+CONFIRM_DONE_INSTRUCTION = "Confirm whether the goal is fully achieved and summarize the final result."
+
+def normalize_decision_text(text: str) -> str:
+    return re.sub(r"[^A-Z_ ]", "", text.upper()).strip(" _")
+
+def parse_planner_decision(text: str, done_confidence: float = 0.0) -> DataPart:
+    """Parses the Planning LLM's answer into a DataPart with `done`, `next_instruction` and `confidence`.
+
+    Accepts the JSON object on its own or surrounded by prose/code fences. Any other answer
+    is read as a legacy plain-text one: it ends the goal if the whole answer is a done token
+    such as "TASK_COMPLETE" (in any case, quoted or punctuated) or its first or last line is
+    "TASK_COMPLETE"; anything else, including instructions that merely contain a line such
+    as "Done", is the next instruction. A "done"
+    below `done_confidence` is turned into a request to confirm the result.
+    """
+    text = text.strip()
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        decision = json.loads(text[start:end + 1]) if start != -1 and end > start else None
+    except json.JSONDecodeError:
+        decision = None
+
+    if isinstance(decision, dict) and ("done" in decision or "next_instruction" in decision):
+        done = decision.get("done")
+        done = done.strip().lower() in ("true", "yes", "1") if isinstance(done, str) else bool(done)
+        next_instruction = decision.get("next_instruction")
+        next_instruction = str(next_instruction).strip() if next_instruction is not None else ""
+        try:
+            confidence = min(max(float(decision.get("confidence", 1.0)), 0.0), 1.0)
+        except (TypeError, ValueError):
+            confidence = 1.0
+    else:
+        lines = [normalize_decision_text(line) for line in text.splitlines() if line.strip()]
+        done = normalize_decision_text(text) in DONE_ANSWERS or bool(lines) and (lines[0] in COMPLETION_MARKERS or lines[-1] in COMPLETION_MARKERS)
+        next_instruction = "" if done else text
+        confidence = 1.0
+
+    if done and confidence < done_confidence:
+        logger.info(f"Planning LLM reported done with confidence {confidence:.2f} (< {done_confidence:.2f}); asking for confirmation.")
+        done, next_instruction = False, next_instruction or CONFIRM_DONE_INSTRUCTION
+    return DataPart(data={"done": done, "next_instruction": next_instruction, "confidence": confidence})
+
+def build_planning_prompt(task_id: str, user_goal: str, history: List[Message], context: Optional[PlannerContext] = None) -> str:
+    """Builds the prompt asking the Planning LLM for the next instruction.
+
+    With a PlannerContext the history is compacted to fit its token budget, and the sizes
+    before and after compaction are available in `context.last_stats`; without one the
+    whole history is included as JSON.
+    """
+    if context is None:
+        history_text = json.dumps([msg.model_dump(mode='json', exclude_none=True) for msg in history], indent=2)
+        return format_planning_prompt(task_id, user_goal, history_text)
+    context.update(history)
+    reserved_tokens = estimate_tokens(format_planning_prompt(task_id, user_goal, ""))
+    return format_planning_prompt(task_id, user_goal, context.render(reserved_tokens))
+
+def summarize_with_llm(previous_summary: str, messages: List[CompactMessage]) -> str:
+    """Planner context summarizer that asks the Planning LLM to fold messages into the running summary."""
+    new_messages = "\n".join(f"{role}: {text}" for role, text in messages)
+    prompt = f"""Update the running summary of a conversation between a Planning Agent (user) and an Execution Agent (agent).
+Keep decisions, results and open points; drop pleasantries. Answer with the updated summary only, in at most 10 short lines.
+
+Current summary:
+{previous_summary or "(empty)"}
+
+New messages:
+{new_messages}
+"""
+    return get_llm_provider().generate(contents=[{"role": "user", "parts": [{"text": prompt}]}])
+
+def merge_history(local_history: List[Message], task: Task) -> bool:
+    """Merges the history returned by the Execution Agent into the local copy, in place.
+
+    The server reports where the returned slice starts in `metadata.historyOffset`; without
+    it the returned history is taken to be complete. Returns False if the slice leaves a gap.
+    """
+    offset = (task.metadata or {}).get("historyOffset", 0)
+    if offset > len(local_history):
+        logger.warning(f"History delta for Task ID {task.id} starts at {offset} but only {len(local_history)} messages are known locally.")
+        return False
+    local_history[offset:] = task.history or []
+    return True
+
+@dataclass
+class GoalStats:
+    """Outcome of one goal: turns sent to the Execution Agent, turns saved by ending early, and wall time."""
+    task_id: str
+    max_turns: int
+    turns: int = 0
+    completed: bool = False
+    error: Optional[str] = None
+    wall_time: float = 0.0
+    pacing_wait: float = 0.0
+
+    @property
+    def turns_saved(self) -> int:
+        """Turns left unused because the Planning LLM reported the goal done."""
+        return self.max_turns - self.turns if self.completed else 0
+
+    @property
+    def outcome(self) -> str:
+        return "completed" if self.completed else ("error" if self.error else "max_turns")
+
+def record_goal_metrics(stats: GoalStats, component: str) -> None:
+    PLANNER_GOALS.inc(component=component, outcome=stats.outcome)
+    PLANNER_GOAL_SECONDS.observe(stats.wall_time, component=component)
+    if stats.turns_saved:
+        PLANNER_TURNS_SAVED.inc(stats.turns_saved, component=component)
+
+def pace_turn(pacer: TurnPacer, stats: GoalStats, metadata: Optional[Dict[str, Any]]) -> None:
+    """Waits before the next turn as long as the pacer asks, given the load reported with the last result."""
+    delay = pacer.next_delay(load_report_of(metadata))
+    if delay > 0 and stats.turns < stats.max_turns:
+        stats.pacing_wait += delay
+        time.sleep(delay)
+
+def plan_and_execute_task(
+    user_goal: str,
+    stream: bool = False,
+    history_delta: bool = True,
+    push_receiver: Optional[PushNotificationReceiver] = None,
+    max_turns: int = 5,
+    pacer: Optional[TurnPacer] = None
+) -> GoalStats:
+    """Manages the task planning and execution flow.
+
+    With history_delta, each request asks only for the messages the planner does not have yet
+    and the full history is kept locally. With a push_receiver, each turn is submitted
+    asynchronously and its result arrives as a push notification. The planning prompt
+    carries a compacted history (see planner_context.py) unless PLANNER_CONTEXT=off.
+    The goal ends as soon as the Planning LLM reports it done, and turns are paced by the
+    Execution Agent's reported load (PLANNER_PACING, see turn_pacing.py).
+    """
     task_id = str(uuid.uuid4())
-    logger.info(f"Starting new task with ID: {task_id}")
+    # Carried in the metadata of every message of this goal, so it can be followed across both agents
+    trace_id = new_trace_id()
+    logger.info(f"Starting new task with ID: {task_id} (trace {trace_id})")
 
     current_task: Optional[Task] = None
+    local_history: List[Message] = []
     turn_count = 0
-    max_turns = 5 # Limit turns for demo purposes
+    llm_provider = get_llm_provider()
+    summarizer = summarize_with_llm if llm_provider and os.getenv("PLANNER_CONTEXT_SUMMARIZER") == "llm" else None
+    planner_context = create_planner_context_from_env(summarizer)
+    pacer = pacer or create_turn_pacer_from_env()
+    goal_stats = GoalStats(task_id=task_id, max_turns=max_turns)
+    start_time = time.perf_counter()
 
     while turn_count < max_turns:
         turn_count += 1
@@ -119,49 +576,49 @@ def plan_and_execute_task(user_goal: str):
             # Subsequent messages based on Planning Agent's LLM analysis of the response
             if current_task and current_task.history:
                 # Use the Planning Agent LLM to decide the next step
-                planning_prompt = f"""{PLANNING_AGENT_SYSTEM_PROMPT}
-
-Current Task ID: {task_id}
-Task History:
-{json.dumps([msg.model_dump(exclude_none=True) for msg in current_task.history], indent=2)}
-
-Analyze the task history and the user's original goal: "{user_goal}".
-Determine the next instruction for the Execution Agent.
-If the task is complete based on the history, respond with "TASK_COMPLETE".
-Otherwise, provide the next instruction as a plain text message for the Execution Agent.
-"""
+                planning_prompt = build_planning_prompt(task_id, user_goal, current_task.history, planner_context)
                 logger.info(f"Sending planning prompt to LLM for Task ID {task_id}, Turn {turn_count}.")
-                next_instruction = "Error: LLM not configured or generated no text."
-                if genai_client:
+                if planner_context is not None and planner_context.last_stats is not None:
+                    stats = planner_context.last_stats
+                    logger.info(
+                        f"Planning prompt: ~{stats.full_tokens} tokens uncompacted, ~{stats.compacted_tokens} tokens sent "
+                        f"({stats.reduction:.0%} smaller; {stats.window_messages} recent messages, {stats.summarized_messages} summarized)."
+                    )
+                planner_answer = "Error: LLM not configured or generated no text."
+                if llm_provider:
                     try:
-                        llm_response = genai_client.generate_content(
-                             contents=[
-                                {"role": "user", "parts": [{"text": planning_prompt}]}
-                            ]
-                        )
-                        if hasattr(llm_response, 'text'):
-                            next_instruction = llm_response.text.strip()
-                            logger.info(f"Planning LLM generated instruction: '{next_instruction[:100]}...'")
-                        else:
-                            next_instruction = str(llm_response).strip()
-                            logger.warning(f"Planning LLM response has no text attribute. Using string representation: {next_instruction[:100]}...")
+                        with LLM_CALL_SECONDS.time(component=METRICS_COMPONENT):
+                            planner_answer = llm_provider.generate(
+                                 contents=[
+                                    {"role": "user", "parts": [{"text": planning_prompt}]}
+                                ]
+                            ).strip()
+                        LLM_CALLS.inc(component=METRICS_COMPONENT, outcome="ok")
+                        logger.info(f"Planning LLM answered: '{planner_answer[:100]}...'")
 
                     except Exception as e:
+                        LLM_CALLS.inc(component=METRICS_COMPONENT, outcome="error")
                         logger.error(f"Error during Planning LLM processing for Task ID {task_id}: {e}", exc_info=True)
-                        next_instruction = f"Error: Planning LLM failed - {e}"
+                        planner_answer = f"Error: Planning LLM failed - {e}"
                 else:
-                    logger.warning("Gemini client not initialized. Cannot use Planning LLM.")
-
+                    logger.warning("LLM provider not initialized. Cannot use Planning LLM.")
 
-                if next_instruction == "TASK_COMPLETE":
-                    logger.info(f"Planning Agent determined task {task_id} is complete.")
+                decision = parse_planner_decision(planner_answer, get_config().done_confidence).data
+                if decision["done"]:
+                    logger.info(f"Planning Agent determined task {task_id} is complete (confidence {decision['confidence']:.2f}).")
+                    goal_stats.completed = True
                     break # Exit the loop if task is complete
+                if not decision["next_instruction"]:
+                    goal_stats.error = "Planning LLM gave no next instruction."
+                    logger.error(f"{goal_stats.error} Task ID {task_id}.")
+                    break
 
-                message_content = next_instruction
+                message_content = decision["next_instruction"]
                 message_role = "user" # Message from Planning Agent to Execution Agent is "user" role
                 logger.info(f"Turn {turn_count}: Sending next instruction to Execution Agent.")
 
             else:
+                goal_stats.error = "Task history is empty after turn 1."
                 logger.error(f"Task history is empty or None for Task ID {task_id} after turn 1. Cannot continue.")
                 break # Exit if history is unexpectedly empty
 
@@ -169,14 +626,41 @@ Otherwise, provide the next instruction as a plain text message for the Executio
         text_part = TextPart(text=message_content)
         user_a2a_message = Message(
             role=message_role,
-            parts=[text_part]
+            parts=[text_part],
+            metadata=trace_metadata(trace_id)
         )
 
         # Construct the A2A SendTaskRequest
         task_send_params = TaskSendParams(
             id=task_id,
-            message=user_a2a_message
+            message=user_a2a_message,
+            metadata={"historyOffset": len(local_history)} if history_delta else None,
+            pushNotification=push_receiver.config() if push_receiver else None
         )
+
+        if stream:
+            # Stream the response; the server only sends events, so the history is tracked locally
+            streaming_request = SendTaskStreamingRequest(
+                jsonrpc="2.0",
+                id=str(uuid.uuid4()), # Use a new JSON-RPC request ID for each request
+                params=task_send_params
+            )
+            streaming_result = send_a2a_streaming_request(streaming_request)
+            if streaming_result is None:
+                goal_stats.error = "No valid streaming response received."
+                logger.error(f"No valid streaming response received for Task ID {task_id}.")
+                break # Stop if no valid response
+            goal_stats.turns += 1
+
+            local_history.append(user_a2a_message)
+            if streaming_result.status.message:
+                local_history.append(streaming_result.status.message)
+            current_task = Task(id=task_id, status=streaming_result.status, history=local_history)
+            logger.info(f"Streamed turn for Task ID {task_id}. Status: {current_task.status.state}")
+
+            pace_turn(pacer, goal_stats, streaming_result.metadata)
+            continue
+
         send_request = SendTaskRequest(
             jsonrpc="2.0",
             id=str(uuid.uuid4()), # Use a new JSON-RPC request ID for each request
@@ -186,44 +670,83 @@ Otherwise, provide the next instruction as a plain text message for the Executio
         # Send the request and get the response
         response = send_a2a_request(send_request)
 
+        if push_receiver and response and response.result:
+            # The request was only submitted; the turn's result is pushed to the local webhook
+            logger.info(f"Task {task_id} submitted. Waiting for push notification.")
+            pushed_task = push_receiver.wait_for_task(task_id)
+            if pushed_task is None:
+                goal_stats.error = "Timed out waiting for push notification."
+                logger.error(f"Timed out waiting for push notification for Task ID {task_id}.")
+                break
+            response.result = pushed_task
+
         if response and response.result:
+            goal_stats.turns += 1
             current_task = response.result
+            if not merge_history(local_history, current_task):
+                goal_stats.error = "Could not merge history delta."
+                logger.error(f"Could not merge history delta for Task ID {task_id}.")
+                break
+            current_task.history = local_history
             logger.info(f"Received updated Task object for ID {task_id}. Status: {current_task.status.state}")
-            # Log the full task history received
+            # Log the task history received
             if current_task and current_task.history is not None:
-                logger.info(f"Full Task History Received:\n{json.dumps([msg.model_dump(exclude_none=True) for msg in current_task.history], indent=2)}")
+                payload_log.log("Task history received", current_task.history, task_id=task_id)
             else:
                 logger.info("Full Task History Received: None or empty.")
 
-            # Add a small delay before the next turn
-            time.sleep(1)
+            pace_turn(pacer, goal_stats, current_task.metadata)
         elif response and response.error:
+             goal_stats.error = f"Error response: {response.error.message}"
              logger.error(f"Received error response for Task ID {task_id}: {response.error}")
              break # Stop if an error is received
         else:
+            goal_stats.error = "No valid response received."
             logger.error(f"No valid response received for Task ID {task_id}.")
             break # Stop if no valid response
 
-    logger.info(f"Task {task_id} finished after {turn_count} turns.")
+    goal_stats.wall_time = time.perf_counter() - start_time
+    record_goal_metrics(goal_stats, METRICS_COMPONENT)
+    # The goal sends no more turns of this task
+    release_task_route(task_id)
+    logger.info(
+        f"Task {task_id} finished after {goal_stats.turns} turns in {goal_stats.wall_time:.2f}s ({goal_stats.outcome}; "
+        f"{goal_stats.turns_saved} of {max_turns} turns saved, {goal_stats.pacing_wait:.2f}s pacing)."
+    )
     if current_task:
         logger.info(f"Final Task Status: {current_task.status.state}")
         if current_task and current_task.history is not None:
-            logger.info(f"Final Task History:\n{json.dumps([msg.model_dump(exclude_none=True) for msg in current_task.history], indent=2)}")
+            payload_log.log("Final task history", current_task.history, task_id=task_id)
         else:
             logger.warning("No final task history available.")
     else:
         logger.warning(f"No final task object available for Task ID {task_id}.")
+    return goal_stats
 
 
 if __name__ == '__main__':
-    # Ensure communication_log.txt exists or is cleared for a new run
+    init()
+    # Ensure the communication log is cleared for a new run
     # This is also done by the execution agent, but doing it here ensures it's clear
-    if os.path.exists("communication_log.txt"):
-        os.remove("communication_log.txt")
-    # Create an empty log file
-    open("communication_log.txt", "w").close()
-    logger.info("communication_log.txt initialized by Planning Agent.")
+    get_communication_log().reset()
+    logger.info("Communication log initialized by Planning Agent.")
 
     # Example user goal
     example_goal = "Tell me a short, funny story about a robot chef."
-    plan_and_execute_task(example_goal)
+    # Set A2A_STREAMING=1 to use tasks/sendSubscribe and observe time-to-first-token,
+    # or A2A_PUSH=1 to submit turns asynchronously and receive results on a local webhook
+    push_receiver = None
+    if os.getenv("A2A_PUSH") == "1":
+        push_receiver = PushNotificationReceiver(port=int(os.getenv("A2A_PUSH_PORT", "5050"))).start()
+    plan_and_execute_task(
+        example_goal,
+        stream=os.getenv("A2A_STREAMING") == "1",
+        push_receiver=push_receiver,
+        max_turns=int(os.getenv("PLANNER_MAX_TURNS", "5")) # Limit turns for demo purposes
+    )
+    if push_receiver:
+        push_receiver.stop()
+
+    # Make sure every queued record reaches the log before exiting
+    get_communication_log().flush(timeout=5.0)
+    write_metrics_from_env()
@@ -0,0 +1,167 @@
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Union
+
+import requests
+
+from a2a_client import RetryPolicy, RETRYABLE_STATUS_CODES
+from a2a_models import PushNotificationConfig
+from a2a_serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class PushNotificationSender:
+    """Delivers push notifications to client webhooks from a bounded outbound queue.
+
+    `notify` never blocks: when the queue is full the notification is dropped and
+    counted. Worker threads POST each notification, retrying connection failures and
+    transient HTTP statuses with exponential backoff.
+
+    Webhook configs are kept per task until the task is canceled or found gone from the
+    task store (`remove_config`), for at most `max_configs` tasks and `config_ttl_seconds`
+    since their last use, matching the task store's own limits. They live in this process
+    only: with several server workers, a config registered through
+    tasks/pushNotification/set is unknown to the other workers, so clients should pass
+    `pushNotification` with every tasks/send (as the Planning Agent does) for the worker
+    that takes the turn to know the webhook.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 1000,
+        workers: int = 2,
+        retry_policy: Optional[RetryPolicy] = None,
+        timeout: float = 10.0,
+        max_configs: int = 10000,
+        config_ttl_seconds: Optional[float] = 3600.0,
+    ):
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=5, backoff_base=0.5, backoff_max=30.0)
+        self.timeout = timeout
+        self.max_configs = max_configs
+        self.config_ttl_seconds = config_ttl_seconds
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.expired_configs = 0
+        # task_id -> (config, last use time), least recently used first
+        self._configs: "OrderedDict[str, Tuple[PushNotificationConfig, float]]" = OrderedDict()
+        self._queue: "queue.Queue[Optional[Tuple[PushNotificationConfig, Union[Dict[str, Any], bytes]]]]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"push-notifier-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def set_config(self, task_id: str, config: PushNotificationConfig) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._configs.pop(task_id, None)
+            self._configs[task_id] = (config, now)
+            self._evict_configs(now)
+
+    def get_config(self, task_id: str) -> Optional[PushNotificationConfig]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_configs(now)
+            entry = self._configs.get(task_id)
+            if entry is None:
+                return None
+            self._configs[task_id] = (entry[0], now)
+            self._configs.move_to_end(task_id)
+            return entry[0]
+
+    def remove_config(self, task_id: str) -> bool:
+        """Forgets the task's webhook. Returns False if none was configured."""
+        with self._lock:
+            return self._configs.pop(task_id, None) is not None
+
+    def _evict_configs(self, now: float) -> None:
+        evicted = 0
+        # Entries are ordered by last use, so expired ones are all at the front
+        while self._configs and (
+            len(self._configs) > self.max_configs
+            or (self.config_ttl_seconds is not None and now - next(iter(self._configs.values()))[1] >= self.config_ttl_seconds)
+        ):
+            self._configs.popitem(last=False)
+            evicted += 1
+        self.expired_configs += evicted
+
+    def notify(self, task_id: str, payload: Union[Dict[str, Any], bytes]) -> bool:
+        """Queues a notification for the task's webhook. Returns False if none is configured or the queue is full.
+
+        The payload is either JSON-compatible data or already-encoded JSON bytes.
+        """
+        config = self.get_config(task_id)
+        if config is None:
+            return False
+        try:
+            self._queue.put_nowait((config, payload))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning(f"Push notification queue full; dropped notification for Task ID {task_id}.")
+            return False
+        return True
+
+    def _deliver(self, config: PushNotificationConfig, payload: Union[Dict[str, Any], bytes]) -> bool:
+        headers = {"Content-Type": "application/json"}
+        if config.token:
+            headers["Authorization"] = f"Bearer {config.token}"
+        body = payload if isinstance(payload, bytes) else dumps(payload)
+        for attempt in range(self.retry_policy.max_retries + 1):
+            try:
+                response = self._session.post(str(config.url), data=body, headers=headers, timeout=self.timeout)
+                if response.status_code < 300:
+                    return True
+                if response.status_code not in RETRYABLE_STATUS_CODES and response.status_code < 500:
+                    logger.error(f"Push notification to {config.url} rejected with HTTP {response.status_code}.")
+                    return False
+                error = f"HTTP {response.status_code}"
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+            if attempt < self.retry_policy.max_retries:
+                delay = self.retry_policy.delay(attempt)
+                logger.warning(f"Push notification to {config.url} failed ({error}); retrying in {delay:.2f}s.")
+                time.sleep(delay)
+        logger.error(f"Giving up on push notification to {config.url} after {self.retry_policy.max_retries + 1} attempts.")
+        return False
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            config, payload = item
+            delivered = self._deliver(config, payload)
+            with self._lock:
+                if delivered:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            self._queue.task_done()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "queue_depth": self._queue.qsize(),
+                "configs": len(self._configs),
+                "expired_configs": self.expired_configs,
+            }
+
+    def close(self) -> None:
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5.0)
+        self._session.close()
@@ -0,0 +1,337 @@
+import re
+import sys
+import json
+import time
+import uuid
+import asyncio
+import difflib
+import logging
+import argparse
+import statistics
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, List, Optional
+
+import aiohttp
+
+from a2a_serialization import dumps, loads
+from communication_log import DEFAULT_LOG_PATH, iter_records, rotated_paths
+
+logger = logging.getLogger(__name__)
+
+# Communication log events carrying requests and responses, per recording side
+REQUEST_EVENTS = {"execution": "Execution Agent Received Request", "planner": "Planning Agent Sent Request"}
+RESPONSE_EVENTS = {"execution": "Execution Agent Sent Response", "planner": "Planning Agent Received Response"}
+
+# Methods whose recorded responses can be compared (streaming responses are event sequences)
+REPLAYABLE_METHODS = {"tasks/send", "tasks/get", "tasks/cancel", "tasks/pushNotification/set", "tasks/pushNotification/get"}
+
+_TEXT_HEADER = re.compile(r"^--- (.+) ---$")
+
+
+@dataclass
+class Exchange:
+    """A recorded request, its recorded response and, after replay, the new response."""
+    index: int
+    request: Dict[str, Any]
+    recorded_at: Optional[float] = None
+    recorded_response: Optional[Dict[str, Any]] = None
+    recorded_latency: Optional[float] = None
+    response: Optional[Dict[str, Any]] = None
+    latency: Optional[float] = None
+    error: Optional[str] = None
+    comparison: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def method(self) -> str:
+        return self.request.get("method", "")
+
+    @property
+    def task_id(self) -> Optional[str]:
+        return (self.request.get("params") or {}).get("id")
+
+
+def parse_text_log(path: str) -> List[Dict[str, Any]]:
+    """Parses the human-readable layout ("--- Event ---", pretty-printed JSON, dashed rule).
+
+    That layout has no timestamps, so the records' `ts` is None.
+    """
+    records = []
+    event: Optional[str] = None
+    body: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.rstrip("\n")
+            if event is None:
+                match = _TEXT_HEADER.match(line)
+                if match:
+                    event, body = match.group(1), []
+                continue
+            # Pretty-printed JSON never has a line of dashes only; the rule's width varies between writers
+            if line and set(line) == {"-"}:
+                try:
+                    records.append({"ts": None, "event": event, "payload": json.loads("\n".join(body))})
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed record ending at {path}:{line_number}")
+                event = None
+                continue
+            body.append(line)
+    return records
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """Loads records from a JSONL communication log (with its rotated backups), a JSONL file of
+    raw JSON-RPC requests, or the human-readable text log."""
+    with open(path, "r", encoding="utf-8") as f:
+        first = next((line.strip() for line in f if line.strip()), "")
+    if not first.startswith("{"):
+        return parse_text_log(path)
+
+    records = []
+    skipped = 0
+    for record in iter_records(rotated_paths(path) or [path]):
+        if isinstance(record, dict) and "event" in record and "payload" in record:
+            records.append(record)
+        elif isinstance(record, dict) and "jsonrpc" in record and "method" in record:
+            # A bare request (e.g. a benchmark payload file); replayed without timing
+            records.append({"ts": None, "event": REQUEST_EVENTS["execution"], "payload": record})
+        else:
+            skipped += 1
+    if skipped:
+        logger.warning(f"Skipped {skipped} lines of {path} that are neither log records nor JSON-RPC requests.")
+    return records
+
+
+def build_exchanges(records: Iterable[Dict[str, Any]], side: Optional[str] = None, methods: Optional[set] = None) -> List[Exchange]:
+    """Pairs recorded requests with their responses by JSON-RPC id.
+
+    Both agents may write to the same log, so every request can appear twice; only one
+    side is used, the Execution Agent's by default when it is present.
+    """
+    records = list(records)
+    if side is None:
+        side = "execution" if any(r.get("event") == REQUEST_EVENTS["execution"] for r in records) else "planner"
+    methods = methods or {"tasks/send"}
+
+    exchanges: List[Exchange] = []
+    pending: Dict[Any, List[Exchange]] = {}
+    for record in records:
+        payload = record.get("payload")
+        if not isinstance(payload, dict):
+            continue
+        if record.get("event") == REQUEST_EVENTS[side]:
+            if payload.get("method") not in methods:
+                continue
+            exchange = Exchange(index=len(exchanges), request=payload, recorded_at=record.get("ts"))
+            exchanges.append(exchange)
+            pending.setdefault(payload.get("id"), []).append(exchange)
+        elif record.get("event") == RESPONSE_EVENTS[side]:
+            waiting = pending.get(payload.get("id"))
+            if not waiting:
+                continue
+            exchange = waiting.pop(0)
+            exchange.recorded_response = payload
+            if exchange.recorded_at is not None and record.get("ts") is not None:
+                exchange.recorded_latency = record["ts"] - exchange.recorded_at
+    return exchanges
+
+
+def response_text(response: Optional[Dict[str, Any]]) -> str:
+    """Text of the agent message a tasks/send response carries."""
+    message = (((response or {}).get("result") or {}).get("status") or {}).get("message") or {}
+    return "".join(part.get("text", "") for part in message.get("parts") or [])
+
+
+def compare(exchange: Exchange, similarity_threshold: float = 0.6) -> Dict[str, Any]:
+    """Compares the new response with the recorded one.
+
+    Regressions are a failed request, a JSON-RPC error that was not recorded (or a different
+    code) and a different task state. The reply text is graded identical, similar or different.
+    """
+    if exchange.error is not None:
+        return {"outcome": "regression", "reasons": [f"request failed: {exchange.error}"]}
+    if exchange.recorded_response is None:
+        return {"outcome": "unrecorded", "reasons": []}
+
+    recorded, new = exchange.recorded_response, exchange.response or {}
+    reasons = []
+    recorded_error = (recorded.get("error") or {}).get("code")
+    new_error = (new.get("error") or {}).get("code")
+    if recorded_error != new_error:
+        reasons.append(f"error code {recorded_error} -> {new_error}")
+    recorded_state = ((recorded.get("result") or {}).get("status") or {}).get("state")
+    new_state = ((new.get("result") or {}).get("status") or {}).get("state")
+    if recorded_state != new_state:
+        reasons.append(f"state {recorded_state} -> {new_state}")
+
+    recorded_text, new_text = response_text(recorded), response_text(new)
+    similarity = 1.0 if recorded_text == new_text else difflib.SequenceMatcher(None, recorded_text, new_text).ratio()
+    text = "identical" if similarity == 1.0 else ("similar" if similarity >= similarity_threshold else "different")
+    return {"outcome": "regression" if reasons else "ok", "reasons": reasons, "text": text, "similarity": similarity}
+
+
+def remap_task_ids(exchanges: List[Exchange]) -> None:
+    """Gives every recorded task a fresh ID, so that a replay does not extend the recorded histories."""
+    mapping: Dict[str, str] = {}
+    for exchange in exchanges:
+        params = exchange.request.get("params")
+        if isinstance(params, dict) and params.get("id"):
+            params["id"] = mapping.setdefault(params["id"], str(uuid.uuid4()))
+
+
+def request_path(method: str) -> str:
+    return "/a2a/tasks/send" if method == "tasks/send" else "/a2a"
+
+
+def schedule(exchanges: List[Exchange], speed: Optional[float]) -> Dict[int, float]:
+    """Send offsets in seconds from the start of the replay; all zero without timing or timestamps."""
+    timestamps = [e.recorded_at for e in exchanges if e.recorded_at is not None]
+    if not speed or len(timestamps) < len(exchanges):
+        if speed and exchanges:
+            logger.warning("The recording has no timestamps; replaying as fast as possible.")
+        return {e.index: 0.0 for e in exchanges}
+    start = min(timestamps)
+    return {e.index: (e.recorded_at - start) / speed for e in exchanges}
+
+
+async def replay(exchanges: List[Exchange], target: str, speed: Optional[float] = 1.0, max_in_flight: int = 64, timeout: float = 120.0) -> float:
+    """Re-sends the recorded requests and stores each response and latency on its exchange.
+
+    Turns of the same task are sent in their recorded order, each after the previous one has
+    completed; different tasks run concurrently. With `speed`, each request also waits until
+    its recorded time divided by `speed`. Returns the wall time of the replay.
+    """
+    offsets = schedule(exchanges, speed)
+    chains: Dict[Optional[str], List[Exchange]] = {}
+    for exchange in exchanges:
+        chains.setdefault(exchange.task_id, []).append(exchange)
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def send(session: aiohttp.ClientSession, exchange: Exchange) -> None:
+        async with semaphore:
+            sent = time.perf_counter()
+            try:
+                async with session.post(target + request_path(exchange.method), data=dumps(exchange.request), headers={"Content-Type": "application/json"}) as response:
+                    body = await response.read()
+                exchange.latency = time.perf_counter() - sent
+                exchange.response = loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                exchange.latency = time.perf_counter() - sent
+                exchange.error = f"{type(e).__name__}: {e}"
+
+    async def run_chain(session: aiohttp.ClientSession, chain: List[Exchange], start: float) -> None:
+        for exchange in chain:
+            delay = start + offsets[exchange.index] - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await send(session, exchange)
+
+    connector = aiohttp.TCPConnector(limit=max_in_flight)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_chain(session, chain, start) for chain in chains.values()))
+        return time.perf_counter() - start
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize(exchanges: List[Exchange], wall_time: float, latency_threshold: float = 0.2) -> Dict[str, Any]:
+    """Aggregates the comparison outcomes and the recorded vs. replayed latencies."""
+    outcomes: Dict[str, int] = {}
+    texts: Dict[str, int] = {}
+    for exchange in exchanges:
+        outcomes[exchange.comparison["outcome"]] = outcomes.get(exchange.comparison["outcome"], 0) + 1
+        if "text" in exchange.comparison:
+            texts[exchange.comparison["text"]] = texts.get(exchange.comparison["text"], 0) + 1
+    summary: Dict[str, Any] = {"requests": len(exchanges), "wall_time_s": wall_time, "outcomes": outcomes, "reply_text": texts}
+
+    latencies = {
+        "replayed": [e.latency for e in exchanges if e.latency is not None and e.error is None],
+        "recorded": [e.recorded_latency for e in exchanges if e.recorded_latency is not None],
+    }
+    for name, values in latencies.items():
+        if values:
+            summary[f"{name}_latency_ms"] = {
+                "mean": 1000 * statistics.mean(values),
+                "p50": 1000 * percentile(values, 0.50),
+                "p95": 1000 * percentile(values, 0.95),
+                "max": 1000 * max(values),
+            }
+    if latencies["replayed"] and latencies["recorded"]:
+        recorded_p95 = percentile(latencies["recorded"], 0.95)
+        replayed_p95 = percentile(latencies["replayed"], 0.95)
+        summary["p95_ratio"] = replayed_p95 / recorded_p95 if recorded_p95 > 0 else None
+        summary["latency_regression"] = recorded_p95 > 0 and replayed_p95 > recorded_p95 * (1 + latency_threshold)
+    return summary
+
+
+def print_summary(summary: Dict[str, Any], exchanges: List[Exchange], show: int = 10) -> None:
+    print(f"Replayed {summary['requests']} requests in {summary['wall_time_s']:.2f}s")
+    print(f"  outcomes: {summary['outcomes']}  reply text: {summary['reply_text']}")
+    for name in ("recorded", "replayed"):
+        stats = summary.get(f"{name}_latency_ms")
+        if stats:
+            print(f"  {name:<8} latency ms: mean {stats['mean']:.1f}  p50 {stats['p50']:.1f}  p95 {stats['p95']:.1f}  max {stats['max']:.1f}")
+    if summary.get("p95_ratio") is not None:
+        verdict = "REGRESSION" if summary["latency_regression"] else "ok"
+        print(f"  p95 replayed/recorded: {summary['p95_ratio']:.2f}x ({verdict})")
+    regressions = [e for e in exchanges if e.comparison["outcome"] == "regression"]
+    for exchange in regressions[:show]:
+        print(f"  regression #{exchange.index} {exchange.method} task {exchange.task_id}: {'; '.join(exchange.comparison['reasons'])}")
+    if len(regressions) > show:
+        print(f"  ... {len(regressions) - show} more regressions")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded A2A traffic against a running Execution Agent and compare the results.")
+    parser.add_argument("recording", nargs="?", default=DEFAULT_LOG_PATH, help="communication_log.jsonl (with rotated backups), communication_log.txt, or a JSONL file of requests")
+    parser.add_argument("--target", default="http://localhost:5000", help="Base URL of the Execution Agent")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay at N times the recorded pace")
+    parser.add_argument("--no-timing", action="store_true", help="Ignore the recorded timing and send each turn as soon as the previous one completes")
+    parser.add_argument("--side", choices=["execution", "planner"], default=None, help="Which agent's records to replay (default: execution if present)")
+    parser.add_argument("--methods", nargs="+", default=["tasks/send"], choices=sorted(REPLAYABLE_METHODS), help="JSON-RPC methods to replay")
+    parser.add_argument("--keep-task-ids", action="store_true", help="Reuse the recorded task IDs instead of fresh ones")
+    parser.add_argument("--limit", type=int, default=None, help="Only replay the first N requests")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Maximum concurrent requests")
+    parser.add_argument("--latency-threshold", type=float, default=0.2, help="Relative p95 increase reported as a latency regression")
+    parser.add_argument("--similarity-threshold", type=float, default=0.6, help="Reply texts at least this similar count as similar")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any response or latency regression")
+    parser.add_argument("--output", default=None, help="Write per-request results as JSONL to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    exchanges = build_exchanges(load_records(args.recording), side=args.side, methods=set(args.methods))[:args.limit]
+    if not exchanges:
+        print(f"No replayable requests found in {args.recording}")
+        return 1
+    if not args.keep_task_ids:
+        remap_task_ids(exchanges)
+
+    wall_time = asyncio.run(replay(exchanges, args.target.rstrip("/"), speed=None if args.no_timing else args.speed, max_in_flight=args.max_in_flight))
+    for exchange in exchanges:
+        exchange.comparison = compare(exchange, args.similarity_threshold)
+    summary = summarize(exchanges, wall_time, args.latency_threshold)
+    print_summary(summary, exchanges)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for exchange in exchanges:
+                f.write(json.dumps({
+                    "index": exchange.index,
+                    "method": exchange.method,
+                    "task_id": exchange.task_id,
+                    "recorded_latency_ms": None if exchange.recorded_latency is None else 1000 * exchange.recorded_latency,
+                    "latency_ms": None if exchange.latency is None else 1000 * exchange.latency,
+                    "error": exchange.error,
+                    **exchange.comparison,
+                }) + "\n")
+        print(f"Per-request results written to {args.output}")
+
+    regressed = summary["outcomes"].get("regression", 0) > 0 or summary.get("latency_regression", False)
+    return 1 if args.fail_on_regression and regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
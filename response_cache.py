@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from communication_log import iter_records
+
+logger = logging.getLogger(__name__)
+
+
+def _binary_digest(value: Any) -> str:
+    # Inline file data in the contents is hashed rather than serialized
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"sha256:{hashlib.sha256(value).hexdigest()}"
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def cache_key(model_name: str, contents: Any, generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """Content address of an LLM call: model name, prompt hash and generation config."""
+    prompt_hash = hashlib.sha256(json.dumps(contents, sort_keys=True, separators=(",", ":"), default=_binary_digest).encode("utf-8")).hexdigest()
+    config = json.dumps(generation_config or {}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{model_name}\n{prompt_hash}\n{config}".encode("utf-8")).hexdigest()
+
+
+def cache_directive(metadata: Optional[Dict[str, Any]]) -> str:
+    """Reads the per-request cache directive from TaskSendParams.metadata["cache"].
+
+    "bypass" skips the lookup but stores the fresh response; "off" skips the cache entirely.
+    """
+    directive = (metadata or {}).get("cache", "use")
+    return directive if directive in ("use", "bypass", "off") else "use"
+
+
+class ResponseCache:
+    """Two-tier LLM response cache.
+
+    The in-memory tier is an LRU bounded by `max_entries`. The optional on-disk tier
+    stores one JSON file per key under `disk_dir`, expires entries after
+    `disk_ttl_seconds` and removes the oldest files once `disk_max_bytes` is exceeded.
+    Disk hits are promoted to memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        disk_dir: Optional[str] = None,
+        disk_ttl_seconds: Optional[float] = 7 * 24 * 3600.0,
+        disk_max_bytes: int = 100 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self.disk_max_bytes = disk_max_bytes
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(os.path.getsize(path) for path in self._disk_files())
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_files(self) -> List[str]:
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            files.extend(os.path.join(root, name) for name in names if name.endswith(".json"))
+        return files
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return text
+        text = self._disk_get(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, text)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._memory_put(key, text)
+            self.stores += 1
+        if self.disk_dir:
+            self._disk_put(key, text)
+
+    def _memory_put(self, key: str, text: str) -> None:
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if self.disk_ttl_seconds is not None and time.time() - entry.get("ts", 0) > self.disk_ttl_seconds:
+            self._disk_remove(path)
+            return None
+        return entry.get("text")
+
+    def _disk_put(self, key: str, text: str) -> None:
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"ts": time.time(), "text": text}).encode("utf-8")
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk_bytes += len(data) - previous
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._disk_trim()
+
+    def _disk_remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes -= size
+            self.evictions += 1
+
+    def _disk_trim(self) -> None:
+        """Removes the oldest disk entries until the tier is back under 90% of its size cap."""
+        files = sorted(self._disk_files(), key=os.path.getmtime)
+        target = int(self.disk_max_bytes * 0.9)
+        for path in files:
+            with self._lock:
+                if self._disk_bytes <= target:
+                    break
+            self._disk_remove(path)
+
+    def warm_from_log(self, paths: Iterable[str], key_for_exchange: Callable[[Dict[str, Any], Dict[str, Any]], Optional[str]]) -> int:
+        """Pre-populates the cache from tasks/send exchanges recorded in JSONL communication logs.
+
+        `key_for_exchange` maps a recorded request's params and its response's result (the
+        task) to the cache key of the turn, or None to skip it. It is called for every
+        answered request in log order, so it can rebuild per-task conversations.
+        Returns the number of responses loaded.
+        """
+        pending: Dict[Any, Dict[str, Any]] = {}
+        loaded = 0
+        for record in iter_records(paths):
+            payload = record.get("payload") or {}
+            event = record.get("event")
+            if event == "Execution Agent Received Request" and payload.get("method") == "tasks/send":
+                pending[payload.get("id")] = payload.get("params") or {}
+            elif event == "Execution Agent Sent Response" and payload.get("id") in pending:
+                params = pending.pop(payload.get("id"))
+                result = payload.get("result") or {}
+                key = key_for_exchange(params, result)
+                message = (result.get("status") or {}).get("message") or {}
+                text = "".join(part.get("text", "") for part in message.get("parts", []) if part.get("type") == "text")
+                # Error responses and canceled turns are not worth replaying
+                if key is not None and text and not text.startswith("Error"):
+                    self.put(key, text)
+                    loaded += 1
+        logger.info(f"Warmed response cache with {loaded} responses.")
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+def create_response_cache_from_env() -> Optional[ResponseCache]:
+    """Builds the response cache configured through RESPONSE_CACHE_* variables, or None if disabled."""
+    if os.getenv("RESPONSE_CACHE", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    ttl = os.getenv("RESPONSE_CACHE_DISK_TTL_SECONDS", str(7 * 24 * 3600))
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+        disk_dir=os.getenv("RESPONSE_CACHE_DIR") or None,
+        disk_ttl_seconds=float(ttl) if ttl not in ("", "none") else None,
+        disk_max_bytes=int(os.getenv("RESPONSE_CACHE_DISK_MAX_BYTES", str(100 * 1024 * 1024))),
+    )
@@ -0,0 +1,380 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, Iterator, List, Optional
+
+import requests
+from pydantic import ValidationError
+
+from a2a_client import A2AClient
+from a2a_models import AgentCard
+from a2a_serialization import decode_model
+
+logger = logging.getLogger(__name__)
+
+# Where an Execution Agent publishes its Agent Card
+AGENT_CARD_PATH = "/.well-known/agent.json"
+READINESS_PATH = "/readyz"
+
+
+class NoHealthyAgentError(requests.exceptions.ConnectionError):
+    """Raised when no known Execution Agent is healthy."""
+
+
+@dataclass
+class AgentEndpoint:
+    """An Execution Agent known to the router, with its health and load."""
+    base_url: str
+    healthy: bool = True
+    # Requests this router has sent to the agent that have not completed yet
+    outstanding: int = 0
+    card: Optional[AgentCard] = None
+    last_probe: Optional[float] = None
+    last_error: Optional[str] = None
+    requests_sent: int = 0
+    errors: int = 0
+    client: Optional[A2AClient] = field(default=None, repr=False)
+
+    @property
+    def reported_load(self) -> int:
+        """Requests the agent reported in flight at the last probe, from every client."""
+        load = self.card.load if self.card is not None else None
+        return load.activeRequests if load is not None else 0
+
+
+def normalize_url(url: str) -> str:
+    return url.strip().rstrip("/")
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Whether an error means the agent could not be reached, as opposed to an HTTP error or a slow reply."""
+    if isinstance(error, requests.exceptions.RequestException):
+        return isinstance(error, requests.exceptions.ConnectionError)
+    # aiohttp's connection errors are OSErrors too; its read timeouts are TimeoutErrors
+    return isinstance(error, OSError) and not isinstance(error, TimeoutError)
+
+
+# Local registry: a directory with one small JSON file per running Execution Agent
+
+def _registry_file(registry_dir: str, url: str) -> str:
+    name = "".join(c if c.isalnum() else "_" for c in normalize_url(url).split("://", 1)[-1])
+    return os.path.join(registry_dir, f"{name}.json")
+
+
+def register_agent(registry_dir: str, url: str) -> str:
+    """Adds an agent's base URL to the local registry; returns the registry entry's path."""
+    os.makedirs(registry_dir, exist_ok=True)
+    path = _registry_file(registry_dir, url)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"url": normalize_url(url), "pid": os.getpid(), "registered_at": time.time()}, f)
+    os.replace(tmp_path, path)
+    logger.info(f"Registered Execution Agent {url} in {registry_dir}")
+    return path
+
+
+def unregister_agent(registry_dir: str, url: str) -> None:
+    try:
+        os.remove(_registry_file(registry_dir, url))
+        logger.info(f"Unregistered Execution Agent {url} from {registry_dir}")
+    except FileNotFoundError:
+        pass
+
+
+def read_registry(registry_dir: str) -> List[str]:
+    """Base URLs of the agents in the local registry."""
+    urls = []
+    try:
+        names = sorted(os.listdir(registry_dir))
+    except FileNotFoundError:
+        return urls
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(registry_dir, name), "r", encoding="utf-8") as f:
+                urls.append(normalize_url(json.load(f)["url"]))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable registry entry {name}: {e}")
+    return urls
+
+
+class ExecutionAgentRouter:
+    """Spreads the Planning Agent's requests over several Execution Agents.
+
+    Agents come from a static list of base URLs and/or a local registry directory, which
+    is re-read on every probe cycle so agents can join and leave. A background thread
+    probes each agent's readiness endpoint and Agent Card every `probe_interval` seconds;
+    a connection failure also takes an agent out of rotation until its next good probe.
+
+    New tasks go to the healthy agent with the fewest outstanding requests from this
+    router (ties broken by the load the agent reports in its card, then round-robin).
+    Every later turn of a task goes to the same agent, which holds its history, unless
+    that agent is no longer healthy.
+    """
+
+    def __init__(
+        self,
+        urls: Optional[List[str]] = None,
+        registry_dir: Optional[str] = None,
+        client_factory: Optional[Callable[[str], A2AClient]] = None,
+        probe_interval: float = 5.0,
+        probe_timeout: float = 1.0,
+        max_affinity_entries: int = 100000,
+    ):
+        self.static_urls = [normalize_url(url) for url in urls or [] if url.strip()]
+        self.registry_dir = registry_dir
+        self.client_factory = client_factory or (lambda url: A2AClient(base_url=url))
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.max_affinity_entries = max_affinity_entries
+
+        self.affinity_breaks = 0
+        self._endpoints: Dict[str, AgentEndpoint] = {}
+        # task_id -> base URL of the agent holding the task, least recently used first
+        self._affinity: "OrderedDict[str, str]" = OrderedDict()
+        self._next = 0
+        self._lock = threading.Lock()
+        self._probe_session = requests.Session()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reconciles the known agents with the static list and the registry."""
+        urls = list(dict.fromkeys(self.static_urls + (read_registry(self.registry_dir) if self.registry_dir else [])))
+        with self._lock:
+            for url in urls:
+                if url not in self._endpoints:
+                    self._endpoints[url] = AgentEndpoint(base_url=url)
+                    logger.info(f"Discovered Execution Agent {url}")
+            removed = [endpoint for url, endpoint in self._endpoints.items() if url not in urls]
+            for endpoint in removed:
+                del self._endpoints[endpoint.base_url]
+                logger.info(f"Execution Agent {endpoint.base_url} left the registry")
+        for endpoint in removed:
+            if endpoint.client is not None:
+                endpoint.client.close()
+
+    def probe(self, endpoint: AgentEndpoint) -> bool:
+        """Checks an agent's readiness and refreshes its Agent Card."""
+        try:
+            ready = self._probe_session.get(endpoint.base_url + READINESS_PATH, timeout=self.probe_timeout)
+            card = None
+            if ready.status_code == 200:
+                card_response = self._probe_session.get(endpoint.base_url + AGENT_CARD_PATH, timeout=self.probe_timeout)
+                if card_response.status_code == 200:
+                    card = decode_model(AgentCard, card_response.content)
+            healthy = ready.status_code == 200 and (card is None or card.load is None or card.load.accepting)
+            error = None if healthy else f"readiness HTTP {ready.status_code}"
+        except (requests.exceptions.RequestException, ValidationError) as e:
+            healthy, card, error = False, None, str(e)
+        with self._lock:
+            if healthy != endpoint.healthy:
+                logger.info(f"Execution Agent {endpoint.base_url} is now {'healthy' if healthy else 'unhealthy'}{f' ({error})' if error else ''}")
+            endpoint.healthy = healthy
+            endpoint.card = card or endpoint.card
+            endpoint.last_probe = time.time()
+            endpoint.last_error = error
+        return healthy
+
+    def probe_all(self) -> None:
+        self.refresh()
+        with self._lock:
+            endpoints = list(self._endpoints.values())
+        for endpoint in endpoints:
+            self.probe(endpoint)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.probe_interval):
+            try:
+                self.probe_all()
+            except Exception as e:
+                logger.error(f"Execution Agent probe cycle failed: {e}", exc_info=True)
+
+    def start(self) -> "ExecutionAgentRouter":
+        """Probes every agent once, then keeps probing in the background."""
+        self.probe_all()
+        if self._thread is None and self.probe_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="agent-router-probe", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.probe_timeout * 2 + 1)
+            self._thread = None
+        with self._lock:
+            endpoints = list(self._endpoints.values())
+        for endpoint in endpoints:
+            if endpoint.client is not None:
+                endpoint.client.close()
+        self._probe_session.close()
+
+    def _least_loaded(self, candidates: List[AgentEndpoint]) -> AgentEndpoint:
+        self._next += 1
+        offset = self._next % len(candidates)
+        rotated = candidates[offset:] + candidates[:offset]
+        return min(rotated, key=lambda endpoint: (endpoint.outstanding, endpoint.reported_load))
+
+    def select(self, task_id: Optional[str] = None) -> AgentEndpoint:
+        """Picks the agent for a request of `task_id` (held under the lock by `acquire`)."""
+        candidates = [endpoint for endpoint in self._endpoints.values() if endpoint.healthy]
+        if not candidates:
+            raise NoHealthyAgentError(f"No healthy Execution Agent among {len(self._endpoints)} known.")
+        if task_id is None:
+            return self._least_loaded(candidates)
+
+        url = self._affinity.get(task_id)
+        endpoint = self._endpoints.get(url) if url else None
+        if endpoint is not None and endpoint.healthy:
+            self._affinity.move_to_end(task_id)
+            return endpoint
+        if url is not None:
+            # The task's history stays behind unless the agents share a task store
+            self.affinity_breaks += 1
+            logger.warning(f"Execution Agent {url} holding Task ID {task_id} is unavailable; moving the task to another agent.")
+        endpoint = self._least_loaded(candidates)
+        self._affinity[task_id] = endpoint.base_url
+        self._affinity.move_to_end(task_id)
+        while len(self._affinity) > self.max_affinity_entries:
+            self._affinity.popitem(last=False)
+        return endpoint
+
+    @contextmanager
+    def acquire(self, task_id: Optional[str] = None) -> Iterator[AgentEndpoint]:
+        """Selects an agent and counts the enclosed request as outstanding on it.
+
+        A connection error (from requests or aiohttp) takes the agent out of rotation until
+        its next successful probe.
+        """
+        with self._lock:
+            endpoint = self.select(task_id)
+            endpoint.outstanding += 1
+            endpoint.requests_sent += 1
+        try:
+            yield endpoint
+        except Exception as e:
+            with self._lock:
+                endpoint.errors += 1
+                if not is_connection_error(e):
+                    raise
+                if endpoint.healthy:
+                    logger.warning(f"Taking Execution Agent {endpoint.base_url} out of rotation: {e}")
+                endpoint.healthy = False
+                endpoint.last_error = str(e)
+            raise
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+    def client(self, endpoint: AgentEndpoint) -> A2AClient:
+        """Pooled client of an agent, created on first use."""
+        with self._lock:
+            if endpoint.client is None:
+                endpoint.client = self.client_factory(endpoint.base_url)
+            return endpoint.client
+
+    def post_bytes(self, path: str, body: bytes, task_id: Optional[str] = None) -> bytes:
+        """Like A2AClient.post_bytes, on the agent selected for `task_id`."""
+        with self.acquire(task_id) as endpoint:
+            return self.client(endpoint).post_bytes(path, body)
+
+    @contextmanager
+    def post_stream(self, path: str, payload: Any, task_id: Optional[str] = None) -> Iterator[requests.Response]:
+        """Like A2AClient.post_stream; the request stays outstanding until the stream is closed."""
+        with self.acquire(task_id) as endpoint:
+            response = self.client(endpoint).post_stream(path, payload)
+            try:
+                yield response
+            finally:
+                response.close()
+
+    def endpoints(self) -> List[AgentEndpoint]:
+        with self._lock:
+            return list(self._endpoints.values())
+
+    def forget(self, task_id: str) -> None:
+        """Drops the affinity of a finished task."""
+        with self._lock:
+            self._affinity.pop(task_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "agents": {
+                    endpoint.base_url: {
+                        "healthy": endpoint.healthy,
+                        "outstanding": endpoint.outstanding,
+                        "reported_active_requests": endpoint.reported_load,
+                        "requests": endpoint.requests_sent,
+                        "errors": endpoint.errors,
+                        "last_error": endpoint.last_error,
+                    }
+                    for endpoint in self._endpoints.values()
+                },
+                "tasks_pinned": len(self._affinity),
+                "affinity_breaks": self.affinity_breaks,
+            }
+
+
+def create_router_from_env(client_factory: Optional[Callable[[str], A2AClient]] = None) -> Optional[ExecutionAgentRouter]:
+    """Builds the router configured through EXECUTION_AGENT_URLS (comma-separated base URLs)
+    and/or EXECUTION_AGENT_REGISTRY (registry directory), or None if neither is set."""
+    urls = [url for url in os.getenv("EXECUTION_AGENT_URLS", "").split(",") if url.strip()]
+    registry_dir = os.getenv("EXECUTION_AGENT_REGISTRY") or None
+    if not urls and not registry_dir:
+        return None
+    return ExecutionAgentRouter(
+        urls=urls,
+        registry_dir=registry_dir,
+        client_factory=client_factory,
+        probe_interval=float(os.getenv("ROUTER_PROBE_INTERVAL", "5")),
+        probe_timeout=float(os.getenv("ROUTER_PROBE_TIMEOUT", "1")),
+        max_affinity_entries=int(os.getenv("ROUTER_MAX_AFFINITY_ENTRIES", "100000")),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the local Execution Agent registry and show the agents' health and load.")
+    parser.add_argument("--registry", default=os.getenv("EXECUTION_AGENT_REGISTRY"), help="Registry directory (default: EXECUTION_AGENT_REGISTRY)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    register_parser = subparsers.add_parser("register", help="Add an agent's base URL to the registry")
+    register_parser.add_argument("url")
+    unregister_parser = subparsers.add_parser("unregister", help="Remove an agent's base URL from the registry")
+    unregister_parser.add_argument("url")
+    status_parser = subparsers.add_parser("status", help="Probe the registered (and listed) agents and print their health and load")
+    status_parser.add_argument("urls", nargs="*", help="Additional agent base URLs")
+    args = parser.parse_args()
+
+    if args.command in ("register", "unregister") and not args.registry:
+        parser.error("--registry or EXECUTION_AGENT_REGISTRY is required")
+    if args.command == "register":
+        register_agent(args.registry, args.url)
+    elif args.command == "unregister":
+        unregister_agent(args.registry, args.url)
+    else:
+        router = ExecutionAgentRouter(urls=args.urls, registry_dir=args.registry, probe_interval=0)
+        router.probe_all()
+        endpoints = router.endpoints()
+        for endpoint in endpoints:
+            load = endpoint.card.load if endpoint.card is not None else None
+            status = "healthy" if endpoint.healthy else f"unhealthy ({endpoint.last_error})"
+            details = f", {load.activeRequests} active requests, {load.llmInFlight}/{load.llmMaxWorkers} LLM workers, {load.tasks} tasks" if load else ""
+            print(f"{endpoint.base_url}: {status}{details}")
+        router.stop()
+        if not endpoints:
+            print("No Execution Agents registered.")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import json
+import time
+import argparse
+from typing import Callable, Dict, Any, List, Union
+
+from pydantic import TypeAdapter
+
+from a2a_models import Part, Task, TaskStatus, TaskState, Message, TextPart, FilePart, DataPart, FileContent, SendTaskResponse
+from a2a_serialization import JSON_BACKEND, adapter_for, encode_model, decode_model
+
+HISTORY_SIZES = [10, 100, 1000]
+
+# Untagged union, as Part was defined before the discriminator, for comparison
+UNTAGGED_PARTS_ADAPTER = TypeAdapter(List[Union[TextPart, FilePart, DataPart]])
+
+
+def build_task(history_size: int) -> Task:
+    """A task whose history alternates planner instructions and agent answers of realistic length."""
+    history = []
+    for i in range(history_size):
+        if i % 2 == 0:
+            parts = [TextPart(text=f"Step {i // 2 + 1}: summarize the findings so far and list the open questions about the data set. " * 2)]
+        else:
+            parts = [TextPart(text=f"Result of step {i // 2 + 1}: the data set contains several anomalies in the March figures. " * 6)]
+            if i % 10 == 1:
+                parts.append(DataPart(data={"rows": 1200, "anomalies": [3, 17, 42], "confidence": 0.82}))
+            if i % 20 == 1:
+                parts.append(FilePart(file=FileContent(name="report.csv", mimeType="text/csv", uri="https://example.com/report.csv")))
+        history.append(Message(role="user" if i % 2 == 0 else "agent", parts=parts))
+    return Task(
+        id="benchmark-task",
+        sessionId="benchmark-session",
+        status=TaskStatus(state=TaskState.completed, message=history[-1], timestamp="2024-01-01T00:00:00"),
+        history=history,
+    )
+
+
+def measure(fn: Callable[[], Any], min_time: float) -> float:
+    """Mean seconds per call, repeating until at least `min_time` has elapsed."""
+    fn() # Warm-up (builds lazily created serializers)
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def run(history_sizes: List[int], min_time: float) -> List[Dict[str, Any]]:
+    results = []
+    for size in history_sizes:
+        task = build_task(size)
+        response = SendTaskResponse(jsonrpc="2.0", id="1", result=task)
+        body = encode_model(response)
+        payload = json.loads(body)
+        parts_payload = [part for message in payload["result"]["history"] for part in message["parts"]]
+
+        cases = {
+            # What a tasks/send response used to cost: dump to a dict, pretty-print it for the log, then jsonify it
+            "encode_response_baseline": lambda: (
+                json.dumps(response.model_dump(mode="json", exclude_none=True), indent=2),
+                json.dumps(response.model_dump(mode="json", exclude_none=True)).encode("utf-8"),
+            ),
+            "encode_response_fast": lambda: encode_model(response),
+            "decode_response_baseline": lambda: SendTaskResponse(**json.loads(body)),
+            "decode_response_fast": lambda: decode_model(SendTaskResponse, body),
+            "validate_parts_untagged": lambda: UNTAGGED_PARTS_ADAPTER.validate_python(parts_payload),
+            "validate_parts_discriminated": lambda: adapter_for(List[Part]).validate_python(parts_payload),
+        }
+        timings = {name: measure(fn, min_time) for name, fn in cases.items()}
+        results.append({"history_size": size, "payload_bytes": len(body), "timings_ms": {name: 1000 * t for name, t in timings.items()}})
+    return results
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(f"JSON backend: {JSON_BACKEND}")
+    for result in results:
+        timings = result["timings_ms"]
+        print(f"\nHistory of {result['history_size']} messages ({result['payload_bytes']} bytes):")
+        for operation in ("encode_response", "decode_response", "validate_parts"):
+            names = [name for name in timings if name.startswith(operation)]
+            baseline, fast = timings[names[0]], timings[names[1]]
+            print(f"  {operation:<16} {baseline:9.3f} ms -> {fast:9.3f} ms  ({baseline / fast:.1f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for A2A model serialization.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=HISTORY_SIZES, help="History sizes (messages) to benchmark")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent on each measurement")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.min_time)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"json_backend": JSON_BACKEND, "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
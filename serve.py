@@ -0,0 +1,117 @@
+import os
+import signal
+import logging
+import argparse
+import multiprocessing
+from typing import Dict, Any
+
+from gunicorn.app.base import BaseApplication
+
+logger = logging.getLogger(__name__)
+
+
+def default_options() -> Dict[str, Any]:
+    """Server options from SERVE_* environment variables."""
+    return {
+        "bind": f"{os.getenv('SERVE_HOST', '127.0.0.1')}:{os.getenv('SERVE_PORT', '5000')}",
+        "workers": int(os.getenv("SERVE_WORKERS", str(multiprocessing.cpu_count()))),
+        # Each worker serves requests from a thread pool, so one slow LLM call does not block the others
+        "worker_class": "gthread",
+        "threads": int(os.getenv("SERVE_THREADS", "8")),
+        # Maximum simultaneous client connections per worker, and pending connections queued by the kernel
+        "worker_connections": int(os.getenv("SERVE_MAX_CONNECTIONS", "1000")),
+        "backlog": int(os.getenv("SERVE_BACKLOG", "2048")),
+        "keepalive": int(os.getenv("SERVE_KEEPALIVE", "5")),
+        # Must exceed the slowest LLM call, or the arbiter kills the worker mid-request
+        "timeout": int(os.getenv("SERVE_TIMEOUT", "180")),
+        # Time in-flight requests get to finish after SIGTERM before workers are killed
+        "graceful_timeout": int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30")),
+        "max_requests": int(os.getenv("SERVE_MAX_REQUESTS", "0")),
+        "max_requests_jitter": int(os.getenv("SERVE_MAX_REQUESTS_JITTER", "0")),
+        "accesslog": os.getenv("SERVE_ACCESS_LOG") or None,
+    }
+
+
+def post_worker_init(worker) -> None:
+    """Flips the readiness probe as soon as the worker is asked to shut down."""
+    import execution_agent
+
+    exit_handler = signal.getsignal(signal.SIGTERM)
+
+    def drain(signum, frame):
+        execution_agent.begin_drain()
+        if callable(exit_handler):
+            exit_handler(signum, frame)
+
+    signal.signal(signal.SIGTERM, drain)
+
+
+def worker_exit(server, worker) -> None:
+    """Flushes logs and queued notifications once the worker's in-flight requests are done."""
+    import execution_agent
+
+    execution_agent.shutdown()
+
+
+class ExecutionAgentServer(BaseApplication):
+    """Serves the Execution Agent on gunicorn's pre-fork server with threaded workers.
+
+    The app is loaded in each worker after the fork (no preloading), because the
+    communication log, LLM executor and push notification sender run background threads.
+    """
+
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            if value is not None and key in self.cfg.settings:
+                self.cfg.set(key, value)
+        self.cfg.set("preload_app", False)
+        self.cfg.set("post_worker_init", post_worker_init)
+        self.cfg.set("worker_exit", worker_exit)
+
+    def load(self):
+        from execution_agent import app
+        return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Production server for the Execution Agent.")
+    parser.add_argument("--host", default=None, help="Interface to bind (SERVE_HOST, default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=None, help="Port to bind (SERVE_PORT, default 5000)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (SERVE_WORKERS, default: CPU count)")
+    parser.add_argument("--threads", type=int, default=None, help="Request threads per worker (SERVE_THREADS, default 8)")
+    parser.add_argument("--max-connections", type=int, default=None, help="Simultaneous connections per worker (SERVE_MAX_CONNECTIONS)")
+    parser.add_argument("--graceful-timeout", type=int, default=None, help="Seconds to drain in-flight requests on shutdown (SERVE_GRACEFUL_TIMEOUT)")
+    args = parser.parse_args()
+
+    options = default_options()
+    host, port = options["bind"].rsplit(":", 1)
+    options["bind"] = f"{args.host or host}:{args.port or port}"
+    for key, value in (("workers", args.workers), ("threads", args.threads), ("worker_connections", args.max_connections), ("graceful_timeout", args.graceful_timeout)):
+        if value is not None:
+            options[key] = value
+
+    # Workers share task state through SQLite, so any of them can serve a given task_id
+    os.environ.setdefault("TASK_STORE_BACKEND", "sqlite")
+    if os.environ["TASK_STORE_BACKEND"] == "memory" and options["workers"] > 1:
+        logger.warning("TASK_STORE_BACKEND=memory keeps tasks per worker; requests for the same task_id may not find it.")
+
+    # Announce the server in the local registry the Planning Agent's router discovers agents from
+    registry_dir = os.getenv("EXECUTION_AGENT_REGISTRY")
+    public_url = os.getenv("AGENT_PUBLIC_URL") or f"http://{options['bind']}"
+    if registry_dir:
+        from router import register_agent
+        register_agent(registry_dir, public_url)
+    try:
+        ExecutionAgentServer(options).run()
+    finally:
+        if registry_dir:
+            from router import unregister_agent
+            unregister_agent(registry_dir, public_url)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from a2a_models import Message
+from planner_context import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# LLM request contents in the Gemini format: [{"role": ..., "parts": [{"text": ...}]}]
+Contents = List[Dict[str, Any]]
+
+# Converts one A2A message to an LLM content; the first message of a context gets the system prompt as preamble
+MessageConverter = Callable[[Message, Optional[str]], Dict[str, Any]]
+
+# Share of the per-session budget kept when a context is trimmed, so that trimming (which
+# changes the prefix and forfeits backend-side prefix caching) happens once per several turns
+TRIM_TARGET = 0.75
+
+
+def message_fingerprint(message: Message) -> str:
+    return hashlib.sha1(message.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def content_tokens(content: Dict[str, Any]) -> int:
+    # Inline binary data is not counted; file contents reach the LLM as text or a blob reference
+    return sum(estimate_tokens(part["text"]) for part in content.get("parts", []) if "text" in part)
+
+
+@dataclass
+class SessionContext:
+    """The converted conversation of one task: `contents[i]` is history message `start + i`."""
+    contents: Contents = field(default_factory=list)
+    tokens: List[int] = field(default_factory=list)
+    start: int = 0
+    covered: int = 0
+    fingerprint: str = ""
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.tokens)
+
+
+@dataclass
+class ContextStats:
+    """How the contents of one LLM call were assembled."""
+    outcome: str
+    messages: int
+    reused_tokens: int
+    new_tokens: int
+    trimmed_messages: int = 0
+
+
+class SessionContextCache:
+    """Multi-turn LLM contents per task, built incrementally from the task's A2A history.
+
+    Each task keeps its converted conversation (system prompt, earlier turns) in an LRU
+    bounded by `total_token_budget` tokens overall. A turn only converts the messages added
+    since the previous one (the last agent reply and the new user message) and appends
+    them, so the prefix sent to the LLM is byte-for-byte the one sent on the previous turn:
+    backends with prefix caching then only process the new turn. A context longer than
+    `session_token_budget` drops its oldest turns, down to TRIM_TARGET of the budget.
+
+    A history that no longer extends the cached one (rewritten by another worker, or a
+    context evicted meanwhile) is converted again from scratch.
+    """
+
+    def __init__(self, system_prompt: str, convert: MessageConverter, session_token_budget: int = 8192, total_token_budget: int = 2_000_000):
+        self.system_prompt = system_prompt
+        self.convert = convert
+        self.session_token_budget = session_token_budget
+        self.total_token_budget = total_token_budget
+        self._contexts: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self._total_tokens = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.trims = 0
+        self.evictions = 0
+        self.reused_tokens = 0
+        self.new_tokens = 0
+
+    def contents_for(self, key: str, history: List[Message]) -> Tuple[Contents, ContextStats]:
+        """Returns the LLM contents for the latest turn of `history`, reusing the cached conversation of `key`."""
+        with self._lock:
+            context = self._contexts.pop(key, None)
+            if context is not None:
+                self._total_tokens -= context.total_tokens
+
+        if context is None:
+            outcome = "miss"
+        elif context.covered <= len(history) and context.covered > 0 and message_fingerprint(history[context.covered - 1]) == context.fingerprint:
+            outcome = "hit"
+        else:
+            outcome = "stale"
+        if outcome != "hit":
+            context = SessionContext()
+
+        # Conversion (including blob store reads for file parts) happens outside the lock
+        reused_tokens = context.total_tokens
+        for message in history[context.covered:]:
+            content = self.convert(message, None if context.contents else self.system_prompt)
+            context.contents.append(content)
+            context.tokens.append(content_tokens(content))
+        new_tokens = context.total_tokens - reused_tokens
+        context.covered = len(history)
+        context.fingerprint = message_fingerprint(history[-1]) if history else ""
+        trimmed = self._trim(context, history)
+
+        with self._lock:
+            self._contexts[key] = context
+            self._total_tokens += context.total_tokens
+            while self._total_tokens > self.total_token_budget and len(self._contexts) > 1:
+                _, evicted = self._contexts.popitem(last=False)
+                self._total_tokens -= evicted.total_tokens
+                self.evictions += 1
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "miss":
+                self.misses += 1
+            else:
+                self.stale += 1
+            self.trims += 1 if trimmed else 0
+            self.reused_tokens += reused_tokens
+            self.new_tokens += new_tokens
+
+        stats = ContextStats(outcome=outcome, messages=len(context.contents), reused_tokens=reused_tokens, new_tokens=new_tokens, trimmed_messages=trimmed)
+        return list(context.contents), stats
+
+    def _trim(self, context: SessionContext, history: List[Message]) -> int:
+        """Drops the oldest turns of an over-budget context; returns the number of messages dropped."""
+        if context.total_tokens <= self.session_token_budget:
+            return 0
+        target = self.session_token_budget * TRIM_TARGET
+        total = context.total_tokens
+        drop = 0
+        # Always keep the latest message, and start the context on a user message
+        while drop < len(context.contents) - 1 and total > target:
+            total -= context.tokens[drop]
+            drop += 1
+        while drop < len(context.contents) - 1 and context.contents[drop]["role"] != "user":
+            drop += 1
+        if drop == 0:
+            return 0
+        context.start += drop
+        del context.contents[:drop], context.tokens[:drop]
+        # The new first message carries the system prompt
+        context.contents[0] = self.convert(history[context.start], self.system_prompt)
+        context.tokens[0] = content_tokens(context.contents[0])
+        logger.info(f"Trimmed {drop} messages from a session context ({context.total_tokens} tokens left).")
+        return drop
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            context = self._contexts.pop(key, None)
+            if context is not None:
+                self._total_tokens -= context.total_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "enabled": True,
+                "sessions": len(self._contexts),
+                "cached_tokens": self._total_tokens,
+                "session_token_budget": self.session_token_budget,
+                "total_token_budget": self.total_token_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "trims": self.trims,
+                "evictions": self.evictions,
+                "reused_tokens": self.reused_tokens,
+                "new_tokens": self.new_tokens,
+            }
+
+
+def create_session_context_cache_from_env(system_prompt: str, convert: MessageConverter) -> Optional[SessionContextCache]:
+    """Builds the cache configured through SESSION_CONTEXT (on or off), SESSION_CONTEXT_TOKEN_BUDGET
+    (per task) and SESSION_CONTEXT_CACHE_TOKENS (all tasks); None when it is off."""
+    if os.getenv("SESSION_CONTEXT", "on").lower() == "off":
+        return None
+    return SessionContextCache(
+        system_prompt,
+        convert,
+        session_token_budget=int(os.getenv("SESSION_CONTEXT_TOKEN_BUDGET", "8192")),
+        total_token_budget=int(os.getenv("SESSION_CONTEXT_CACHE_TOKENS", "2000000")),
+    )
@@ -0,0 +1,181 @@
+import os
+import time
+import zlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# What happens to a turn that arrives while another turn of the same task is in progress
+TURN_MODES = ("queue", "reject")
+
+
+class TaskBusyError(Exception):
+    """Raised when a turn cannot start because another turn of the same task is in progress."""
+
+    def __init__(self, task_id: str, reason: str):
+        super().__init__(f"Task {task_id} is busy: {reason}")
+        self.task_id = task_id
+        self.reason = reason
+
+
+class _TaskTurns:
+    """Ticket queue of one task's turns; guarded by its stripe's lock."""
+
+    __slots__ = ("condition", "next_ticket", "serving", "abandoned")
+
+    def __init__(self, lock: threading.Lock):
+        self.condition = threading.Condition(lock)
+        self.next_ticket = 0
+        self.serving = 0
+        self.abandoned: Set[int] = set()
+
+    @property
+    def waiting(self) -> int:
+        return self.next_ticket - self.serving - 1 - len(self.abandoned)
+
+
+class TaskTurn:
+    """A turn being held on a task; `release` lets the next turn of the task start."""
+
+    def __init__(self, sequencer: "TaskSequencer", task_id: str, waited: float):
+        self.sequencer = sequencer
+        self.task_id = task_id
+        self.waited = waited
+        self._released = False
+
+    def release(self) -> None:
+        # Idempotent, since streaming responses release from several places
+        if not self._released:
+            self._released = True
+            self.sequencer._release(self.task_id)
+
+    def __enter__(self) -> "TaskTurn":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+class TaskSequencer:
+    """Runs the turns of each task one at a time, in arrival order, without a global lock.
+
+    Task IDs are hashed onto `stripes` locks that only guard the bookkeeping of the tasks
+    with a turn in progress, so turns of different tasks never wait for each other (a
+    stripe lock is never held while a turn runs). A turn arriving while its task is busy
+    waits for its ticket in "queue" mode (at most `max_waiting` per task, for at most
+    `timeout` seconds) and is refused with TaskBusyError in "reject" mode.
+
+    The ordering only holds within one process; with several server workers, the task
+    store is the only thing they share.
+    """
+
+    def __init__(self, stripes: int = 64, mode: str = "queue", timeout: float = 120.0, max_waiting: int = 16):
+        if mode not in TURN_MODES:
+            raise ValueError(f"Invalid task turn mode: {mode}")
+        self.mode = mode
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._turns: List[Dict[str, _TaskTurns]] = [{} for _ in range(stripes)]
+
+        self._stats_lock = threading.Lock()
+        self.turns = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+
+    def _stripe(self, task_id: str) -> int:
+        return zlib.crc32(task_id.encode("utf-8")) % len(self._locks)
+
+    def _count(self, **increments: float) -> None:
+        with self._stats_lock:
+            for name, amount in increments.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def acquire(self, task_id: str, wait: Optional[bool] = None) -> TaskTurn:
+        """Starts a turn of `task_id`, waiting for earlier turns unless the mode (or `wait=False`) rejects it.
+
+        Use the returned turn as a context manager, or call its `release` when the turn ends.
+        """
+        wait = self.mode == "queue" if wait is None else wait
+        index = self._stripe(task_id)
+        lock, turns = self._locks[index], self._turns[index]
+        start = time.monotonic()
+        with lock:
+            state = turns.get(task_id)
+            if state is None:
+                state = turns[task_id] = _TaskTurns(lock)
+            busy = state.next_ticket != state.serving
+            if busy and not wait:
+                self._count(rejected=1)
+                raise TaskBusyError(task_id, "another turn is in progress")
+            if busy and state.waiting >= self.max_waiting:
+                self._count(rejected=1)
+                raise TaskBusyError(task_id, f"{state.waiting} turns are already waiting")
+            ticket = state.next_ticket
+            state.next_ticket += 1
+            if busy:
+                deadline = start + self.timeout
+                while state.serving != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        # Give up the ticket; the turn before it will skip it on release
+                        state.abandoned.add(ticket)
+                        self._count(timeouts=1)
+                        raise TaskBusyError(task_id, f"waited {self.timeout:g}s for earlier turns")
+                    state.condition.wait(remaining)
+        waited = time.monotonic() - start
+        self._count(turns=1, queued=1 if busy else 0, wait_total=waited)
+        return TaskTurn(self, task_id, waited)
+
+    def _release(self, task_id: str) -> None:
+        index = self._stripe(task_id)
+        with self._locks[index]:
+            turns = self._turns[index]
+            state = turns[task_id]
+            state.serving += 1
+            while state.serving in state.abandoned:
+                state.abandoned.remove(state.serving)
+                state.serving += 1
+            if state.serving == state.next_ticket:
+                del turns[task_id] # Idle tasks take no memory
+            else:
+                state.condition.notify_all()
+
+    def busy(self, task_id: str) -> bool:
+        index = self._stripe(task_id)
+        with self._locks[index]:
+            return task_id in self._turns[index]
+
+    def stats(self) -> Dict[str, Any]:
+        active = waiting = 0
+        for lock, turns in zip(self._locks, self._turns):
+            with lock:
+                active += len(turns)
+                waiting += sum(state.waiting for state in turns.values())
+        with self._stats_lock:
+            return {
+                "mode": self.mode,
+                "stripes": len(self._locks),
+                "turns": self.turns,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "mean_wait_ms": 1000 * self.wait_total / self.turns if self.turns else 0.0,
+                "active_tasks": active,
+                "waiting_turns": waiting,
+            }
+
+
+def create_task_sequencer_from_env() -> TaskSequencer:
+    """Builds the sequencer configured through TASK_TURN_MODE (queue or reject), TASK_TURN_TIMEOUT,
+    TASK_TURN_MAX_WAITING and TASK_LOCK_STRIPES."""
+    return TaskSequencer(
+        stripes=int(os.getenv("TASK_LOCK_STRIPES", "64")),
+        mode=os.getenv("TASK_TURN_MODE", "queue").lower(),
+        timeout=float(os.getenv("TASK_TURN_TIMEOUT", "120")),
+        max_waiting=int(os.getenv("TASK_TURN_MAX_WAITING", "16")),
+    )
@@ -0,0 +1,385 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from a2a_models import Task, Message
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStore:
+    """Storage interface for Execution Agent tasks.
+
+    Backends count hits, misses and evictions; `stats()` reports them together with
+    backend-specific figures such as the number of stored tasks.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, task_id: str) -> Optional[Task]:
+        raise NotImplementedError
+
+    def save(self, task: Task) -> None:
+        raise NotImplementedError
+
+    def delete(self, task_id: str) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def ping(self) -> bool:
+        """Returns True if the backend can currently serve requests."""
+        return True
+
+    def _record_lookup(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _record_evictions(self, count: int) -> None:
+        if count:
+            with self._stats_lock:
+                self.evictions += count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "tasks": len(self),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class InMemoryTaskStore(TaskStore):
+    """In-process store with LRU eviction, an idle TTL and a memory budget.
+
+    The memory footprint of a task is estimated from the size of its JSON encoding:
+    the task without its history is encoded on every save, but history messages are
+    only encoded once, when they are appended. Tasks that have not been accessed for `ttl_seconds` expire; when `max_tasks` or
+    `max_memory_bytes` is exceeded, the least recently used tasks are evicted.
+    """
+
+    def __init__(self, max_tasks: int = 10000, ttl_seconds: Optional[float] = 3600.0, max_memory_bytes: Optional[int] = 256 * 1024 * 1024):
+        super().__init__()
+        self.max_tasks = max_tasks
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_bytes = 0
+        # task_id -> (task, estimated size, last access time), least recently used first
+        self._tasks: "OrderedDict[str, Tuple[Task, int, float]]" = OrderedDict()
+        # task_id -> (history length, encoded size of that history) as of the last save
+        self._history_sizes: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, task_id: str) -> Optional[Task]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._tasks.get(task_id)
+            if entry is not None:
+                task, size, _ = entry
+                self._tasks[task_id] = (task, size, now)
+                self._tasks.move_to_end(task_id)
+        self._record_lookup(entry is not None)
+        return entry[0] if entry is not None else None
+
+    def _history_size(self, task: Task) -> Tuple[int, int]:
+        history = task.history or []
+        with self._lock:
+            length, size = self._history_sizes.get(task.id, (0, 0))
+        if length > len(history):
+            # History was replaced rather than extended; measure it from scratch
+            length, size = 0, 0
+        size += sum(len(message.model_dump_json(exclude_none=True)) for message in history[length:])
+        return len(history), size
+
+    def save(self, task: Task) -> None:
+        history_length, history_size = self._history_size(task)
+        size = len(task.model_dump_json(exclude_none=True, exclude={"history"})) + history_size
+        now = time.monotonic()
+        with self._lock:
+            previous = self._tasks.pop(task.id, None)
+            if previous is not None:
+                self.memory_bytes -= previous[1]
+            self._tasks[task.id] = (task, size, now)
+            self._history_sizes[task.id] = (history_length, history_size)
+            self.memory_bytes += size
+            self._evict_expired(now)
+            self._evict_over_budget(keep=task.id)
+
+    def delete(self, task_id: str) -> bool:
+        with self._lock:
+            entry = self._tasks.pop(task_id, None)
+            self._history_sizes.pop(task_id, None)
+            if entry is not None:
+                self.memory_bytes -= entry[1]
+        return entry is not None
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _evict_expired(self, now: float) -> None:
+        if self.ttl_seconds is None:
+            return
+        evicted = 0
+        # Entries are ordered by last access, so expired ones are all at the front
+        while self._tasks:
+            task_id, (_, size, last_access) = next(iter(self._tasks.items()))
+            if now - last_access < self.ttl_seconds:
+                break
+            del self._tasks[task_id]
+            self._history_sizes.pop(task_id, None)
+            self.memory_bytes -= size
+            evicted += 1
+        self._record_evictions(evicted)
+
+    def _evict_over_budget(self, keep: str) -> None:
+        evicted = 0
+        while len(self._tasks) > 1 and (
+            len(self._tasks) > self.max_tasks
+            or (self.max_memory_bytes is not None and self.memory_bytes > self.max_memory_bytes)
+        ):
+            task_id, (_, size, _) = next(iter(self._tasks.items()))
+            if task_id == keep:
+                break
+            del self._tasks[task_id]
+            self._history_sizes.pop(task_id, None)
+            self.memory_bytes -= size
+            evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} least recently used tasks from the task store.")
+        self._record_evictions(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["memory_bytes"] = self.memory_bytes
+        return stats
+
+
+class SQLiteTaskStore(TaskStore):
+    """Task store backed by SQLite in WAL mode, shareable by several worker processes.
+
+    Each thread uses its own connection. Tasks not updated for `ttl_seconds` are
+    deleted by a sweep that runs every `sweep_interval` saves.
+    """
+
+    def __init__(self, path: str = "tasks.db", ttl_seconds: Optional[float] = 24 * 3600.0, sweep_interval: int = 500):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._saves = 0
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS tasks (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS tasks_updated_at ON tasks (updated_at)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, task_id: str) -> Optional[Task]:
+        row = self._connection().execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        self._record_lookup(row is not None)
+        return Task.model_validate_json(row[0]) if row is not None else None
+
+    def save(self, task: Task) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tasks (id, data, updated_at) VALUES (?, ?, ?)",
+                (task.id, task.model_dump_json(exclude_none=True), time.time())
+            )
+        with self._stats_lock:
+            self._saves += 1
+            sweep = self.sweep_interval > 0 and self._saves % self.sweep_interval == 0
+        if sweep:
+            self.evict_expired()
+
+    def evict_expired(self) -> int:
+        """Deletes tasks that have not been updated within the TTL. Returns the number deleted."""
+        if self.ttl_seconds is None:
+            return 0
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM tasks WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+        self._record_evictions(cursor.rowcount)
+        return cursor.rowcount
+
+    def delete(self, task_id: str) -> bool:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        return cursor.rowcount > 0
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def ping(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class AppendOnlyHistoryTaskStore(TaskStore):
+    """Task store that keeps each task's history in an append-only JSONL file.
+
+    Saving a task only appends the messages added since the previous save and
+    rewrites the small task record (everything but the history). Tasks whose
+    record has not been updated for `ttl_seconds` are deleted by a sweep that
+    runs every `sweep_interval` saves.
+    """
+
+    def __init__(self, directory: str = "task_data", ttl_seconds: Optional[float] = 24 * 3600.0, sweep_interval: int = 500):
+        super().__init__()
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._saves = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _paths(self, task_id: str) -> Tuple[str, str]:
+        # Task IDs come from clients, so they are hashed rather than used as file names
+        key = hashlib.sha256(task_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{key}.task.json"), os.path.join(self.directory, f"{key}.history.jsonl")
+
+    def get(self, task_id: str) -> Optional[Task]:
+        record_path, history_path = self._paths(task_id)
+        try:
+            with open(record_path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            self._record_lookup(False)
+            return None
+        persisted = record.pop("persistedHistoryLength", 0)
+        history = []
+        if os.path.exists(history_path):
+            with open(history_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if len(history) >= persisted:
+                        # Ignore a partially written tail from an interrupted save
+                        break
+                    history.append(Message.model_validate_json(line))
+        self._record_lookup(True)
+        task = Task.model_validate(record)
+        task.history = history
+        return task
+
+    def save(self, task: Task) -> None:
+        record_path, history_path = self._paths(task.id)
+        history = task.history or []
+        with self._lock:
+            persisted = 0
+            if os.path.exists(record_path):
+                with open(record_path, "r", encoding="utf-8") as f:
+                    persisted = json.load(f).get("persistedHistoryLength", 0)
+            if persisted > len(history):
+                # History was replaced rather than extended; rewrite it from scratch
+                persisted = 0
+                open(history_path, "w").close()
+            new_messages = history[persisted:]
+            if new_messages:
+                with open(history_path, "a", encoding="utf-8") as f:
+                    f.write("".join(message.model_dump_json(exclude_none=True) + "\n" for message in new_messages))
+
+            record = task.model_dump(mode="json", exclude_none=True, exclude={"history"})
+            record["persistedHistoryLength"] = len(history)
+            tmp_path = record_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, record_path)
+            self._saves += 1
+            sweep = self.sweep_interval > 0 and self._saves % self.sweep_interval == 0
+        if sweep:
+            self.evict_expired()
+
+    def delete(self, task_id: str) -> bool:
+        record_path, history_path = self._paths(task_id)
+        with self._lock:
+            existed = os.path.exists(record_path)
+            for path in (record_path, history_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        return existed
+
+    def evict_expired(self) -> int:
+        """Deletes tasks whose record has not been updated within the TTL. Returns the number deleted."""
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        evicted = 0
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if not name.endswith(".task.json"):
+                    continue
+                record_path = os.path.join(self.directory, name)
+                if os.path.getmtime(record_path) < cutoff:
+                    os.remove(record_path)
+                    history_path = record_path[:-len(".task.json")] + ".history.jsonl"
+                    if os.path.exists(history_path):
+                        os.remove(history_path)
+                    evicted += 1
+        self._record_evictions(evicted)
+        return evicted
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".task.json"))
+
+    def ping(self) -> bool:
+        return os.path.isdir(self.directory) and os.access(self.directory, os.W_OK)
+
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value not in (None, "", "none") else None
+
+
+def create_task_store_from_env() -> TaskStore:
+    """Builds the task store selected by TASK_STORE_BACKEND (memory, sqlite or append-only)."""
+    backend = os.getenv("TASK_STORE_BACKEND", "memory").lower()
+    ttl_seconds = _optional_float(os.getenv("TASK_STORE_TTL_SECONDS", "3600"))
+    if backend == "memory":
+        return InMemoryTaskStore(
+            max_tasks=int(os.getenv("TASK_STORE_MAX_TASKS", "10000")),
+            ttl_seconds=ttl_seconds,
+            max_memory_bytes=int(os.getenv("TASK_STORE_MAX_MEMORY_BYTES", str(256 * 1024 * 1024))),
+        )
+    if backend == "sqlite":
+        return SQLiteTaskStore(path=os.getenv("TASK_STORE_PATH", "tasks.db"), ttl_seconds=ttl_seconds)
+    if backend in ("append-only", "append_only", "appendonly"):
+        return AppendOnlyHistoryTaskStore(directory=os.getenv("TASK_STORE_PATH", "task_data"), ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown TASK_STORE_BACKEND: {backend}")
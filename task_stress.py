@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from typing import Dict, Any, List, Tuple
+
+# Stress script for per-task turn sequencing (not a pytest test): many threads send turns to a
+# few shared task IDs and to their own task IDs, then the stored histories are checked.
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    os.environ.update({
+        "LLM_BACKEND": "stub",
+        "STUB_LLM_LATENCY": f"fixed:{args.llm_latency}",
+        "LLM_MAX_WORKERS": str(args.llm_workers),
+        "TASK_TURN_MODE": args.turn_mode,
+        "TASK_TURN_TIMEOUT": str(args.turn_timeout),
+        "TASK_TURN_MAX_WAITING": str(args.threads),
+        "TASK_STORE_BACKEND": "memory",
+        "RESPONSE_CACHE": "off",
+        "A2A_COMM_LOG": "off",
+        "PAYLOAD_LOG": "off",
+        "LOG_LEVEL": "WARNING",
+    })
+
+
+def start_server(app) -> Tuple[Any, str]:
+    import logging
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="stress-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def send_turn(session, base_url: str, task_id: str, text: str) -> Dict[str, Any]:
+    payload = {
+        "jsonrpc": "2.0",
+        "id": uuid.uuid4().hex,
+        "method": "tasks/send",
+        "params": {"id": task_id, "message": {"role": "user", "parts": [{"type": "text", "text": text}]}, "historyLength": 0},
+    }
+    return session.post(f"{base_url}/a2a/tasks/send", json=payload, timeout=300).json()
+
+
+def worker(base_url: str, thread_index: int, turns: int, shared_ids: List[str], shared_fraction: float, results: List[Dict[str, Any]]) -> None:
+    import requests
+
+    rng = random.Random(thread_index)
+    own_id = f"stress-own-{thread_index}-{uuid.uuid4().hex[:6]}"
+    with requests.Session() as session:
+        for turn in range(turns):
+            shared = bool(shared_ids) and rng.random() < shared_fraction
+            task_id = rng.choice(shared_ids) if shared else own_id
+            text = f"thread {thread_index} turn {turn} for {task_id}"
+            start = time.perf_counter()
+            response = send_turn(session, base_url, task_id, text)
+            error = response.get("error")
+            results.append({
+                "task_id": task_id,
+                "shared": shared,
+                "text": text,
+                "latency": time.perf_counter() - start,
+                "error_code": error["code"] if error else None,
+            })
+
+
+def check_histories(task_store, results: List[Dict[str, Any]]) -> List[str]:
+    """Every accepted turn must appear exactly once, as a user message directly followed by its own reply."""
+    problems = []
+    accepted: Dict[str, List[str]] = {}
+    for result in results:
+        if result["error_code"] is None:
+            accepted.setdefault(result["task_id"], []).append(result["text"])
+    for task_id, texts in accepted.items():
+        task = task_store.get(task_id)
+        history = task.history if task is not None else []
+        if len(history) != 2 * len(texts):
+            problems.append(f"{task_id}: {len(history)} messages for {len(texts)} accepted turns")
+        seen = []
+        for user, agent in zip(history[0::2], history[1::2]):
+            user_text, agent_text = user.parts[0].text, agent.parts[0].text
+            if user.role != "user" or agent.role != "agent":
+                problems.append(f"{task_id}: roles {user.role}/{agent.role} interleaved")
+            elif user_text not in agent_text:
+                problems.append(f"{task_id}: reply '{agent_text[:60]}' does not answer '{user_text}'")
+            seen.append(user_text)
+        if sorted(seen) != sorted(texts):
+            problems.append(f"{task_id}: stored turns differ from the accepted ones")
+        if task is not None and task.status.state.value != "completed":
+            problems.append(f"{task_id}: final state {task.status.state.value}")
+    return problems
+
+
+def run(args: argparse.Namespace, shared_fraction: float) -> Dict[str, Any]:
+    import execution_agent
+
+    shared_ids = [f"stress-shared-{i}-{uuid.uuid4().hex[:6]}" for i in range(args.shared_tasks)]
+    results: List[Dict[str, Any]] = []
+    threads = [
+        threading.Thread(target=worker, args=(args.base_url, i, args.turns, shared_ids, shared_fraction, results))
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    accepted = [result for result in results if result["error_code"] is None]
+    rejected = [result for result in results if result["error_code"] is not None]
+    disjoint = [result for result in accepted if not result["shared"]]
+    return {
+        "shared_fraction": shared_fraction,
+        "turns": len(results),
+        "accepted": len(accepted),
+        "rejected": len(rejected),
+        "error_codes": sorted({result["error_code"] for result in rejected}),
+        "wall_time_s": wall_time,
+        "throughput_rps": len(results) / wall_time if wall_time else 0.0,
+        # Turns of disjoint tasks should take about one LLM call however many threads run them
+        "disjoint_mean_latency_ms": 1000 * sum(result["latency"] for result in disjoint) / len(disjoint) if disjoint else None,
+        "problems": check_histories(execution_agent.task_store, results),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hammers the Execution Agent with concurrent turns on shared and disjoint task IDs and checks the histories.")
+    parser.add_argument("--threads", type=int, default=32, help="Client threads")
+    parser.add_argument("--turns", type=int, default=20, help="Turns sent by each thread")
+    parser.add_argument("--shared-tasks", type=int, default=4, help="Task IDs shared by all threads")
+    parser.add_argument("--shared-fractions", type=float, nargs="+", default=[0.0, 0.5, 1.0], help="Fractions of turns sent to shared task IDs (one run each)")
+    parser.add_argument("--turn-mode", choices=["queue", "reject"], default="queue", help="TASK_TURN_MODE of the agent")
+    parser.add_argument("--turn-timeout", type=float, default=120.0, help="TASK_TURN_TIMEOUT of the agent")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Stub LLM latency in seconds")
+    parser.add_argument("--llm-workers", type=int, default=64, help="LLM_MAX_WORKERS of the agent")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    import execution_agent
+
+    server, args.base_url = start_server(execution_agent.create_app())
+    try:
+        runs = [run(args, fraction) for fraction in args.shared_fractions]
+        turn_stats = execution_agent.task_sequencer.stats()
+    finally:
+        server.shutdown()
+        execution_agent.shutdown()
+
+    failed = False
+    for result in runs:
+        print(f"\n{100 * result['shared_fraction']:.0f}% of turns on {args.shared_tasks} shared tasks, {args.threads} threads ({args.turn_mode} mode):")
+        print(f"  {result['turns']} turns in {result['wall_time_s']:.2f}s ({result['throughput_rps']:.1f}/s), {result['accepted']} accepted, {result['rejected']} rejected {result['error_codes'] or ''}")
+        if result["disjoint_mean_latency_ms"] is not None:
+            print(f"  disjoint-task turns: mean latency {result['disjoint_mean_latency_ms']:.1f}ms (LLM latency {1000 * args.llm_latency:.0f}ms)")
+        if result["problems"]:
+            failed = True
+            print(f"  {len(result['problems'])} history problems, e.g.:")
+            for problem in result["problems"][:5]:
+                print(f"    {problem}")
+        else:
+            print("  histories consistent")
+    print(f"\nTurn sequencing: {turn_stats}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"runs": runs, "turn_stats": turn_stats}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
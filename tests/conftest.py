@@ -0,0 +1,40 @@
+import os
+import sys
+
+# The modules live at the repository root; tests run offline against the stub LLM backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("A2A_COMM_LOG", "off")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def agent_app(tmp_path_factory):
+    """The Execution Agent application, built once per test session with the stub LLM."""
+    os.environ.update({
+        "TASK_STORE_BACKEND": "memory",
+        "RESPONSE_CACHE": "off",
+        "PAYLOAD_LOG": "off",
+        "BLOB_STORE_DIR": str(tmp_path_factory.mktemp("blobs")),
+    })
+    import execution_agent
+    app = execution_agent.create_app(execution_agent.ExecutionAgentConfig.from_env(dotenv=False))
+    yield app
+    execution_agent.shutdown()
+
+
+@pytest.fixture
+def client(agent_app):
+    return agent_app.test_client()
+
+
+def rpc(client, method, params, path="/a2a", request_id=1):
+    """Posts a JSON-RPC request to the agent and returns the decoded response."""
+    return client.post(path, json={"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}).get_json()
+
+
+def text_message(text, role="user"):
+    return {"role": role, "parts": [{"type": "text", "text": text}]}
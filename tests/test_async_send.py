@@ -0,0 +1,21 @@
+import execution_agent
+from conftest import rpc, text_message
+
+
+def test_async_send_returns_the_submitted_state(client, monkeypatch):
+    submit = execution_agent.llm_executor.submit
+
+    def submit_and_wait(*args, **kwargs):
+        # Let the worker finish the turn before the response is built
+        job = submit(*args, **kwargs)
+        job.wait(10)
+        return job
+
+    monkeypatch.setattr(execution_agent.llm_executor, "submit", submit_and_wait)
+    params = {"id": "async-snapshot", "message": text_message("Hello"), "metadata": {"async": True}}
+    result = rpc(client, "tasks/send", params)["result"]
+
+    assert result["status"]["state"] == "submitted"
+    assert [message["role"] for message in result["history"]] == ["user"]
+    stored = rpc(client, "tasks/get", {"id": "async-snapshot"})["result"]
+    assert stored["status"]["state"] == "completed"
@@ -0,0 +1,42 @@
+import os
+import time
+
+from blob_store import BlobStore
+
+
+def age(store, uri, seconds):
+    path = store.path(uri)
+    stale = time.time() - seconds
+    os.utime(path, (stale, stale))
+
+
+def test_sweep_deletes_blobs_unused_past_the_ttl(tmp_path):
+    store = BlobStore(directory=str(tmp_path), inline_max_bytes=0, ttl_seconds=60.0, max_bytes=None, sweep_interval=2)
+    old = store.put(b"old payload")
+    age(store, old, 120.0)
+    reread = store.put(b"reread payload")
+    age(store, reread, 120.0)
+    assert store.get(reread) == b"reread payload" # Reading a blob keeps it
+
+    store.put(b"new payload") # Second new blob: sweeps
+
+    assert store.get(old) is None
+    assert store.get(reread) == b"reread payload"
+    assert store.stats()["evictions"] == 1
+
+
+def test_sweep_keeps_the_store_within_max_bytes(tmp_path):
+    store = BlobStore(directory=str(tmp_path), inline_max_bytes=0, ttl_seconds=None, max_bytes=25, sweep_interval=1)
+    first = store.put(b"a" * 10)
+    age(store, first, 30.0)
+    second = store.put(b"b" * 10)
+    age(store, second, 20.0)
+    third = store.put(b"c" * 10)
+
+    assert store.path(first) is None
+    assert store.path(second) is not None and store.path(third) is not None
+
+    # A blob larger than the budget stays until the next one is written
+    large = store.put(b"d" * 40)
+    assert store.path(large) is not None
+    assert store.path(second) is None and store.path(third) is None
@@ -0,0 +1,68 @@
+import json
+import threading
+import time
+
+import pytest
+
+import execution_agent
+from conftest import rpc, text_message
+from llm_providers import StubProvider
+
+
+@pytest.fixture
+def slow_llm(agent_app, monkeypatch):
+    """A stub provider that streams a long reply word by word, with micro-batching off."""
+    monkeypatch.setattr(execution_agent, "llm_provider", StubProvider(tokens_per_second=50, responses=["word " * 200]))
+    monkeypatch.setattr(execution_agent, "micro_batcher", None)
+
+
+def sse_events(chunks):
+    for chunk in chunks:
+        for line in chunk.decode("utf-8").splitlines():
+            if line.startswith("data: "):
+                yield json.loads(line[len("data: "):])["result"]
+
+
+def test_cancel_interrupts_a_streaming_turn(client, slow_llm):
+    response = client.post("/a2a", buffered=False, json={
+        "jsonrpc": "2.0", "id": 1, "method": "tasks/sendSubscribe",
+        "params": {"id": "cancel-stream", "message": text_message("Hello")},
+    })
+    events = sse_events(response.response)
+    assert next(events)["status"]["state"] == "working"
+    assert next(events)["artifact"]["parts"][0]["text"] == "word "
+
+    canceled = rpc(client, "tasks/cancel", {"id": "cancel-stream"})["result"]
+    assert canceled["status"]["state"] == "canceled"
+
+    remaining = list(events)
+    response.close()
+    assert len(remaining) < 200
+    assert remaining[-1]["final"] is True
+    assert remaining[-1]["status"]["state"] == "canceled"
+    assert rpc(client, "tasks/get", {"id": "cancel-stream"})["result"]["status"]["state"] == "canceled"
+
+
+def test_cancel_interrupts_a_synchronous_turn(client, slow_llm):
+    responses = {}
+    sender = threading.Thread(target=lambda: responses.update(send=rpc(client, "tasks/send", {"id": "cancel-send", "message": text_message("Hello")})))
+    start = time.monotonic()
+    sender.start()
+    while not execution_agent.llm_executor.is_running("cancel-send"):
+        assert time.monotonic() - start < 5
+        time.sleep(0.01)
+
+    assert rpc(client, "tasks/cancel", {"id": "cancel-send"})["result"]["status"]["state"] == "canceled"
+    sender.join(5)
+    assert responses["send"]["result"]["status"]["state"] == "canceled"
+    assert time.monotonic() - start < 3 # The full reply would take 4s
+
+
+def test_finished_or_unknown_task_cannot_be_canceled(client):
+    rpc(client, "tasks/send", {"id": "cancel-done", "message": text_message("Hello")})
+    error = rpc(client, "tasks/cancel", {"id": "cancel-done"})["error"]
+    assert error["code"] == execution_agent.TASK_NOT_CANCELABLE_ERROR
+    assert error["data"]["state"] == "completed"
+
+    error = rpc(client, "tasks/cancel", {"id": "cancel-unknown"})["error"]
+    assert error["code"] == execution_agent.TASK_NOT_FOUND_ERROR
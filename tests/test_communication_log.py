@@ -0,0 +1,34 @@
+import time
+import threading
+
+import communication_log
+from communication_log import CommunicationLog, LogSink
+from metrics import REGISTRY, COMM_LOG_DROPPED
+
+
+class BlockedSink(LogSink):
+    def __init__(self):
+        self.release = threading.Event()
+
+    def write_batch(self, records):
+        self.release.wait(5)
+
+
+def test_dropped_records_and_queue_depth_reach_the_metrics(monkeypatch):
+    sink = BlockedSink()
+    log = CommunicationLog(sink, max_queue_size=1, batch_size=1)
+    monkeypatch.setattr(communication_log, "_default_log", log)
+    dropped_before = COMM_LOG_DROPPED.value()
+    try:
+        # The writer holds the first record; the second fills the queue and the third is dropped
+        log.record("first", {})
+        while log.stats()["queue_depth"]:
+            time.sleep(0.001)
+        assert log.record("second", {})
+        assert not log.record("third", {})
+
+        assert COMM_LOG_DROPPED.value() == dropped_before + 1
+        assert "a2a_comm_log_queue_depth 1" in REGISTRY.render().splitlines()
+    finally:
+        sink.release.set()
+        log.close()
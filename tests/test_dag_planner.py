@@ -0,0 +1,21 @@
+import asyncio
+
+import dag_planner
+import planning_agent
+from llm_providers import StubPlannerProvider
+
+
+class FailingPlannerProvider(StubPlannerProvider):
+    async def generate_async(self, contents):
+        raise TimeoutError("planning call timed out")
+
+
+def test_planning_llm_error_ends_the_run_cleanly(monkeypatch):
+    monkeypatch.setattr(planning_agent, "_llm_provider", FailingPlannerProvider())
+    monkeypatch.setattr(planning_agent, "_llm_provider_configured", True)
+
+    run = asyncio.run(dag_planner.run_dag_goal("Compare three sorting algorithms.", max_rounds=2))
+
+    assert not run.completed
+    assert run.rounds == []
+    assert run.error == "Planning LLM failed - planning call timed out"
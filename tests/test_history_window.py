@@ -0,0 +1,31 @@
+import pytest
+
+import execution_agent
+from conftest import rpc, text_message
+
+
+def send(client, task_id, text, **params):
+    return rpc(client, "tasks/send", {"id": task_id, "message": text_message(text), **params})
+
+
+def test_history_offset_returns_only_new_messages(client):
+    send(client, "window", "first")
+    result = send(client, "window", "second", metadata={"historyOffset": 2})["result"]
+    assert result["metadata"]["historyOffset"] == 2
+    assert result["metadata"]["historyTotal"] == 4
+    assert [message["role"] for message in result["history"]] == ["user", "agent"]
+    assert result["history"][0]["parts"][0]["text"] == "second"
+
+
+def test_history_length_keeps_the_latest_messages(client):
+    send(client, "window-length", "first")
+    result = send(client, "window-length", "second", historyLength=1)["result"]
+    assert len(result["history"]) == 1
+    assert result["history"][0]["role"] == "agent"
+
+
+@pytest.mark.parametrize("offset", ["abc", -1, 1.5, True])
+def test_invalid_history_offset_is_rejected_before_the_turn(client, offset):
+    response = send(client, "window-invalid", "hello", metadata={"historyOffset": offset})
+    assert response["error"]["code"] == execution_agent.JSONRPC_INVALID_PARAMS
+    assert rpc(client, "tasks/get", {"id": "window-invalid"})["error"]["code"] == execution_agent.TASK_NOT_FOUND_ERROR
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+import execution_agent
+from conftest import rpc, text_message
+from llm_executor import CancellableExecutor
+from llm_providers import StubProvider
+
+
+@pytest.fixture
+def slow_llm(agent_app, monkeypatch):
+    """A stub provider slower than a short LLM_TIMEOUT_SECONDS, with micro-batching off."""
+    executor = CancellableExecutor(max_workers=2, timeout=0.3)
+    monkeypatch.setattr(execution_agent, "llm_executor", executor)
+    monkeypatch.setattr(execution_agent, "micro_batcher", None)
+    yield monkeypatch
+    executor.shutdown(wait=True)
+
+
+def test_direct_call_is_bounded_by_the_deadline(client, slow_llm):
+    slow_llm.setattr(execution_agent, "llm_provider", StubProvider(latency="fixed:1.5"))
+    response = rpc(client, "tasks/send", {"id": "slow-direct", "message": text_message("Hello")})
+    reply = response["result"]["status"]["message"]["parts"][0]["text"]
+    assert reply.startswith("Error processing message with LLM:")
+    assert "did not finish" in reply
+
+
+def test_stream_still_running_after_the_deadline_fails(client, slow_llm):
+    slow_llm.setattr(execution_agent, "llm_provider", StubProvider(tokens_per_second=10, responses=["word " * 50]))
+    response = client.post("/a2a", json={
+        "jsonrpc": "2.0", "id": 1, "method": "tasks/sendSubscribe",
+        "params": {"id": "slow-stream", "message": text_message("Hello")},
+    })
+    events = [json.loads(line[len("data: "):])["result"] for line in response.get_data(as_text=True).splitlines() if line.startswith("data: ")]
+    final = events[-1]
+    assert final["final"] is True
+    reply = final["status"]["message"]["parts"][0]["text"]
+    assert "Error processing message with LLM: LLM call did not finish in 0.3s" in reply
+    assert len(reply.split()) < 50
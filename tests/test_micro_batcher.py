@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def contents(text):
+    return [{"role": "user", "parts": [{"text": text}]}]
+
+
+def test_missing_batch_results_fail_the_leftover_calls():
+    batcher = MicroBatcher(lambda batch: ["only one"], max_batch_size=2, window=0.5)
+    try:
+        first, second = batcher.submit(contents("a")), batcher.submit(contents("b"))
+        assert first.result(timeout=5) == "only one"
+        with pytest.raises(RuntimeError):
+            second.result(timeout=5)
+        assert batcher.stats()["batch_errors"] == 1
+    finally:
+        batcher.close()
+
+
+def test_timed_out_call_is_not_sent():
+    release = threading.Event()
+    sent = []
+
+    def generate_batch(batch):
+        sent.extend(batch)
+        release.wait(5)
+        return ["ok"] * len(batch)
+
+    batcher = MicroBatcher(generate_batch, max_batch_size=1, window=0.0, max_concurrent_batches=1)
+    try:
+        blocking = batcher.submit(contents("a"))
+        with pytest.raises(TimeoutError):
+            batcher.generate(contents("b"), timeout=0.05)
+        release.set()
+        assert blocking.result(timeout=5) == "ok"
+        batcher.close()
+        assert sent == [contents("a")]
+        assert batcher.stats()["timeouts"] == 1
+    finally:
+        release.set()
+        batcher.close()
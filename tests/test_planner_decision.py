@@ -0,0 +1,20 @@
+import pytest
+
+from planning_agent import CONFIRM_DONE_INSTRUCTION, parse_planner_decision
+
+
+@pytest.mark.parametrize("answer", ["TASK_COMPLETE", "'Task complete.'", "Done", "The story is finished.\nTASK_COMPLETE", "TASK_COMPLETE\nThe story is finished."])
+def test_legacy_done_answers(answer):
+    assert parse_planner_decision(answer).data == {"done": True, "next_instruction": "", "confidence": 1.0}
+
+
+def test_multi_line_instruction_with_a_done_line_continues():
+    answer = "Revise the checklist below.\nDone\nComplete\nThen add a summary of the open items."
+    decision = parse_planner_decision(answer).data
+    assert decision["done"] is False
+    assert decision["next_instruction"] == answer
+
+
+def test_json_decision_below_confidence_asks_for_confirmation():
+    decision = parse_planner_decision('```json\n{"done": true, "next_instruction": "", "confidence": 0.4}\n```', done_confidence=0.7).data
+    assert decision == {"done": False, "next_instruction": CONFIRM_DONE_INSTRUCTION, "confidence": 0.4}
@@ -0,0 +1,30 @@
+import time
+
+from a2a_models import PushNotificationConfig
+from push_notifications import PushNotificationSender
+
+
+def webhook(port):
+    return PushNotificationConfig(url=f"http://127.0.0.1:{port}/webhook")
+
+
+def test_configs_are_removed_expired_and_bounded():
+    sender = PushNotificationSender(workers=1, max_configs=2, config_ttl_seconds=0.05)
+    try:
+        sender.set_config("a", webhook(1))
+        assert sender.remove_config("a")
+        assert sender.get_config("a") is None
+        assert not sender.notify("a", {"id": "a"})
+
+        sender.set_config("b", webhook(2))
+        time.sleep(0.1)
+        assert sender.get_config("b") is None
+
+        for task_id in ("c", "d", "e"):
+            sender.set_config(task_id, webhook(3))
+        assert sender.get_config("c") is None
+        assert sender.get_config("e") is not None
+        assert sender.stats()["configs"] == 2
+        assert sender.stats()["expired_configs"] == 2
+    finally:
+        sender.close()
@@ -0,0 +1,18 @@
+import os
+
+from replay import build_exchanges, parse_text_log
+
+BASELINE_LOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "communication_log.txt")
+
+
+def test_parses_the_baseline_text_log():
+    records = parse_text_log(BASELINE_LOG)
+    assert len(records) > 0
+    assert all(record["ts"] is None and isinstance(record["payload"], dict) for record in records)
+    assert build_exchanges(records)
+
+
+def test_any_dashed_rule_ends_a_record(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text('--- Planning Agent Sent Request ---\n{\n  "jsonrpc": "2.0"\n}\n---\n--- Other ---\n[]\n' + "-" * 40 + "\n")
+    assert [record["event"] for record in parse_text_log(str(path))] == ["Planning Agent Sent Request", "Other"]
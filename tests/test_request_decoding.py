@@ -0,0 +1,43 @@
+import gzip
+import json
+
+import pytest
+
+import execution_agent
+from conftest import text_message
+
+
+def post_gzip(client, body, **headers):
+    return client.post("/a2a", data=body, headers={"Content-Type": "application/json", "Content-Encoding": "gzip", **headers})
+
+
+def test_gzip_request_body_is_decompressed(client):
+    request = {"jsonrpc": "2.0", "id": 1, "method": "tasks/send", "params": {"id": "gzip-ok", "message": text_message("hi")}}
+    response = post_gzip(client, gzip.compress(json.dumps(request).encode()))
+    assert response.status_code == 200
+    assert response.get_json()["result"]["status"]["state"] == "completed"
+
+
+@pytest.mark.parametrize("body", [b"not gzip at all", gzip.compress(b'{"jsonrpc": "2.0"}')[:-12]])
+def test_malformed_gzip_body_is_a_parse_error(client, body):
+    response = post_gzip(client, body)
+    assert response.status_code == 400
+    assert response.get_json()["error"]["code"] == execution_agent.JSONRPC_PARSE_ERROR
+
+
+def test_oversized_gzip_body_is_refused(client, monkeypatch):
+    middleware = client.application.wsgi_app
+    monkeypatch.setattr(middleware, "max_body_bytes", 1024)
+    response = post_gzip(client, gzip.compress(b" " * 4096))
+    assert response.status_code == 413
+    assert response.get_json()["error"]["code"] == execution_agent.JSONRPC_INVALID_REQUEST
+
+
+@pytest.mark.parametrize("body, code", [
+    (b"[1, 2]", execution_agent.JSONRPC_INVALID_REQUEST),
+    (b'"tasks/send"', execution_agent.JSONRPC_INVALID_REQUEST),
+    (b"{not json", execution_agent.JSONRPC_PARSE_ERROR),
+])
+def test_non_object_bodies(client, body, code):
+    response = client.post("/a2a", data=body, headers={"Content-Type": "application/json"})
+    assert response.get_json()["error"]["code"] == code
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import execution_agent
+from a2a_models import Message, TextPart
+from llm_providers import StubProvider
+from response_cache import ResponseCache, cache_key
+from session_context import SessionContextCache
+
+
+def exchange(request_id, task_id, text, reply, history_total):
+    request = {"jsonrpc": "2.0", "id": request_id, "method": "tasks/send", "params": {
+        "id": task_id, "message": {"role": "user", "parts": [{"type": "text", "text": text}]}, "historyLength": 0,
+    }}
+    response = {"jsonrpc": "2.0", "id": request_id, "result": {
+        "id": task_id,
+        "status": {"state": "completed", "message": {"role": "agent", "parts": [{"type": "text", "text": reply}]}},
+        "history": [],
+        "metadata": {"historyOffset": history_total, "historyTotal": history_total},
+    }}
+    return [{"event": "Execution Agent Received Request", "payload": request}, {"event": "Execution Agent Sent Response", "payload": response}]
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(execution_agent, "llm_provider", StubProvider())
+    monkeypatch.setattr(execution_agent, "response_cache", ResponseCache())
+    monkeypatch.setattr(execution_agent, "session_contexts", SessionContextCache(
+        execution_agent.EXECUTION_AGENT_SYSTEM_PROMPT, execution_agent.message_to_llm_content
+    ))
+    return execution_agent
+
+
+def turn_key(agent, history):
+    contexts = SessionContextCache(agent.EXECUTION_AGENT_SYSTEM_PROMPT, agent.message_to_llm_content)
+    contents, _ = contexts.contents_for("probe", history)
+    return cache_key(agent.llm_provider.model_name, contents, agent.llm_provider.generation_config)
+
+
+def user(text):
+    return Message(role="user", parts=[TextPart(text=text)])
+
+
+def test_later_turns_are_keyed_by_their_whole_conversation(agent, tmp_path):
+    log_path = tmp_path / "communication_log.jsonl"
+    records = exchange(1, "task-a", "Write a poem.", "Roses are red.", 2) + exchange(2, "task-a", "Make it longer.", "Roses are red, violets are blue.", 4)
+    log_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    assert agent.warm_response_cache(str(log_path)) == 2
+
+    first_turn = [user("Write a poem.")]
+    second_turn = first_turn + [Message(role="agent", parts=[TextPart(text="Roses are red.")]), user("Make it longer.")]
+    assert agent.response_cache.get(turn_key(agent, first_turn)) == "Roses are red."
+    assert agent.response_cache.get(turn_key(agent, second_turn)) == "Roses are red, violets are blue."
+    # A new task opening with the second turn's text must not get a reply made for another conversation
+    assert agent.response_cache.get(turn_key(agent, [user("Make it longer.")])) is None
+
+
+def test_tasks_missing_earlier_turns_are_skipped(agent, tmp_path):
+    # The first turn of the task was rotated out of the log
+    log_path = tmp_path / "communication_log.jsonl"
+    log_path.write_text("".join(json.dumps(record) + "\n" for record in exchange(2, "task-b", "Make it longer.", "Longer poem.", 4)))
+
+    assert agent.warm_response_cache(str(log_path)) == 0
+    assert agent.response_cache.get(turn_key(agent, [user("Make it longer.")])) is None
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+import async_planning_agent
+import planning_agent
+from router import ExecutionAgentRouter
+
+
+@pytest.fixture
+def routed_agent(agent_app, monkeypatch):
+    """Routes the planners' requests through a router to the test agent served over HTTP."""
+    server = make_server("127.0.0.1", 0, agent_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    router = ExecutionAgentRouter(urls=[f"http://127.0.0.1:{server.server_port}"], probe_interval=0).start()
+    monkeypatch.setattr(planning_agent, "_router", router)
+    monkeypatch.setattr(planning_agent, "_router_configured", True)
+    yield router
+    router.stop()
+    server.shutdown()
+
+
+def test_finished_async_goal_releases_its_affinity(routed_agent):
+    runs = asyncio.run(async_planning_agent.run_goals(["Tell me a joke."], concurrency=1, max_turns=5, pacer_factory=lambda: planning_agent.TurnPacer("off")))
+    assert runs[0].turns_sent > 0
+    stats = routed_agent.stats()
+    assert sum(agent["requests"] for agent in stats["agents"].values()) == runs[0].turns_sent
+    assert stats["tasks_pinned"] == 0
+
+
+def test_finished_goal_releases_its_affinity(routed_agent):
+    goal_stats = planning_agent.plan_and_execute_task("Tell me a joke.", max_turns=5, pacer=planning_agent.TurnPacer("off"))
+    assert goal_stats.turns > 0
+    assert routed_agent.stats()["tasks_pinned"] == 0
+
+
+def test_forget_drops_only_that_task(routed_agent):
+    with routed_agent.acquire("a"), routed_agent.acquire("b"):
+        pass
+    routed_agent.forget("a")
+    assert routed_agent.stats()["tasks_pinned"] == 1
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+import execution_agent
+from conftest import rpc, text_message
+from task_sequencer import TaskBusyError, TaskSequencer
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_turns_of_a_task_run_in_arrival_order():
+    sequencer = TaskSequencer(stripes=1)
+    order = []
+
+    def turn(label):
+        with sequencer.acquire("task"):
+            order.append(label)
+
+    first = sequencer.acquire("task")
+    threads = []
+    for label in ("second", "third"):
+        threads.append(threading.Thread(target=turn, args=(label,)))
+        threads[-1].start()
+        wait_for(lambda: sequencer.stats()["waiting_turns"] == len(threads))
+
+    # Another task (even on the same stripe) is not held up by the busy one
+    with sequencer.acquire("other", wait=False):
+        pass
+    assert order == []
+
+    first.release()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["second", "third"]
+    assert not sequencer.busy("task")
+    assert sequencer.stats()["queued"] == 2
+
+
+def test_reject_mode_refuses_a_concurrent_turn():
+    sequencer = TaskSequencer(mode="reject")
+    with sequencer.acquire("task"):
+        with pytest.raises(TaskBusyError):
+            sequencer.acquire("task")
+    with sequencer.acquire("task"):
+        pass
+    assert sequencer.stats()["rejected"] == 1
+
+
+def test_queued_turn_gives_up_after_the_timeout():
+    sequencer = TaskSequencer(timeout=0.1)
+    first = sequencer.acquire("task")
+    with pytest.raises(TaskBusyError, match="waited 0.1s"):
+        sequencer.acquire("task")
+    assert sequencer.stats()["timeouts"] == 1
+
+    # The abandoned ticket is skipped, so the next turn starts right away
+    first.release()
+    turn = sequencer.acquire("task", wait=False)
+    assert turn.waited < 0.1
+    turn.release()
+    assert not sequencer.busy("task")
+
+
+def test_busy_task_is_refused_with_a_jsonrpc_error(client, monkeypatch):
+    sequencer = TaskSequencer(mode="reject")
+    monkeypatch.setattr(execution_agent, "task_sequencer", sequencer)
+    with sequencer.acquire("busy-task"):
+        response = rpc(client, "tasks/send", {"id": "busy-task", "message": text_message("Hello")})
+    assert response["error"]["code"] == execution_agent.TASK_BUSY_ERROR
+    assert response["error"]["data"]["id"] == "busy-task"
+
+    response = rpc(client, "tasks/send", {"id": "busy-task", "message": text_message("Hello")})
+    assert response["result"]["status"]["state"] == "completed"
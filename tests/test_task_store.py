@@ -0,0 +1,45 @@
+import os
+import time
+
+from a2a_models import Message, Task, TaskState, TaskStatus, TextPart
+from task_store import AppendOnlyHistoryTaskStore, InMemoryTaskStore
+
+
+def make_task(task_id, turns):
+    history = [Message(role="user" if i % 2 == 0 else "agent", parts=[TextPart(text=f"message {i} of {task_id}")]) for i in range(turns)]
+    return Task(id=task_id, status=TaskStatus(state=TaskState.completed), history=history)
+
+
+def test_append_only_save_sweeps_expired_tasks(tmp_path):
+    store = AppendOnlyHistoryTaskStore(directory=str(tmp_path), ttl_seconds=60.0, sweep_interval=2)
+    store.save(make_task("old", 2))
+    record_path, history_path = store._paths("old")
+    stale = time.time() - 120.0
+    os.utime(record_path, (stale, stale))
+
+    store.save(make_task("new", 2))
+
+    assert store.get("old") is None
+    assert not os.path.exists(history_path)
+    assert store.get("new") is not None
+    assert store.stats()["evictions"] == 1
+
+
+def test_in_memory_size_tracks_appended_history():
+    store = InMemoryTaskStore(ttl_seconds=None, max_memory_bytes=None)
+    task = make_task("task", 2)
+    store.save(task)
+    task.history.append(Message(role="user", parts=[TextPart(text="a third message")]))
+    store.save(task)
+    expected = len(task.model_dump_json(exclude_none=True, exclude={"history"}))
+    expected += sum(len(message.model_dump_json(exclude_none=True)) for message in task.history)
+    assert store.memory_bytes == expected
+
+    # A shorter (rewritten) history is measured again from scratch
+    task.history = task.history[:1]
+    store.save(task)
+    only_first = make_task("task", 1)
+    assert store._history_sizes["task"] == (1, len(only_first.history[0].model_dump_json(exclude_none=True)))
+
+    store.delete("task")
+    assert store.memory_bytes == 0
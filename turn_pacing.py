@@ -0,0 +1,94 @@
+import os
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Key of the Execution Agent's load report in the metadata of tasks/send results
+AGENT_LOAD_KEY = "agentLoad"
+
+# Pacing strategies between the turns of a goal
+PACING_MODES = ("adaptive", "fixed", "off")
+
+
+def load_report_of(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Returns the load report carried in a task's metadata, if any."""
+    report = (metadata or {}).get(AGENT_LOAD_KEY)
+    return report if isinstance(report, dict) else None
+
+
+class TurnPacer:
+    """Delay before a goal's next turn, driven by the Execution Agent's backpressure.
+
+    In "adaptive" mode there is no delay while the agent reports a utilization (LLM work
+    in flight and queued, over its LLM workers) below `target_utilization`. Under pressure
+    (high utilization, or the agent draining and no longer accepting work) the delay grows multiplicatively from `initial_delay` up to `max_delay`, and it halves
+    again with every turn without pressure. "fixed" always waits `fixed_delay`; "off"
+    never waits.
+    """
+
+    def __init__(
+        self,
+        mode: str = "adaptive",
+        fixed_delay: float = 1.0,
+        target_utilization: float = 0.8,
+        initial_delay: float = 0.05,
+        max_delay: float = 5.0,
+        backoff: float = 2.0,
+    ):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Invalid pacing mode: {mode}")
+        self.mode = mode
+        self.fixed_delay = fixed_delay
+        self.target_utilization = target_utilization
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+
+        self.delay = 0.0
+        self.turns = 0
+        self.pressured_turns = 0
+        self.total_delay = 0.0
+
+    def next_delay(self, load: Optional[Dict[str, Any]] = None) -> float:
+        """Records the load reported with a turn's result and returns the seconds to wait before the next turn."""
+        self.turns += 1
+        if self.mode == "off":
+            return 0.0
+        if self.mode == "fixed":
+            self.total_delay += self.fixed_delay
+            return self.fixed_delay
+
+        load = load or {}
+        utilization = load.get("utilization")
+        pressured = load.get("accepting") is False or (isinstance(utilization, (int, float)) and utilization >= self.target_utilization)
+        if pressured:
+            self.pressured_turns += 1
+            self.delay = min(self.max_delay, max(self.initial_delay, self.delay * self.backoff))
+            logger.info(f"Execution Agent under pressure (utilization {utilization}); pacing turns {1000 * self.delay:.0f}ms apart.")
+        else:
+            self.delay = self.delay / self.backoff
+            if self.delay < self.initial_delay:
+                self.delay = 0.0
+        self.total_delay += self.delay
+        return self.delay
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "turns": self.turns,
+            "pressured_turns": self.pressured_turns,
+            "total_delay_s": self.total_delay,
+            "current_delay_s": self.delay,
+        }
+
+
+def create_turn_pacer_from_env() -> TurnPacer:
+    """Builds the pacer configured through PLANNER_PACING (adaptive, fixed or off), PLANNER_TURN_DELAY
+    (the fixed delay), PLANNER_TARGET_UTILIZATION and PLANNER_MAX_TURN_DELAY."""
+    return TurnPacer(
+        mode=os.getenv("PLANNER_PACING", "adaptive").lower(),
+        fixed_delay=float(os.getenv("PLANNER_TURN_DELAY", "1.0")),
+        target_utilization=float(os.getenv("PLANNER_TARGET_UTILIZATION", "0.8")),
+        max_delay=float(os.getenv("PLANNER_MAX_TURN_DELAY", "5.0")),
+    )